@@ -6,19 +6,29 @@ from flask import Flask, session, render_template, request, redirect, url_for, f
 from flask_login import LoginManager, logout_user, login_required, current_user
 from flask_wtf import CSRFProtect
 from flask_limiter import Limiter
+from helpers.asset_helpers import assets_cli, static_assets
 from helpers.auth_helpers import register_user, login_user_helper
-from helpers.dashboard_helpers import get_most_recent_lesson_record, get_upcoming_lessons
-from helpers.edit_lesson_record_helpers import get_lesson_by_id, initialize_lesson_form, update_last_edit_time
-from helpers.file_helpers import save_image_file
-from helpers.lesson_record_helpers import get_paginated_lesson_records, make_times_timezone_aware
+from helpers.conditional_request_helpers import etag_conditional, teacher_slots_version, student_slots_version
+from helpers.dashboard_cache_helpers import dashboard_cache
+from helpers.dashboard_helpers import get_dashboard_data
+from helpers.edit_lesson_record_helpers import get_lesson_by_id, initialize_lesson_form, update_lesson_terms, update_last_edit_time
+from helpers.file_helpers import image_pipeline, images_cli, save_image_file
+from helpers.lesson_record_helpers import get_paginated_lesson_records
+from helpers.recurring_availability_helpers import get_recurring_availability, add_recurring_availability, remove_recurring_availability
+from helpers.review_helpers import GRADES, review_decks, get_due_reviews, record_review
+from helpers.search_helpers import search_cli, search_available, search_lesson_records
+from helpers.slot_maintenance_helpers import slots_cli, start_purge_scheduler
+from helpers.slot_interval_index import slot_index
+from helpers.slot_snapshot_helpers import slot_snapshots
 from helpers.student_helpers import update_student_profile, get_student_by_id, cancel_student_lesson
-from helpers.student_booking_helpers import fetch_available_slots, convert_slots_to_dict, update_student_booking, fetch_and_format_slots
-from helpers.teacher_helpers import get_outstanding_lessons, get_teacher_by_id, get_teacher_profile_by_id, update_teacher_profile, update_student_profile_from_form
-from helpers.teacher_lesson_slot_mgmt_helpers import open_slot, close_slot, get_lesson_slots_for_week
-from helpers.time_helpers import ensure_timezone_aware, get_week_boundaries, get_user_timezone
-from models import Student, StudentProfile, Teacher, LessonSlot, Word, Phrase
+from helpers.student_booking_helpers import fetch_available_slots, convert_slots_to_views, convert_slots_to_dict, convert_dict_to_slots, update_student_booking, fetch_and_format_slots, fetch_weekly_availability
+from helpers.teacher_helpers import get_teacher_by_id, get_teacher_profile_by_id, update_teacher_profile, update_student_profile_from_form
+from helpers.teacher_directory_helpers import AVAILABILITY_DAY_CHOICES, DEFAULT_OFFSET_HOURS, DirectoryFilters, teacher_directory
+from helpers.teacher_lesson_slot_mgmt_helpers import open_slot, close_slot, get_lesson_slots_for_week, apply_slot_changes, build_week_bitmap
+from helpers.time_helpers import get_week_boundaries, get_user_timezone, localize_utc_times
+from models import Student, StudentProfile, Teacher, LessonSlot
 from forms import RegistrationForm, LoginForm, EditTeacherProfileForm, StudentProfileForm, TeacherEditsStudentForm, LessonRecordForm, LessonSlotsForm, StudentLessonSlotForm, CancelLessonForm
-from database import db, migrate
+from database import db, init_database
 
 """
 This module initializes the Flask application, sets up configurations, 
@@ -28,20 +38,31 @@ and defines route handlers for various pages in the web app.
 # Initialize Flask app
 app = Flask(__name__)
 app.secret_key = 'coolie_killer_huimin_himitsunakotogawaruidesune' 
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db'
 app.config['DEBUG'] = True
 app.config['WTF_CSRF_ENABLED'] = True
+app.config['SLOT_PURGE_INTERVAL_SECONDS'] = 0  # e.g. 3600 to purge expired slots hourly in-process
 app.logger.setLevel(logging.INFO)
 
 
 # Initialize extensions
-db.init_app(app)
-migrate.init_app(app, db)
+init_database(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 csrf = CSRFProtect(app)
 csrf.init_app(app)
 limiter = Limiter(app)
+slot_snapshots.init_app(app)
+dashboard_cache.init_app(app)
+slot_index.init_app(app)
+review_decks.init_app(app)
+teacher_directory.init_app(app)
+image_pipeline.init_app(app)
+app.jinja_env.globals['image_variants'] = image_pipeline.variants
+static_assets.init_app(app)
+app.cli.add_command(slots_cli)
+app.cli.add_command(search_cli)
+app.cli.add_command(images_cli)
+app.cli.add_command(assets_cli)
 
 
 # Set up logging
@@ -54,6 +75,10 @@ with app.app_context():
     app.logger.info("Database tables created.")
 
 
+# Optionally purge expired lesson slots in the background (see SLOT_PURGE_INTERVAL_SECONDS)
+start_purge_scheduler(app)
+
+
 # This handles whether a student or teacher is logging in
 @login_manager.user_loader
 def load_user(user_id):
@@ -102,11 +127,19 @@ def index():
 def meet_your_teacher():
     """
     Displays a gallery of all the teachers present in the system.
-    Supports pagination to show a limited number of teachers per page.
+    Supports pagination to show a limited number of teachers per page, and filtering by
+    availability, hobbies and timezone. Pages are served from the teacher directory cache.
     """
-    page = request.args.get('page', 1, type=int)
-    teachers = Teacher.query.paginate(page=page, per_page=6)
-    return render_template('meetYourTeachers.html', teachers=teachers)
+    page = max(request.args.get('page', 1, type=int), 1)
+    filters = DirectoryFilters.from_args(request.args)
+    teachers = teacher_directory.get_page(filters, page)
+    app.logger.debug(f"Teacher directory cache: {teacher_directory.stats}")
+    return render_template(
+        'meetYourTeachers.html',
+        teachers=teachers,
+        filters=filters,
+        day_choices=AVAILABILITY_DAY_CHOICES,
+        offset_hours=DEFAULT_OFFSET_HOURS)
 
 
 @app.route('/ourLessons')
@@ -273,11 +306,10 @@ def teacher_dashboard():
 
     user_timezone = teacher.timezone
 
-    most_recent_record = get_most_recent_lesson_record(teacher.id, 'teacher', user_timezone)
-    upcoming_lessons = get_upcoming_lessons(teacher.id, 'teacher', user_timezone)
-    outstanding_lessons = get_outstanding_lessons(teacher.id, user_timezone)
+    dashboard = dashboard_cache.get_or_build('teacher', teacher.id, user_timezone, lambda: get_dashboard_data(teacher.id, 'teacher', user_timezone))
+    app.logger.debug(f"Dashboard cache: {dashboard_cache.stats}")
 
-    return render_template('teacher/teacherDashboard.html', profile=current_user.profile, most_recent_record=most_recent_record, upcoming_lessons=upcoming_lessons, outstanding_lessons=outstanding_lessons, user_timezone=user_timezone)
+    return render_template('teacher/teacherDashboard.html', profile=current_user.profile, most_recent_record=dashboard['most_recent_record'], upcoming_lessons=dashboard['upcoming_lessons'], outstanding_lessons=dashboard['outstanding_lessons'], user_timezone=user_timezone)
 
 
 @app.route('/teacher/lessonRecords')
@@ -301,9 +333,7 @@ def teacher_lesson_records():
         app.logger.error(f"Teacher with ID {session['user_id']} not found.")
         return render_template('404.html'), 404
     
-    page = request.args.get('page', 1, type=int)
-    lesson_records = get_paginated_lesson_records(teacher.id, page, 'teacher')
-    lesson_records = make_times_timezone_aware(lesson_records, teacher.timezone)
+    lesson_records = get_paginated_lesson_records(teacher.id, 'teacher', teacher.timezone, after=request.args.get('after'), before=request.args.get('before'))
 
     return render_template('teacher/teacherLessonRecords.html', lesson_records=lesson_records)
 
@@ -337,6 +367,7 @@ def edit_teacher_profile():
 
 @app.route('/teacher/lessonSlots', methods=['GET'])
 @login_required
+@etag_conditional(teacher_slots_version)
 def manage_lesson_slots():
     """
     Display and manage lesson slots for the teacher.
@@ -354,23 +385,17 @@ def manage_lesson_slots():
     week_offset = int(request.args.get('week_offset', 0))
     start_of_week_utc, end_of_week_utc = get_week_boundaries(teacher.timezone, week_offset)
 
-    lesson_slots = get_lesson_slots_for_week(current_user.id, start_of_week_utc, end_of_week_utc)
-    
-    utc_now = datetime.now(pytz.UTC)
-    lesson_slots_json = [{
-        'slot_id': slot.id,
-        'start_time': slot.start_time.astimezone(user_timezone).isoformat(),
-        'end_time': slot.end_time.astimezone(user_timezone).isoformat(),
-        'status': 'Booked' if slot.is_booked else 'Available' if slot.start_time.astimezone(pytz.UTC) > utc_now else 'Closed'
-    } for slot in lesson_slots]
-
-    app.logger.info(f"Returning lesson slots: {lesson_slots_json}")
-
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return jsonify(lesson_slots_json)
-    else:
+    if request.headers.get('X-Requested-With') != 'XMLHttpRequest':
         return render_template('teacher/lessonSlots.html', form=form)
 
+    lesson_slots = get_lesson_slots_for_week(current_user.id, start_of_week_utc, end_of_week_utc)
+    week_start = start_of_week_utc.astimezone(user_timezone).date()
+    week_bitmap = build_week_bitmap(lesson_slots, week_start, teacher.timezone)
+
+    app.logger.debug(f"Returning lesson slot bitmap for week of {week_start}")
+
+    return jsonify(week_bitmap)
+
 
 @app.route('/teacher/updateSlot', methods=['POST'])
 @login_required
@@ -396,7 +421,7 @@ def update_lesson_slot():
         local_end_time = datetime.strptime(data['end_time'], '%Y-%m-%dT%H:%M:%S')
         start_time = user_timezone.localize(local_start_time).astimezone(pytz.UTC)
         end_time = user_timezone.localize(local_end_time).astimezone(pytz.UTC)
-        return jsonify(open_slot(start_time, end_time, current_user.id, user_timezone))
+        return jsonify(open_slot(start_time, end_time, current_user.id, teacher.timezone))
     elif action == 'close':
         return jsonify(close_slot(slot_id, current_user.id))
 
@@ -437,6 +462,7 @@ def update_slots():
     Update multiple lesson slots (open or close).
 
     Processes requests to update multiple lesson slots based on provided data.
+    The batch is applied in a single transaction: either every change succeeds or none do.
     Only accessible by users with a 'teacher' user_type.
 
     Returns:
@@ -444,45 +470,48 @@ def update_slots():
     """
     data = request.get_json()
     app.logger.info(f"Received data: {data}")
-    updates = []
     teacher = db.session.get(Teacher, current_user.id)
 
-    for item in data:
-        action = item['action']
-        try:
-            if action == 'open':
-                local_start_time = datetime.fromisoformat(item['start_time'])
-                start_time = ensure_timezone_aware(local_start_time, teacher.timezone)
-                local_end_time = datetime.fromisoformat(item['end_time'])
-                end_time = ensure_timezone_aware(local_end_time, teacher.timezone)
-                new_slot = LessonSlot(teacher_id=current_user.id, start_time=start_time, end_time=end_time, is_booked=False)
-                db.session.add(new_slot)
-                db.session.commit()
-                updates.append({
-                    'action': 'open',
-                    'slot_id': new_slot.id,
-                    'start_time': new_slot.start_time.isoformat()
-                })
-            elif action == 'close':
-                slot_id = item['slot_id']
-                slot = LessonSlot.query.get(slot_id)
-                if slot and slot.teacher_id == current_user.id:
-                    if slot.is_booked:
-                        return jsonify({'status': 'error', 'message': 'Cannot close a slot that is already booked.'})
-                    db.session.delete(slot)
-                    db.session.commit()
-                    updates.append({
-                        'action': 'close',
-                        'slot_id': slot_id
-                    })
-                else:
-                    app.logger.error('Invalid slot id.')
-                    return render_template("apology.html", top="400 Error", bottom="Invalid slot id."), 400
-        except Exception as e:
-            app.logger.error(f"Error processing slot action: {e}")
-            return render_template("apology.html", top="400 Error", bottom=f"Invalid data for {action} action."), 400
-
-    return jsonify({'status': 'success', 'updates': updates})
+    try:
+        result = apply_slot_changes(current_user.id, teacher.timezone, data)
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error processing slot changes: {e}")
+        return render_template("apology.html", top="400 Error", bottom="Invalid slot data."), 400
+
+    return jsonify(result)
+
+
+@app.route('/teacher/recurringAvailability', methods=['GET', 'POST'])
+@login_required
+def recurring_availability():
+    """
+    List, add or remove the teacher's weekly recurring availability.
+
+    Only accessible by users with a 'teacher' user_type.
+    GET returns the teacher's windows; POST takes {'action': 'add', 'weekdays', 'start_time', 'end_time'}
+    or {'action': 'remove', 'id'}.
+
+    Returns:
+        Response: JSON response with the windows, or indicating success or error.
+    """
+    if session.get('user_type') != 'teacher':
+        return jsonify({'status': 'error', 'message': 'Not a teacher'}), 403
+
+    teacher = db.session.get(Teacher, current_user.id)
+
+    if request.method == 'POST':
+        data = request.get_json() or {}
+        action = data.get('action')
+        if action == 'add':
+            result = add_recurring_availability(teacher.id, teacher.timezone, data.get('weekdays', []), data.get('start_time'), data.get('end_time'))
+        elif action == 'remove':
+            result = remove_recurring_availability(teacher.id, data.get('id'))
+        else:
+            result = {'status': 'error', 'message': 'Invalid action.'}
+        return jsonify(result)
+
+    return jsonify(get_recurring_availability(teacher.id))
 
 
 @app.route('/studentProfile/<int:student_id>', methods=['GET', 'POST'])
@@ -568,29 +597,10 @@ def edit_lesson(lesson_id):
             lesson.strengths = form.strengths.data.strip()
             lesson.areas_to_improve = form.areas_to_improve.data.strip()
 
-            # clear existing words and phrases
-            lesson.new_words.clear()
-            lesson.new_phrases.clear()
-
-            # add the new words and phrases
+            # apply the edited words and phrases
             new_words = request.form.get('new_words')
             new_phrases = request.form.get('new_phrases')
-
-            if new_words:
-                words_list = json.loads(new_words)
-                for word in words_list:
-                    word = word.strip()
-                    if word:
-                        word_obj = Word(content=word, lesson_record_id=lesson.id)
-                        lesson.new_words.append(word_obj)
-
-            if new_phrases:
-                phrases_list = json.loads(new_phrases)
-                for phrase in phrases_list:
-                    phrase = phrase.strip()
-                    if phrase:
-                        phrase_obj = Phrase(content=phrase, lesson_record_id=lesson.id)
-                        lesson.new_phrases.append(phrase_obj)
+            update_lesson_terms(lesson, json.loads(new_words) if new_words else [], json.loads(new_phrases) if new_phrases else [])
 
             try:
                 update_last_edit_time(lesson, session['user_id'])
@@ -634,16 +644,16 @@ def student_dashboard():
         return render_template('404.html'), 404
     
     user_timezone = get_user_timezone(student.timezone)
-    most_recent_record = get_most_recent_lesson_record(student.id, 'student', student.timezone)
-    upcoming_lessons = get_upcoming_lessons(student.id, 'student', student.timezone)
+    dashboard = dashboard_cache.get_or_build('student', student.id, student.timezone, lambda: get_dashboard_data(student.id, 'student', student.timezone))
+    app.logger.debug(f"Dashboard cache: {dashboard_cache.stats}")
 
     cancel_lesson_form = CancelLessonForm() 
 
     return render_template(
         'student/studentDashboard.html',
         profile=current_user.profile,
-        most_recent_record=most_recent_record,
-        upcoming_lessons=upcoming_lessons,
+        most_recent_record=dashboard['most_recent_record'],
+        upcoming_lessons=dashboard['upcoming_lessons'],
         cancel_lesson_form=cancel_lesson_form, 
         user_timezone=user_timezone
     )
@@ -700,13 +710,111 @@ def student_lesson_records():
     user_timezone = get_user_timezone(student.timezone)
 
     # Fetch all past lesson records for the logged-in student relative to their local timezone
-    page = request.args.get('page', 1, type=int)
-    lesson_records = get_paginated_lesson_records(student.id, page, 'student')
-    lesson_records = make_times_timezone_aware(lesson_records, student.timezone)
+    lesson_records = get_paginated_lesson_records(student.id, 'student', student.timezone, after=request.args.get('after'), before=request.args.get('before'))
             
     return render_template('student/lessonRecords.html', lesson_records=lesson_records, user_timezone=user_timezone)
 
 
+@app.route('/search')
+@login_required
+def search():
+    """
+    Search the current user's lesson records by summary, feedback, words and phrases.
+
+    Teachers can pass student_id to only search their lessons with one student.
+
+    Returns:
+        Response: The rendered template with the best matching lessons first.
+    """
+    user_type = session.get('user_type')
+    if user_type == 'teacher':
+        user = get_teacher_by_id(session['user_id'])
+    elif user_type == 'student':
+        user = get_student_by_id(session['user_id'])
+    else:
+        return redirect(url_for('index'))
+    if user is None:
+        app.logger.error(f"User with ID {session['user_id']} not found.")
+        return render_template('404.html'), 404
+
+    query = request.args.get('q', '').strip()
+    student_id = request.args.get('student_id', type=int) if user_type == 'teacher' else None
+    page = max(request.args.get('page', 1, type=int), 1)
+    hits, has_next = [], False
+    search_enabled = search_available()
+    if query and search_enabled:
+        hits, has_next = search_lesson_records(user.id, user_type, query, user.timezone, student_id=student_id, page=page)
+
+    return render_template(
+        'search.html',
+        query=query,
+        hits=hits,
+        page=page,
+        has_next=has_next,
+        student_id=student_id,
+        search_enabled=search_enabled)
+
+
+@app.route('/student/flashcards')
+@login_required
+def student_flashcards():
+    """
+    Display the vocabulary review page for the student.
+
+    The cards themselves are fetched and graded through /api/reviews.
+
+    Returns:
+        Response: The rendered template for the student's vocabulary review.
+    """
+    if session.get('user_type') != 'student':
+        return redirect(url_for('index'))
+
+    return render_template('student/flashcards.html', grades=GRADES)
+
+
+@app.route('/api/reviews/due', methods=['GET'])
+@login_required
+def due_reviews():
+    """
+    Retrieve the words and phrases the student has due for review.
+
+    Returns:
+        Response: JSON response with the due items, most overdue first, and deck counts.
+    """
+    if session.get('user_type') != 'student':
+        return jsonify({'error': 'Not logged in'}), 401
+
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    return jsonify(get_due_reviews(session['user_id'], limit=limit))
+
+
+@app.route('/api/reviews/<int:lexeme_id>', methods=['POST'])
+@login_required
+def grade_review(lexeme_id):
+    """
+    Record the student's grade for a reviewed word or phrase.
+
+    Expects JSON with a 'grade', either 0-5 or one of 'again', 'hard', 'good' and 'easy'.
+
+    Args:
+        lexeme_id (int): The ID of the word or phrase reviewed.
+
+    Returns:
+        Response: JSON response with the status and the item's next due time.
+    """
+    if session.get('user_type') != 'student':
+        return jsonify({'status': 'error', 'message': 'Not logged in'}), 401
+
+    data = request.get_json(silent=True) or {}
+    grade = data.get('grade')
+    if isinstance(grade, str):
+        grade = GRADES.get(grade)
+    result = record_review(session['user_id'], lexeme_id, grade)
+    if result['status'] == 'error':
+        return jsonify(result), 404 if result['message'] == 'Review item not found' else 400
+    return jsonify(result)
+
+
 @app.route('/student/editStudentProfile', methods=['GET', 'POST'])
 @login_required
 def edit_student_profile():
@@ -765,32 +873,24 @@ def student_book_lesson():
     start_of_week_local = start_of_week_utc.astimezone(user_timezone)
     end_of_week_local = end_of_week_utc.astimezone(user_timezone)
     if request.method == 'POST':
-        available_slots_dict = session.get('available_slots', None)
+        available_slots_dict = slot_snapshots.load(form.snapshot.data, student.id)
         if available_slots_dict is None:
-            return redirect(url_for('login'))
-
-        available_slots = [
-            type('LessonSlot', (object,), {
-                'id': slot_dict['id'],
-                'start_time': datetime.fromisoformat(slot_dict['start_time']),
-                'end_time': datetime.fromisoformat(slot_dict['end_time']),
-                'teacher': type('Teacher', (object,), {
-                    'id': slot_dict['teacher_id'],
-                    'username': slot_dict['teacher_username']
-                })()
-            })()
-            for slot_dict in available_slots_dict
-        ]
+            flash('Your lesson list expired. Please choose a slot again.', 'error')
+            return redirect(url_for('student_book_lesson'))
+
+        available_slots = convert_dict_to_slots(available_slots_dict)
     else:
         teacher_id_str = request.args.get('teacher_id')
         teacher_id = int(teacher_id_str) if teacher_id_str is not None else None
-        available_slots = fetch_available_slots(student, start_of_week_utc, end_of_week_utc, teacher_id)
+        available_slots = convert_slots_to_views(fetch_available_slots(student, start_of_week_utc, end_of_week_utc, teacher_id))
         available_slots_dict = convert_slots_to_dict(available_slots)
-        session['available_slots'] = available_slots_dict
+        form.snapshot.data = slot_snapshots.save(student.id, available_slots_dict)
 
-    for slot in available_slots:
-        slot.start_time = ensure_timezone_aware(slot.start_time, student.timezone)
-        slot.end_time = ensure_timezone_aware(slot.end_time, student.timezone)
+    start_times = localize_utc_times([slot.start_time for slot in available_slots], user_timezone.zone)
+    end_times = localize_utc_times([slot.end_time for slot in available_slots], user_timezone.zone)
+    for slot, start_time, end_time in zip(available_slots, start_times, end_times):
+        slot.start_time = start_time
+        slot.end_time = end_time
         
     current_time = datetime.now(user_timezone)
     
@@ -804,7 +904,7 @@ def student_book_lesson():
     form.teacher.choices = [(teacher.id, teacher.username) for teacher in available_teachers]
 
     if request.method == 'POST' and form.validate_on_submit():
-        lesson_record, error_message = update_student_booking(session, form, student, current_time)
+        lesson_record, error_message = update_student_booking(form, student, current_time)
         if error_message:
             print(error_message)
             return render_template(
@@ -831,6 +931,7 @@ def student_book_lesson():
         end_of_week=end_of_week_local)
 
 @app.route('/getSlots/<int:teacher_id>', methods=['GET'])
+@etag_conditional(student_slots_version)
 def get_slots(teacher_id):
     """
     Retrieve available lesson slots for a specific teacher.
@@ -856,6 +957,35 @@ def get_slots(teacher_id):
     return jsonify(slots_dict)
 
 
+@app.route('/api/availability', methods=['GET'])
+@login_required
+@etag_conditional(student_slots_version)
+def weekly_availability():
+    """
+    Retrieve every teacher's open lesson slots for a week in one response.
+
+    The payload is columnar (parallel arrays per field) and the booking page filters it
+    by teacher in the browser, replacing a /getSlots round trip per teacher change.
+
+    Returns:
+        Response: JSON response with the week's teachers and open slots.
+    """
+    if session.get('user_type') != 'student':
+        return jsonify({'error': 'Not logged in'}), 401
+
+    student = db.session.get(Student, session['user_id'])
+    if student is None:
+        return jsonify({'error': 'Student not found'}), 404
+
+    week_offset = request.args.get('week_offset', 0, type=int)
+    start_of_week, end_of_week = get_week_boundaries(student.timezone, week_offset)
+    user_timezone = get_user_timezone(student.timezone)
+    availability = fetch_weekly_availability(student, start_of_week, end_of_week, user_timezone)
+    availability['week_offset'] = week_offset
+
+    return jsonify(availability)
+
+
 
 @app.teardown_appcontext
 def shutdown_session(exception=None):
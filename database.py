@@ -3,13 +3,128 @@ database.py
 
 This module initializes the SQLAlchemy and Flask-Migrate extensions for use with the Flask application.
 These extensions provide ORM capabilities and database migration support, respectively.
+Connection settings (URI, pool sizing, SQLite pragmas) come from database_config.py.
+
+Queries run inside read_only() go to the read replica, if one is configured, unless the
+current user wrote to the primary within the last REPLICA_STICKY_SECONDS.
 """
 
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import current_app, has_request_context, session as flask_session
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from database_config import REPLICA_BIND_KEY, configure_database, register_sqlite_pragmas
+
+# Key in the Flask session holding the time of the user's last write to the primary
+LAST_WRITE_SESSION_KEY = '_db_last_write'
+
+_read_only_depth = ContextVar('read_only_depth', default=0)
+
+
+def _recently_wrote():
+    """
+    Check whether the current user wrote to the primary within the sticky window.
+    """
+    if not has_request_context():
+        return False
+    last_write = flask_session.get(LAST_WRITE_SESSION_KEY)
+    return last_write is not None and time.time() - last_write < current_app.config['REPLICA_STICKY_SECONDS']
+
+
+class RoutingSession(Session):
+    """
+    A session that sends reads made inside read_only() to the replica bind.
+    Flushes and anything outside read_only() always use the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _read_only_depth.get() and not self._flushing:
+            replica = self._db.engines.get(REPLICA_BIND_KEY)
+            if replica is not None and not _recently_wrote():
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _note_flush(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _note_bulk_write(orm_execute_state):
+    # Bulk UPDATE/DELETE/INSERT statements bypass the flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        orm_execute_state.session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _mark_user_wrote(session):
+    if session.info.pop('wrote', False) and has_request_context():
+        flask_session[LAST_WRITE_SESSION_KEY] = time.time()
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _forget_write(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('wrote', None)
+
+
+@contextmanager
+def read_only():
+    """
+    Route the queries run inside this block (or decorated function) to the read replica.
+    Falls back to the primary when no replica is configured or the user has just written.
+    """
+    token = _read_only_depth.set(_read_only_depth.get() + 1)
+    try:
+        yield
+    finally:
+        _read_only_depth.reset(token)
+
+
+def insert_ignoring_conflicts(model, *index_elements):
+    """
+    Build an INSERT for a model that skips rows clashing with a unique index
+    (ON CONFLICT DO NOTHING), in the dialect of the primary database.
+
+    Unlike adding the object inside db.session.begin_nested(), the statement runs in the
+    session's own transaction: pysqlite only emits BEGIN before a write, so a SAVEPOINT
+    opened as a transaction's first write commits as soon as it is released.
+
+    Args:
+        model: The mapped class to insert into.
+        *index_elements (str): The columns of the unique index a clash is detected on.
+
+    Returns:
+        Insert: The statement, to complete with .values().
+    """
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    return dialect.insert(model).on_conflict_do_nothing(index_elements=list(index_elements))
+
 
 # Initialize the SQLAlchemy extension
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # Initialize the Flask-Migrate extension
 migrate = Migrate()
+
+
+def init_database(app):
+    """
+    Configure the database connection and bind the extensions to the app.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    configure_database(app)
+    db.init_app(app)
+    migrate.init_app(app, db)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            register_sqlite_pragmas(engine, app.config['SQLITE_PRAGMAS'])
@@ -0,0 +1,124 @@
+"""
+database_config.py
+
+This module builds the database configuration used by database.py.
+The connection URI and pool sizes are read from the environment, so a PostgreSQL server can
+replace the default SQLite file without code changes, and every SQLite connection is tuned
+with pragmas suited to several app workers sharing one database file. Setting
+DATABASE_REPLICA_URL adds a read replica bind that read-only helpers are routed to.
+"""
+
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+DEFAULT_DATABASE_URI = 'sqlite:///site.db'
+
+# Bind key of the optional read replica used by database.read_only
+REPLICA_BIND_KEY = 'replica'
+
+# How long a user's reads stay on the primary after they write, so they see their own changes
+DEFAULT_REPLICA_STICKY_SECONDS = 10
+
+# Applied to every new SQLite connection. WAL lets readers carry on while a writer commits,
+# and busy_timeout makes a blocked writer wait rather than fail with "database is locked".
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 268435456,
+    'cache_size': -20000,
+}
+
+
+def _normalize_uri(uri):
+    # Some hosts still hand out postgres:// URIs, which SQLAlchemy no longer accepts
+    if uri and uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def get_database_uri():
+    """
+    Read the database URI from DATABASE_URL, defaulting to the SQLite file in the instance folder.
+
+    Returns:
+        str: The SQLAlchemy database URI.
+    """
+    return _normalize_uri(os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URI))
+
+
+def get_replica_uri():
+    """
+    Read the read replica URI from DATABASE_REPLICA_URL.
+
+    Returns:
+        str: The SQLAlchemy database URI, or None if no replica is configured.
+    """
+    return _normalize_uri(os.environ.get('DATABASE_REPLICA_URL'))
+
+
+def get_engine_options(uri):
+    """
+    Build the engine options (pool sizing and connect arguments) for a database URI.
+    Pool sizes can be tuned with DB_POOL_SIZE, DB_MAX_OVERFLOW and DB_POOL_RECYCLE.
+
+    Args:
+        uri (str): The SQLAlchemy database URI.
+
+    Returns:
+        dict: Keyword arguments for create_engine.
+    """
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            # In-memory databases use a single static connection
+            return {}
+        return {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+            'connect_args': {'timeout': DEFAULT_SQLITE_PRAGMAS['busy_timeout'] / 1000},
+        }
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
+
+def configure_database(app):
+    """
+    Fill in the database settings the app has not set explicitly.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', get_database_uri())
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', get_engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+    app.config.setdefault('SQLITE_PRAGMAS', DEFAULT_SQLITE_PRAGMAS)
+    app.config.setdefault('REPLICA_STICKY_SECONDS', int(os.environ.get('REPLICA_STICKY_SECONDS', DEFAULT_REPLICA_STICKY_SECONDS)))
+
+    replica_uri = get_replica_uri()
+    if replica_uri:
+        binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+        binds.setdefault(REPLICA_BIND_KEY, {'url': replica_uri, **get_engine_options(replica_uri)})
+
+
+def register_sqlite_pragmas(engine, pragmas):
+    """
+    Apply the given pragmas to every new connection made by a SQLite engine.
+
+    Args:
+        engine (Engine): The SQLAlchemy engine.
+        pragmas (dict): Pragma names and values.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
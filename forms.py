@@ -151,6 +151,8 @@ class StudentLessonSlotForm(FlaskForm):
     """
     teacher = SelectField('Teacher', coerce=int, validators=[DataRequired()])
     lesson_slot = SelectField('Lesson Slot', coerce=int, validators=[DataRequired()])
+    # Names the server-side list of slots the page was rendered with
+    snapshot = HiddenField()
     submit = SubmitField('Submit')
 
 
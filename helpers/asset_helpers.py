@@ -0,0 +1,245 @@
+# asset_helpers.py
+"""
+Fingerprinted static assets.
+
+`flask assets build` copies the site's own static files (stylesheet, marketing images,
+favicon) to static/dist/assets under names that carry a hash of their content,
+recompressing images and writing gzip (and brotli, if installed) copies of text files,
+and records the names in static/dist/manifest.json. With a manifest in place,
+url_for('static', ...) links to the fingerprinted file, which is served with
+Cache-Control: immutable, so browsers keep it until the next build changes its name.
+Without a manifest every static URL is left as it is. The responsive variants of uploaded
+profile pictures are named after their content by the image pipeline, and are served
+immutable too.
+"""
+import gzip
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import AppGroup
+from helpers.file_helpers import JPEG_QUALITY, is_image_variant
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Images are then fingerprinted without being recompressed
+    Image = None
+
+try:
+    import brotli
+except ImportError:  # gzip copies only
+    brotli = None
+
+# Relative to the static folder
+ASSET_OUTPUT_DIR = 'dist/assets'
+ASSET_MANIFEST_FILE = 'dist/manifest.json'
+
+# Not part of the build: sources, earlier output, user uploads (named by the image
+# pipeline) and the screenshots the README links to
+EXCLUDED_DIRS = ('src', ASSET_OUTPUT_DIR, 'img/teacherImg', 'img/studentImg', 'img/docImg')
+
+# Images wider than this are scaled down; the widest slot they fill is about 800px
+ASSET_IMAGE_MAX_WIDTH = 1600
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.ico')
+
+# Content-Encoding values, in order of preference, and the suffix of their copies
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _fingerprint(path, data):
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{extension}"
+
+
+def _recompress_image(path, data):
+    # Returns the original bytes whenever re-encoding does not make the file smaller
+    extension = os.path.splitext(path)[1].lower()
+    if Image is None or extension not in ('.jpg', '.jpeg', '.png'):
+        return data
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.width > ASSET_IMAGE_MAX_WIDTH:
+            image = image.resize((ASSET_IMAGE_MAX_WIDTH, round(image.height * ASSET_IMAGE_MAX_WIDTH / image.width)), Image.LANCZOS)
+        output = io.BytesIO()
+        if extension == '.png':
+            image.save(output, 'PNG', optimize=True)
+        else:
+            image.convert('RGB').save(output, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return output.getvalue() if output.tell() < len(data) else data
+
+
+def _compressed_copies(data):
+    copies = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        copies['br'] = brotli.compress(data, quality=11)
+    # A copy is only worth serving if it is smaller
+    return {encoding: copy for encoding, copy in copies.items() if len(copy) < len(data)}
+
+
+def _source_files(static_folder):
+    for root, dirs, files in os.walk(static_folder):
+        relative_root = os.path.relpath(root, static_folder).replace(os.sep, '/')
+        relative_root = '' if relative_root == '.' else relative_root + '/'
+        dirs[:] = sorted(d for d in dirs if relative_root + d not in EXCLUDED_DIRS)
+        for name in sorted(files):
+            if relative_root + name != ASSET_MANIFEST_FILE:
+                yield relative_root + name
+
+
+def build_assets(static_folder):
+    """
+    Write the fingerprinted copy of every static asset and a manifest of their names.
+
+    Output from the previous build is kept, so pages rendered before a restart still find
+    their assets; anything older is removed.
+
+    Args:
+        static_folder (str): The absolute path of the static folder.
+
+    Returns:
+        dict: The number of assets, their total size before and after, and the number of
+        stale files removed.
+    """
+    manifest_path = os.path.join(static_folder, ASSET_MANIFEST_FILE)
+    previous = _read_manifest(manifest_path)
+
+    assets = {}
+    original_bytes = built_bytes = 0
+    for path in _source_files(static_folder):
+        with open(os.path.join(static_folder, path), 'rb') as f:
+            data = f.read()
+        built = _recompress_image(path, data)
+        output_path = f"{ASSET_OUTPUT_DIR}/{_fingerprint(path, built)}"
+        files = {output_path: built}
+        encodings = {}
+        if path.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+            for encoding, copy in _compressed_copies(built).items():
+                suffix = dict(ENCODINGS)[encoding]
+                files[output_path + suffix] = copy
+                encodings[encoding] = output_path + suffix
+        for file_path, content in files.items():
+            full_path = os.path.join(static_folder, file_path)
+            if not os.path.exists(full_path):
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                with open(full_path, 'wb') as f:
+                    f.write(content)
+        assets[path] = {'file': output_path, 'encodings': encodings}
+        original_bytes += len(data)
+        built_bytes += len(built)
+
+    temp_path = f"{manifest_path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump({'assets': assets}, f, indent=2, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+    keep = set()
+    for entry in (*assets.values(), *previous.values()):
+        keep.add(entry['file'])
+        keep.update(entry['encodings'].values())
+    removed = 0
+    output_dir = os.path.join(static_folder, ASSET_OUTPUT_DIR)
+    for root, _, files in os.walk(output_dir):
+        for name in files:
+            full_path = os.path.join(root, name)
+            if os.path.relpath(full_path, static_folder).replace(os.sep, '/') not in keep:
+                os.remove(full_path)
+                removed += 1
+
+    return {'assets': len(assets), 'original_bytes': original_bytes, 'built_bytes': built_bytes, 'removed': removed}
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)['assets']
+    except FileNotFoundError:
+        return {}
+    except (ValueError, KeyError) as e:
+        logging.error(f"Ignoring asset manifest {manifest_path}: {e}")
+        return {}
+
+
+class AssetManifest:
+    """
+    Maps static filenames to their fingerprinted copies and serves those copies.
+
+    Loaded once from the manifest when the app starts; run `flask assets build` and restart
+    to pick up changed files. STATIC_ASSET_MAX_AGE sets how long browsers keep an asset.
+    """
+    def __init__(self):
+        self.assets = {}
+        self._built = {}
+
+    def init_app(self, app):
+        app.config.setdefault('STATIC_ASSET_MAX_AGE', 365 * 24 * 60 * 60)
+        self.load(os.path.join(app.static_folder, ASSET_MANIFEST_FILE))
+        app.url_defaults(self._fingerprint_static_url)
+        app.view_functions['static'] = self.send_static_file
+        if self.assets:
+            app.logger.info(f"Serving {len(self.assets)} fingerprinted static assets")
+
+    def load(self, manifest_path):
+        self.assets = _read_manifest(manifest_path)
+        # Fingerprinted file -> the encoded copies available for it
+        self._built = {entry['file']: entry['encodings'] for entry in self.assets.values()}
+
+    def _fingerprint_static_url(self, endpoint, values):
+        if endpoint == 'static' and values.get('filename') in self.assets:
+            values['filename'] = self.assets[values['filename']]['file']
+
+    def send_static_file(self, filename):
+        """
+        The static route. Fingerprinted files are sent precompressed when the browser
+        accepts it, and marked immutable, as are image variants; everything else is sent
+        as Flask would.
+        """
+        if filename not in self._built:
+            response = current_app.send_static_file(filename)
+            if is_image_variant(filename):
+                _cache_forever(response)
+            return response
+
+        encodings = self._built[filename]
+        encoding = next((encoding for encoding, _ in ENCODINGS
+                         if encoding in encodings and request.accept_encodings[encoding]), None)
+        if encoding is None:
+            response = send_from_directory(current_app.static_folder, filename)
+        else:
+            response = send_from_directory(current_app.static_folder, encodings[encoding],
+                                           mimetype=mimetypes.guess_type(filename)[0])
+            response.content_encoding = encoding
+        if encodings:
+            response.vary.add('Accept-Encoding')
+        _cache_forever(response)
+        return response
+
+
+def _cache_forever(response):
+    # For files whose name changes whenever their content does
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['STATIC_ASSET_MAX_AGE']
+    response.cache_control.immutable = True
+
+
+static_assets = AssetManifest()
+
+
+assets_cli = AppGroup('assets', help='Static asset commands.')
+
+
+@assets_cli.command('build')
+def build_command():
+    """
+    Fingerprint and compress the static assets and write their manifest (flask assets build).
+    """
+    if Image is None:
+        click.echo('Pillow is not installed; images are copied without recompressing.')
+    metrics = build_assets(current_app.static_folder)
+    for key, value in metrics.items():
+        click.echo(f"{key}: {value}")
@@ -0,0 +1,129 @@
+# conditional_request_helpers.py
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from flask import make_response, request, session
+from flask_login import current_user
+from sqlalchemy import case, func, select
+from database import db
+from models import LessonSlot, RecurringAvailability, RecurringAvailabilityOverride, Student, Teacher
+from helpers.time_helpers import get_week_boundaries, to_epoch_minutes
+
+
+def etag_conditional(get_version, cache_control='private, no-cache'):
+    """
+    Decorate a GET route so it answers If-None-Match from a cheap version stamp.
+
+    get_version is called with the view's arguments before the view runs. Its result is
+    hashed with the request path into the ETag, and when the client already holds that
+    ETag a 304 is returned without running the view. Returning None skips validation for
+    that request, e.g. when the user is not allowed to see the data.
+
+    Args:
+        get_version (callable): Returns a hashable stamp that changes whenever the
+            response would, or None.
+        cache_control (str, optional): The Cache-Control header for 200 and 304 responses.
+            Defaults to 'private, no-cache', so the browser revalidates every time.
+
+    Returns:
+        callable: The decorator.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = get_version(*args, **kwargs)
+            if version is None:
+                return view(*args, **kwargs)
+
+            etag = hashlib.sha1(repr((request.path, version)).encode()).hexdigest()
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return wrapper
+    return decorator
+
+
+def slot_week_version(start_of_week_utc, end_of_week_utc, teacher_id=None):
+    """
+    Build a version stamp for the lesson slots in a week, in a single aggregate query.
+
+    Every insert or delete changes the slot count or highest ID, and every booking or
+    cancellation changes the sum of the booked slots' IDs. Recurring availability and its
+    closed occurrences are counted the same way. The stamp also moves when the next slot
+    of the week starts, or the hour turns, since slots in the past are shown differently.
+    It is read from the database, so it is the same in every worker process.
+
+    Args:
+        start_of_week_utc (datetime): The start of the week in UTC.
+        end_of_week_utc (datetime): The end of the week in UTC.
+        teacher_id (int, optional): The ID of the teacher, or None for every teacher.
+
+    Returns:
+        tuple: The version stamp.
+    """
+    now_minute = to_epoch_minutes(datetime.now(timezone.utc))
+    start_of_week = start_of_week_utc.astimezone(timezone.utc).replace(tzinfo=None)
+    end_of_week = end_of_week_utc.astimezone(timezone.utc).replace(tzinfo=None)
+
+    slot_criteria = [LessonSlot.start_minute.between(to_epoch_minutes(start_of_week), to_epoch_minutes(end_of_week))]
+    recurring_criteria = []
+    override_criteria = [RecurringAvailabilityOverride.start_time.between(start_of_week, end_of_week)]
+    if teacher_id is not None:
+        slot_criteria.append(LessonSlot.teacher_id == teacher_id)
+        recurring_criteria.append(RecurringAvailability.teacher_id == teacher_id)
+        override_criteria.append(RecurringAvailabilityOverride.recurring_availability_id.in_(
+            select(RecurringAvailability.id).where(*recurring_criteria)
+        ))
+
+    slots = select(
+        func.count(LessonSlot.id),
+        func.max(LessonSlot.id),
+        func.sum(case((LessonSlot.is_booked == True, LessonSlot.id), else_=0)),
+        func.min(case((LessonSlot.start_minute > now_minute, LessonSlot.start_minute)))
+    ).where(*slot_criteria)
+    recurring = select(func.count(RecurringAvailability.id), func.max(RecurringAvailability.id)).where(*recurring_criteria)
+    overrides = select(func.count(RecurringAvailabilityOverride.id), func.max(RecurringAvailabilityOverride.id)).where(*override_criteria)
+
+    return (
+        tuple(db.session.execute(slots).one()),
+        tuple(db.session.execute(recurring).one()),
+        tuple(db.session.execute(overrides).one()),
+        now_minute // 60
+    )
+
+
+def teacher_slots_version():
+    """
+    Version stamp of the teacher's week grid served by /teacher/lessonSlots to XHR requests.
+    """
+    if request.headers.get('X-Requested-With') != 'XMLHttpRequest' or session.get('user_type') != 'teacher':
+        return None
+    teacher = db.session.get(Teacher, current_user.id)
+    if teacher is None:
+        return None
+    week_offset = request.args.get('week_offset', 0, type=int)
+    start_of_week_utc, end_of_week_utc = get_week_boundaries(teacher.timezone, week_offset)
+    return (teacher.id, teacher.timezone, week_offset, slot_week_version(start_of_week_utc, end_of_week_utc, teacher.id))
+
+
+def student_slots_version(teacher_id=None):
+    """
+    Version stamp of the open slots a student sees in a week, for one teacher or all.
+
+    The slots of every teacher are stamped either way, because a student's booking with
+    one teacher hides other teachers' slots at the same time.
+    """
+    if 'user_id' not in session or session.get('user_type') != 'student':
+        return None
+    student = db.session.get(Student, session['user_id'])
+    if student is None:
+        return None
+    week_offset = request.args.get('week_offset', 0, type=int)
+    start_of_week_utc, end_of_week_utc = get_week_boundaries(student.timezone, week_offset)
+    return (student.id, student.timezone, teacher_id, week_offset, slot_week_version(start_of_week_utc, end_of_week_utc))
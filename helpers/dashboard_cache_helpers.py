@@ -0,0 +1,168 @@
+# dashboard_cache_helpers.py
+import threading
+from datetime import datetime, timezone
+from sqlalchemy import event, inspect
+from sqlalchemy.orm.util import identity_key
+from database import RoutingSession
+from helpers.slot_snapshot_helpers import DatabaseSnapshotBackend, InMemorySnapshotBackend
+from models import Booking, LessonRecord, LessonRecordLexeme, LessonSlot, Student, StudentProfile, Teacher, TeacherProfile
+
+# Invalidating this key drops every cached dashboard
+ALL_DASHBOARDS = ('*', None)
+
+# Bulk statements against these models can change what any dashboard shows
+BULK_INVALIDATING_MODELS = (Booking, LessonRecord, LessonRecordLexeme, StudentProfile, TeacherProfile)
+
+
+class DashboardCache:
+    """
+    Per-user cache of the data shown on /teacher/dashboard and /student/dashboard.
+
+    Entries are keyed by (user_type, user_id, timezone) plus a per-user version. Committing a
+    change to a booking, lesson slot, lesson record or its words and phrases bumps the version
+    of every user involved, so their next visit rebuilds the data.
+    An entry also expires when the next upcoming lesson on it starts.
+
+    The versions live in version_backend, the cache_entry table by default, so a write
+    committed by one worker changes the keys every worker builds. Entries stay in the
+    backend, an in-process LRU unless a shared one is passed in.
+    Configured from DASHBOARD_CACHE_MAX_ENTRIES and DASHBOARD_CACHE_TTL_SECONDS.
+    """
+    def __init__(self, backend=None, version_backend=None):
+        self.backend = backend
+        self.version_backend = version_backend
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        self._lock = threading.Lock()
+
+    def init_app(self, app, backend=None, version_backend=None):
+        app.config.setdefault('DASHBOARD_CACHE_MAX_ENTRIES', 2048)
+        app.config.setdefault('DASHBOARD_CACHE_TTL_SECONDS', 300)
+        if backend is not None:
+            self.backend = backend
+        elif self.backend is None:
+            self.backend = InMemorySnapshotBackend(
+                max_entries=app.config['DASHBOARD_CACHE_MAX_ENTRIES'],
+                ttl_seconds=app.config['DASHBOARD_CACHE_TTL_SECONDS']
+            )
+        if version_backend is not None:
+            self.version_backend = version_backend
+        elif self.version_backend is None:
+            self.version_backend = DatabaseSnapshotBackend()
+
+    @staticmethod
+    def _version_key(user_type, user_id):
+        return f"dashboard-version:{user_type}:{user_id if user_id is not None else ''}"
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def make_key(self, user_type, user_id, timezone_str):
+        versions = self.version_backend.get_many([self._version_key(*ALL_DASHBOARDS), self._version_key(user_type, user_id)])
+        all_version, user_version = (version or 0 for version in versions)
+        return f"{user_type}:{user_id}:{timezone_str}:{all_version}.{user_version}"
+
+    def get_or_build(self, user_type, user_id, timezone_str, build):
+        """
+        Return the cached dashboard data for a user, building and storing it on a miss.
+
+        Args:
+            user_type (str): 'student' or 'teacher'.
+            user_id (int): The ID of the user.
+            timezone_str (str): The timezone the times are displayed in.
+            build (callable): Builds the dashboard data; called with no arguments.
+
+        Returns:
+            dict: The dashboard data.
+        """
+        key = self.make_key(user_type, user_id, timezone_str)
+        data = self.backend.get(key)
+        if data is not None:
+            self._count('hits')
+            return data
+
+        self._count('misses')
+        data = build()
+        self.backend.set(key, data, ttl_seconds=self._ttl_for(data))
+        return data
+
+    def _ttl_for(self, data):
+        # An upcoming lesson becomes a past (or outstanding) one at its start time
+        ttl_seconds = self.backend.ttl_seconds
+        upcoming = data.get('upcoming_lessons')
+        if upcoming:
+            seconds_to_start = (upcoming[0].start_time - datetime.now(timezone.utc)).total_seconds()
+            ttl_seconds = max(1, min(ttl_seconds, seconds_to_start))
+        return ttl_seconds
+
+    def invalidate(self, user_type, user_id):
+        """
+        Drop the cached dashboards of one user, or of everyone when given ALL_DASHBOARDS.
+        """
+        self.version_backend.incr(self._version_key(user_type, user_id))
+        self._count('invalidations')
+
+
+dashboard_cache = DashboardCache()
+
+
+def _affected_dashboards(session, obj):
+    """
+    Yield the (user_type, user_id) keys whose dashboards show the given object.
+    """
+    if isinstance(obj, LessonSlot):
+        yield ('teacher', obj.teacher_id)
+    elif isinstance(obj, Booking):
+        yield ('student', obj.student_id)
+    elif isinstance(obj, LessonRecord):
+        yield ('teacher', obj.teacher_id)
+        yield ('student', obj.student_id)
+    elif isinstance(obj, LessonRecordLexeme):
+        record = session.identity_map.get(identity_key(LessonRecord, obj.lesson_record_id))
+        if record is None:
+            yield ALL_DASHBOARDS
+        else:
+            yield from _affected_dashboards(session, record)
+    elif obj in session.new:
+        # A new user or profile is not on anyone's dashboard yet
+        return
+    elif isinstance(obj, (StudentProfile, TeacherProfile)):
+        # Names and pictures appear on the other party's dashboard too
+        yield ALL_DASHBOARDS
+    elif isinstance(obj, (Student, Teacher)):
+        if inspect(obj).attrs.username.history.has_changes():
+            yield ALL_DASHBOARDS
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _collect_dashboard_changes(session, flush_context):
+    changed = session.info.setdefault('dashboard_changes', set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        changed.update(_affected_dashboards(session, obj))
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _collect_bulk_dashboard_changes(orm_execute_state):
+    # Bulk slot and student updates (claiming a slot, taking a credit, editing unbooked slots)
+    # always come with flushed Booking/LessonRecord rows or do not show on a dashboard
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, BULK_INVALIDATING_MODELS):
+        orm_execute_state.session.info.setdefault('dashboard_changes', set()).add(ALL_DASHBOARDS)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _invalidate_changed_dashboards(session):
+    if session.in_nested_transaction():
+        # A released SAVEPOINT; the outer transaction still holds its changes (and on SQLite the write lock)
+        return
+    for user_type, user_id in session.info.pop('dashboard_changes', ()):
+        dashboard_cache.invalidate(user_type, user_id)
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _discard_dashboard_changes(session, transaction):
+    # Rolled back changes are dropped here; committed ones were consumed by after_commit
+    if transaction.parent is None:
+        session.info.pop('dashboard_changes', None)
@@ -1,10 +1,14 @@
 # dashboard_helpers.py
 from datetime import datetime, timezone
-from sqlalchemy.orm import joinedload
-from models import LessonRecord, LessonSlot, Booking, Student, Teacher
-from helpers.time_helpers import ensure_timezone_aware
+from sqlalchemy import select
+from database import db, read_only
+from models import LessonRecord, LessonSlot, Booking, Student, StudentProfile, Teacher, TeacherProfile
+from helpers.lesson_view_helpers import BookingView, UpcomingLessonView, fetch_lesson_record_views, make_user_view
+from helpers.time_helpers import localize_utc_times
+from helpers.teacher_helpers import get_outstanding_lessons
 
 
+@read_only()
 def get_most_recent_lesson_record(user_id, user_type, timezone_str):
     """
     Retrieve the most recent lesson record for the given user.
@@ -15,37 +19,19 @@ def get_most_recent_lesson_record(user_id, user_type, timezone_str):
         timezone_str (str): The timezone string to make times timezone aware.
 
     Returns:
-        LessonRecord: The most recent lesson record.
+        LessonRecordView: The most recent lesson record, or None.
     """
-    if user_type == 'student':
-        most_recent_record = LessonRecord.query.filter(
-            LessonRecord.student_id == user_id,
-            LessonRecord.lesson_slot.has(LessonSlot.start_time <= datetime.now(timezone.utc))
-        ).options(
-            joinedload(LessonRecord.teacher).joinedload(Teacher.profile),
-            joinedload(LessonRecord.lesson_slot),
-            joinedload(LessonRecord.new_words),
-            joinedload(LessonRecord.new_phrases) 
-        ).order_by(LessonRecord.lastEditTime.desc()).first()
-    elif user_type == 'teacher':
-        most_recent_record = LessonRecord.query.filter(
-            LessonRecord.teacher_id == user_id,
-            LessonRecord.lesson_slot.has(LessonSlot.start_time <= datetime.now(timezone.utc))
-        ).options(
-            joinedload(LessonRecord.student).joinedload(Student.profile),
-            joinedload(LessonRecord.lesson_slot),
-            joinedload(LessonRecord.new_words),
-            joinedload(LessonRecord.new_phrases) 
-        ).order_by(LessonRecord.lastEditTime.desc()).first()
-    
-    if most_recent_record:
-        most_recent_record.lastEditTime = ensure_timezone_aware(most_recent_record.lastEditTime, timezone_str)
-        if most_recent_record.lesson_slot and most_recent_record.lesson_slot.start_time:
-            most_recent_record.lesson_slot.start_time = ensure_timezone_aware(most_recent_record.lesson_slot.start_time, timezone_str)
-    
-    return most_recent_record
+    owner = LessonRecord.student_id if user_type == 'student' else LessonRecord.teacher_id
+    records = fetch_lesson_record_views(
+        [owner == user_id, LessonSlot.start_time <= datetime.now(timezone.utc)],
+        [LessonRecord.lastEditTime.desc()],
+        timezone_str,
+        limit=1
+    )
+    return records[0] if records else None
 
 
+@read_only()
 def get_upcoming_lessons(user_id, user_type, timezone_str):
     """
     Retrieve the upcoming lessons for the given user.
@@ -56,25 +42,62 @@ def get_upcoming_lessons(user_id, user_type, timezone_str):
         timezone_str (str): The timezone string to make times timezone aware.
 
     Returns:
-        list: A list of upcoming LessonSlot objects.
+        list: A list of UpcomingLessonView objects. Students see the teacher of each lesson,
+              teachers see the booking and its student.
     """
+    now = datetime.now(timezone.utc)
     if user_type == 'student':
-        upcoming_lessons = LessonSlot.query.join(Booking).filter(
-            Booking.student_id == user_id,
-            LessonSlot.start_time >= datetime.now(timezone.utc)
-        ).options(
-            joinedload(LessonSlot.teacher).joinedload(Teacher.profile)
-        ).order_by(LessonSlot.start_time.asc()).all()
-    elif user_type == 'teacher':
-        upcoming_lessons = LessonSlot.query.filter(
-            LessonSlot.teacher_id == user_id,
-            LessonSlot.start_time >= datetime.now(timezone.utc),
-            LessonSlot.is_booked == True
-        ).options(
-            joinedload(LessonSlot.booking).joinedload(Booking.student).joinedload(Student.profile)
-        ).order_by(LessonSlot.start_time.asc()).all()
-    
-    for lesson in upcoming_lessons:
-        lesson.start_time = ensure_timezone_aware(lesson.start_time, timezone_str)
-    
-    return upcoming_lessons
+        rows = db.session.execute(
+            select(LessonSlot.id, LessonSlot.start_time, Teacher.id, Teacher.username, TeacherProfile.image_file)
+            .join(Booking, Booking.lesson_slot_id == LessonSlot.id)
+            .join(Teacher, LessonSlot.teacher_id == Teacher.id)
+            .outerjoin(TeacherProfile, TeacherProfile.teacher_id == Teacher.id)
+            .where(Booking.student_id == user_id, LessonSlot.start_time >= now)
+            .order_by(LessonSlot.start_time.asc())
+        ).all()
+        start_times = localize_utc_times([row.start_time for row in rows], timezone_str)
+        return [
+            UpcomingLessonView(slot_id, start_time, teacher=make_user_view(teacher_id, username, image_file))
+            for (slot_id, _, teacher_id, username, image_file), start_time in zip(rows, start_times)
+        ]
+
+    rows = db.session.execute(
+        select(LessonSlot.id, LessonSlot.start_time, Booking.id, Booking.lesson_record_id, Student.id, Student.username, StudentProfile.image_file)
+        .outerjoin(Booking, Booking.lesson_slot_id == LessonSlot.id)
+        .outerjoin(Student, Booking.student_id == Student.id)
+        .outerjoin(StudentProfile, StudentProfile.student_id == Student.id)
+        .where(LessonSlot.teacher_id == user_id, LessonSlot.start_time >= now, LessonSlot.is_booked == True)
+        .order_by(LessonSlot.start_time.asc())
+    ).all()
+    start_times = localize_utc_times([row.start_time for row in rows], timezone_str)
+    return [
+        UpcomingLessonView(
+            slot_id,
+            start_time,
+            booking=BookingView(lesson_record_id, make_user_view(student_id, username, image_file)) if booking_id is not None else None
+        )
+        for (slot_id, _, booking_id, lesson_record_id, student_id, username, image_file), start_time in zip(rows, start_times)
+    ]
+
+
+def get_dashboard_data(user_id, user_type, timezone_str):
+    """
+    Build the data shown on a user's dashboard. It is made of immutable views,
+    so it can be cached and shared between requests.
+
+    Args:
+        user_id (int): The ID of the user (student or teacher).
+        user_type (str): The type of the user ('student' or 'teacher').
+        timezone_str (str): The timezone string to make times timezone aware.
+
+    Returns:
+        dict: The most recent lesson record, the upcoming lessons and, for teachers,
+              the outstanding lessons.
+    """
+    data = {
+        'most_recent_record': get_most_recent_lesson_record(user_id, user_type, timezone_str),
+        'upcoming_lessons': get_upcoming_lessons(user_id, user_type, timezone_str)
+    }
+    if user_type == 'teacher':
+        data['outstanding_lessons'] = get_outstanding_lessons(user_id, timezone_str)
+    return data
@@ -1,13 +1,15 @@
-from models import LessonRecord, Teacher, Word, Phrase
+from models import LessonRecord, Lexeme, Teacher
 from forms import WordForm, PhraseForm
 from database import db
+from helpers.lexicon_helpers import set_lesson_lexemes
+from helpers.query_shape_helpers import EDIT_FORM
 from helpers.time_helpers import convert_to_utc
 from datetime import datetime, timezone
 
 
 def get_lesson_by_id(lesson_id):
     """
-    Fetch the lesson by its ID.
+    Fetch the lesson by its ID, with the student, words and phrases the edit form shows.
 
     Args:
         lesson_id (int): The ID of the lesson to fetch.
@@ -15,7 +17,7 @@ def get_lesson_by_id(lesson_id):
     Returns:
         LessonRecord: The lesson record if found, else None.
     """
-    return db.session.query(LessonRecord).get(lesson_id)
+    return db.session.get(LessonRecord, lesson_id, options=EDIT_FORM)
 
 
 def initialize_lesson_form(form, lesson):
@@ -55,20 +57,27 @@ def update_lesson_from_form(lesson, form):
     lesson.strengths = form.strengths.data
     lesson.areas_to_improve = form.areas_to_improve.data
 
-    # Clear the existing words and phrases
-    lesson.new_words.clear()
-    lesson.new_phrases.clear()
+    update_lesson_terms(
+        lesson,
+        [word_form.content.data for word_form in form.new_words],
+        [phrase_form.content.data for phrase_form in form.new_phrases]
+    )
 
-    # Add new words and phrases from the form
-    for word_form in form.new_words:
-        if word_form.content.data:
-            word = Word(content=word_form.content.data, lesson_record_id=lesson.id)
-            lesson.new_words.append(word)
 
-    for phrase_form in form.new_phrases:
-        if phrase_form.content.data:
-            phrase = Phrase(content=phrase_form.content.data, lesson_record_id=lesson.id)
-            lesson.new_phrases.append(phrase)
+def update_lesson_terms(lesson, words, phrases):
+    """
+    Set the words and phrases of a lesson, only changing the links that differ.
+
+    Terms are stored once in the lexicon and linked to the lesson, so adding or removing a
+    term leaves the other links alone.
+
+    Args:
+        lesson (LessonRecord): The lesson record to update.
+        words (list): The new words in order; blank entries are skipped.
+        phrases (list): The new phrases in order; blank entries are skipped.
+    """
+    set_lesson_lexemes(lesson, Lexeme.WORD, [word for word in words if word and word.strip()])
+    set_lesson_lexemes(lesson, Lexeme.PHRASE, [phrase for phrase in phrases if phrase and phrase.strip()])
 
 
 def update_last_edit_time(lesson, teacher_id):
@@ -1,16 +1,212 @@
+import hashlib
+import io
+import logging
 import os
-import secrets
+import re
+import threading
+import click
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from flask import current_app, session
+from flask.cli import AppGroup
 from flask_login import current_user
+from database import db
+from models import StudentProfile, TeacherProfile
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Without Pillow uploads are stored as they are, as before
+    Image = None
+
+# Widths of the responsive variants; each is written as WebP and JPEG
+IMAGE_WIDTHS = (320, 640, 960)
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+# Processed uploads are named after their content: <12 hex digits>.jpg, with variants
+# <hash>-<width>.jpg and <hash>-<width>.webp beside them
+_PROCESSED_NAME = re.compile(r'^([0-9a-f]{12})\.jpg$')
+_VARIANT_NAME = re.compile(r'^[0-9a-f]{12}-(\d+)\.(?:jpg|webp)$')
+
+# Folder under static/img, default image and profile model for each user type
+IMAGE_FOLDERS = {
+    'teacher': ('teacherImg', 'default.jpg', TeacherProfile),
+    'student': ('studentImg', 'default1.jpg', StudentProfile),
+}
+
+
+def _variant_name(content_hash, width, extension):
+    return f"{content_hash}-{width}.{extension}"
+
+
+def is_image_variant(path):
+    """
+    Check whether a static path names a responsive variant of an uploaded image.
+
+    A variant's name is taken from the upload's content and it is never rewritten, so it
+    can be cached for good. The <hash>.jpg it belongs to is not a variant: the pipeline
+    replaces it in place once the upload is processed.
+
+    Args:
+        path (str): The path relative to the static folder.
+
+    Returns:
+        bool: True for img/teacherImg or img/studentImg <hash>-<width>.jpg and .webp files.
+    """
+    folder, _, name = path.rpartition('/')
+    match = _VARIANT_NAME.match(name)
+    return (match is not None and int(match.group(1)) in IMAGE_WIDTHS
+            and folder in {f"img/{image_folder}" for image_folder, _, _ in IMAGE_FOLDERS.values()})
+
+
+def _write_atomically(path, save):
+    # Readers only ever see a missing file or a complete one
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        save(f)
+    os.replace(temp_path, path)
+
+
+def process_image(directory, content_hash, data):
+    """
+    Decode an upload once and write its resized WebP and JPEG variants.
+
+    The image is turned upright from its EXIF orientation and re-encoded without any
+    metadata, so camera and location data never reach the static folder. Images are never
+    scaled up: widths larger than the upload are skipped, and an upload narrower than every
+    width gets no variants. The full-size <hash>.jpg is written last, replacing the raw
+    upload that stood in for it.
+
+    Args:
+        directory (str): The absolute path of the image folder.
+        content_hash (str): The name of the image, from its content.
+        data (bytes): The uploaded file.
+    """
+    with Image.open(io.BytesIO(data)) as upload:
+        image = ImageOps.exif_transpose(upload)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        if image.mode == 'RGBA':
+            # JPEG has no alpha channel, so transparent areas become white
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+
+    # Widest first, so each variant is resized from the previous one instead of the original
+    resized = image
+    for width in sorted((width for width in IMAGE_WIDTHS if width <= image.width), reverse=True):
+        if resized.width > width:
+            resized = resized.resize((width, round(resized.height * width / resized.width)), Image.LANCZOS)
+        _write_atomically(os.path.join(directory, _variant_name(content_hash, width, 'jpg')),
+                          lambda f: resized.save(f, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True))
+        _write_atomically(os.path.join(directory, _variant_name(content_hash, width, 'webp')),
+                          lambda f: resized.save(f, 'WEBP', quality=WEBP_QUALITY, method=4))
+
+    largest = image
+    if image.width > max(IMAGE_WIDTHS):
+        largest = image.resize((max(IMAGE_WIDTHS), round(image.height * max(IMAGE_WIDTHS) / image.width)), Image.LANCZOS)
+    _write_atomically(os.path.join(directory, f"{content_hash}.jpg"),
+                      lambda f: largest.save(f, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True))
+
+
+class ImagePipeline:
+    """
+    Background worker pool that turns uploaded profile pictures into responsive variants.
+
+    The request that saves a profile only writes the raw upload under its final name and
+    queues the rest, so it returns without waiting for the resizing. The srcsets of the
+    IMAGE_VARIANTS_MAX_ENTRIES most recently shown images are kept, least recently used first out.
+    Configured from IMAGE_PIPELINE_WORKERS; 0 processes uploads inside the request.
+    """
+    def __init__(self, max_entries=1024):
+        self.executor = None
+        self.max_entries = max_entries
+        self._ready = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('IMAGE_PIPELINE_WORKERS', 2)
+        app.config.setdefault('IMAGE_VARIANTS_MAX_ENTRIES', 1024)
+        workers = app.config['IMAGE_PIPELINE_WORKERS']
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-pipeline') if workers else None
+        self.max_entries = app.config['IMAGE_VARIANTS_MAX_ENTRIES']
+
+    def submit(self, directory, content_hash, data):
+        if self.executor is None:
+            self._run(directory, content_hash, data)
+        else:
+            self.executor.submit(self._run, directory, content_hash, data)
+
+    @staticmethod
+    def _run(directory, content_hash, data):
+        try:
+            process_image(directory, content_hash, data)
+        except Exception as e:
+            # The raw upload stays in place of the processed image
+            logging.error(f"Error processing image {content_hash}: {e}")
+
+    def variants(self, folder, image_file):
+        """
+        Build the srcset values for a processed image, once its variants have all been written.
+        Only the widths that were produced are listed.
+
+        Args:
+            folder (str): 'teacherImg' or 'studentImg'.
+            image_file (str): The image name stored on the profile.
+
+        Returns:
+            dict: 'webp' and 'jpeg' srcset strings, or None for images without variants.
+        """
+        match = _PROCESSED_NAME.match(image_file or '')
+        if match is None:
+            return None
+        key = (folder, image_file)
+        with self._lock:
+            if key in self._ready:
+                self._ready.move_to_end(key)
+                return self._ready[key]
+
+        directory = os.path.join(current_app.static_folder, 'img', folder)
+        # The narrowest WebP is the last variant written, and every processed image has it
+        # unless the upload was narrower than all the widths
+        if not os.path.exists(os.path.join(directory, _variant_name(match.group(1), min(IMAGE_WIDTHS), 'webp'))):
+            return None
+        widths = [width for width in IMAGE_WIDTHS
+                  if os.path.exists(os.path.join(directory, _variant_name(match.group(1), width, 'webp')))]
+        prefix = f"{current_app.static_url_path}/img/{folder}/"
+        srcsets = {
+            extension_key: ', '.join(f"{prefix}{_variant_name(match.group(1), width, extension)} {width}w" for width in widths)
+            for extension_key, extension in (('webp', 'webp'), ('jpeg', 'jpg'))
+        }
+        with self._lock:
+            self._ready[key] = srcsets
+            while len(self._ready) > self.max_entries:
+                self._ready.popitem(last=False)
+        return srcsets
+
+
+image_pipeline = ImagePipeline()
+
+
+def _remove_image(directory, image_file):
+    names = [image_file]
+    match = _PROCESSED_NAME.match(image_file)
+    if match is not None:
+        names += [_variant_name(match.group(1), width, extension) for width in IMAGE_WIDTHS for extension in ('jpg', 'webp')]
+    for name in names:
+        try:
+            os.remove(os.path.join(directory, name))
+        except (FileNotFoundError, PermissionError):
+            pass  # Ignore files already gone or in use
+
 
 def save_image_file(image_file):
     """
-    Save an uploaded image file with a unique name.
+    Save an uploaded image file under a name taken from its content.
     The logic here was taken from ChatGPT, although I was able to implement and change aspects too!
 
-    Generates a random filename for the uploaded image to ensure uniqueness,
-    determines the appropriate directory based on the user type, and handles
-    the saving and potential deletion of the old image file.
+    Names the uploaded image after a hash of its bytes, determines the appropriate
+    directory based on the user type, queues the resized variants on the image pipeline,
+    and handles the potential deletion of the old image file and its variants.
 
     Args:
         image_file (FileStorage): The uploaded image file.
@@ -18,33 +214,78 @@ def save_image_file(image_file):
     Returns:
         str: The new filename of the saved image.
     """
-    # Generate a random hex for the filename to ensure it's unique
-    random_hex = secrets.token_hex(8)
-    _, file_extension = os.path.splitext(image_file.filename)
-    new_filename = random_hex + file_extension
-
     # Determine the directory and default image based on the user type
-    if session['user_type'] == 'teacher':
-        directory = 'static/img/teacherImg'
-        default_image = 'default.jpg'
-    elif session['user_type'] == 'student':
-        directory = 'static/img/studentImg'
-        default_image = 'default1.jpg'
-    else:
+    if session['user_type'] not in IMAGE_FOLDERS:
         return None  # Or handle this case differently
+    folder, default_image, profile_model = IMAGE_FOLDERS[session['user_type']]
+    directory = os.path.join(current_app.root_path, 'static', 'img', folder)
+    old_image = current_user.profile.image_file
 
-    # Build the full file path for the new image
-    image_path = os.path.join(current_app.root_path, directory, new_filename)
-
-    # Save the new image file
-    image_file.save(image_path)
+    data = image_file.read()
+    content_hash = hashlib.sha256(data).hexdigest()[:12]
 
-    # Only delete the old image if it's not the default image
-    old_image_path = os.path.join(current_app.root_path, directory, current_user.profile.image_file)
-    if current_user.profile.image_file != default_image and os.path.exists(old_image_path):
+    if Image is None:
+        _, file_extension = os.path.splitext(image_file.filename)
+        new_filename = content_hash + file_extension.lower()
+        with open(os.path.join(directory, new_filename), 'wb') as f:
+            f.write(data)
+    else:
         try:
-            os.remove(old_image_path)
-        except PermissionError:
-            pass  # Ignore the permission error
+            # Only reads the header; the full decode happens on the pipeline
+            with Image.open(io.BytesIO(data)) as upload:
+                upload.verify()
+        except Exception:
+            current_app.logger.warning(f"Ignoring upload {image_file.filename!r}: not a readable image")
+            return old_image
+        new_filename = f"{content_hash}.jpg"
+        # The raw upload stands in until the pipeline replaces it; browsers sniff the format
+        path = os.path.join(directory, new_filename)
+        if not os.path.exists(path):
+            _write_atomically(path, lambda f: f.write(data))
+            image_pipeline.submit(directory, content_hash, data)
 
-    return new_filename
\ No newline at end of file
+    # Only delete the old image if it's not the default image and no other profile shows it
+    if old_image not in (default_image, new_filename):
+        shared = db.session.query(profile_model.id).filter(
+            profile_model.image_file == old_image, profile_model.id != current_user.profile.id
+        ).first()
+        if shared is None:
+            _remove_image(directory, old_image)
+
+    return new_filename
+
+
+images_cli = AppGroup('images', help='Profile image commands.')
+
+
+@images_cli.command('process')
+def process_command():
+    """
+    Convert profile pictures uploaded before the image pipeline into resized variants (flask images process).
+    """
+    if Image is None:
+        raise click.ClickException('Processing images needs Pillow.')
+    processed = skipped = 0
+    for folder, default_image, profile_model in IMAGE_FOLDERS.values():
+        directory = os.path.join(current_app.root_path, 'static', 'img', folder)
+        profiles = profile_model.query.filter(profile_model.image_file != default_image).all()
+        for profile in profiles:
+            if _PROCESSED_NAME.match(profile.image_file):
+                continue
+            path = os.path.join(directory, profile.image_file)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                content_hash = hashlib.sha256(data).hexdigest()[:12]
+                process_image(directory, content_hash, data)
+            except Exception as e:
+                click.echo(f"Skipping {folder}/{profile.image_file}: {e}")
+                skipped += 1
+                continue
+            old_image, profile.image_file = profile.image_file, f"{content_hash}.jpg"
+            db.session.commit()
+            if not profile_model.query.filter_by(image_file=old_image).first():
+                _remove_image(directory, old_image)
+            processed += 1
+    click.echo(f"processed: {processed}")
+    click.echo(f"skipped: {skipped}")
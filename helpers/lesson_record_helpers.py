@@ -1,58 +1,108 @@
-from models import LessonRecord, LessonSlot, Student, Teacher
-from pytz import timezone
-from sqlalchemy.orm import joinedload
+import base64
+import json
+from database import db, read_only
+from models import LessonRecord, LessonSlot
+from sqlalchemy import and_, func, or_, select
 from datetime import datetime, timezone
-from helpers.time_helpers import ensure_timezone_aware
+from helpers.lesson_view_helpers import fetch_lesson_record_views
 
+LESSON_RECORDS_PER_PAGE = 5
 
-def get_paginated_lesson_records(user_id, page, user_type):
+
+class KeysetPage:
     """
-    Fetch paginated lesson records for the given user.
-    Query created with help from ChatGPT
-    Args:
-        user_id (int): The ID of the user (student or teacher).
-        page (int): The page number for pagination.
-        user_type (str): The type of the user ('student' or 'teacher').
+    One page of lesson records, with opaque cursors for the pages either side of it.
 
-    Returns:
-        Pagination: A Pagination object containing lesson records.
+    The cursors also carry the total counted on the first page, so paging through the
+    list does not count the records again.
     """
-    if user_type == 'student':
-        query = LessonRecord.query.filter(
-            LessonRecord.student_id == user_id,
-            LessonRecord.lesson_slot.has(LessonSlot.start_time <= datetime.now(timezone.utc))
-        ).options(
-            joinedload(LessonRecord.teacher).joinedload(Teacher.profile),
-            joinedload(LessonRecord.lesson_slot),
-            joinedload(LessonRecord.new_words), 
-            joinedload(LessonRecord.new_phrases)
-        )
-    elif user_type == 'teacher':
-        query = LessonRecord.query.join(LessonSlot).filter(
-            LessonRecord.teacher_id == user_id,
-            LessonSlot.start_time <= datetime.now(timezone.utc)
-        ).options(
-            joinedload(LessonRecord.student).joinedload(Student.profile),
-            joinedload(LessonRecord.lesson_slot),
-            joinedload(LessonRecord.new_words),
-            joinedload(LessonRecord.new_phrases) 
-        )
-    return query.order_by(LessonRecord.lastEditTime.desc()).paginate(page=page, per_page=5)
-
-
-def make_times_timezone_aware(lesson_records, timezone_str):
+    def __init__(self, items, total, has_prev, has_next):
+        self.items = items
+        self.total = total
+        self.has_prev = has_prev
+        self.has_next = has_next
+
+    @property
+    def prev_cursor(self):
+        return _encode_cursor(self.items[0], self.total) if self.has_prev and self.items else None
+
+    @property
+    def next_cursor(self):
+        return _encode_cursor(self.items[-1], self.total) if self.has_next and self.items else None
+
+
+def _encode_cursor(record, total):
+    # lastEditTime of a view is already in the user's timezone, so the UTC value is sent
+    last_edit_time = record.lastEditTime.astimezone(timezone.utc).replace(tzinfo=None).isoformat() if record.lastEditTime else None
+    payload = json.dumps([last_edit_time, record.id, total], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        last_edit_time, record_id, total = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return (datetime.fromisoformat(last_edit_time) if last_edit_time else None), int(record_id), int(total)
+    except (ValueError, TypeError):
+        return None
+
+
+def _after(last_edit_time, record_id):
+    # Rows after (last_edit_time, record_id) in lastEditTime DESC NULLS LAST, id DESC order
+    if last_edit_time is None:
+        return and_(LessonRecord.lastEditTime.is_(None), LessonRecord.id < record_id)
+    return or_(
+        LessonRecord.lastEditTime < last_edit_time,
+        and_(LessonRecord.lastEditTime == last_edit_time, LessonRecord.id < record_id),
+        LessonRecord.lastEditTime.is_(None)
+    )
+
+
+def _before(last_edit_time, record_id):
+    if last_edit_time is None:
+        return or_(LessonRecord.lastEditTime.isnot(None), LessonRecord.id > record_id)
+    return or_(
+        LessonRecord.lastEditTime > last_edit_time,
+        and_(LessonRecord.lastEditTime == last_edit_time, LessonRecord.id > record_id)
+    )
+
+
+@read_only()
+def get_paginated_lesson_records(user_id, user_type, timezone_str, after=None, before=None, per_page=LESSON_RECORDS_PER_PAGE):
     """
-    Make the lastEditTime and lesson slot start_time timezone-aware.
+    Fetch a page of past lesson records for the given user, newest edit first.
     Query created with help from ChatGPT
+    Pages are keyed on (lastEditTime, id) instead of OFFSET, so a deep page costs the same
+    as the first one. The records are loaded as LessonRecordView objects with times in the
+    user's timezone.
     Args:
-        lesson_records (Pagination): The paginated lesson records.
+        user_id (int): The ID of the user (student or teacher).
+        user_type (str): The type of the user ('student' or 'teacher').
         timezone_str (str): The timezone string to make times timezone aware.
+        after (str, optional): Cursor of the last record on the previous page.
+        before (str, optional): Cursor of the first record on the following page.
+        per_page (int, optional): The number of records per page.
 
     Returns:
-        Pagination: The paginated lesson records with timezone-aware times.
+        KeysetPage: The page, whose items are LessonRecordView objects.
     """
-    for record in lesson_records.items:
-        record.lastEditTime = ensure_timezone_aware(record.lastEditTime, timezone_str)
-        if record.lesson_slot and record.lesson_slot.start_time:
-            record.lesson_slot.start_time = ensure_timezone_aware(record.lesson_slot.start_time, timezone_str)
-    return lesson_records
\ No newline at end of file
+    owner = LessonRecord.student_id if user_type == 'student' else LessonRecord.teacher_id
+    criteria = [owner == user_id, LessonSlot.start_time <= datetime.now(timezone.utc)]
+    newest_first = [LessonRecord.lastEditTime.desc().nulls_last(), LessonRecord.id.desc()]
+    oldest_first = [LessonRecord.lastEditTime.asc().nulls_first(), LessonRecord.id.asc()]
+
+    cursor = _decode_cursor(after or before) if (after or before) else None
+    if cursor is None:
+        total = db.session.execute(
+            select(func.count(LessonRecord.id)).join(LessonSlot, LessonRecord.lesson_slot_id == LessonSlot.id).where(*criteria)
+        ).scalar()
+        items = fetch_lesson_record_views(criteria, newest_first, timezone_str, limit=per_page + 1)
+        return KeysetPage(items[:per_page], total, has_prev=False, has_next=len(items) > per_page)
+
+    last_edit_time, record_id, total = cursor
+    if after:
+        items = fetch_lesson_record_views(criteria + [_after(last_edit_time, record_id)], newest_first, timezone_str, limit=per_page + 1)
+        return KeysetPage(items[:per_page], total, has_prev=True, has_next=len(items) > per_page)
+
+    # Walk backwards from the cursor, then put the page back in display order
+    items = fetch_lesson_record_views(criteria + [_before(last_edit_time, record_id)], oldest_first, timezone_str, limit=per_page + 1)
+    return KeysetPage(items[:per_page][::-1], total, has_prev=len(items) > per_page, has_next=True)
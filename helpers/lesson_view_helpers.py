@@ -0,0 +1,155 @@
+# lesson_view_helpers.py
+"""
+Read-only views of lesson data for display.
+
+List pages and dashboards select just the columns they show and build these frozen views,
+with times already converted to the viewer's timezone. ORM instances are never modified for
+display, so a later commit in the same session cannot write converted times back, and the
+rows never enter the identity map.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select
+from database import db
+from models import LessonRecord, LessonRecordLexeme, LessonSlot, Lexeme, Student, StudentProfile, Teacher, TeacherProfile
+from helpers.time_helpers import localize_utc_times
+
+
+@dataclass(frozen=True, slots=True)
+class ProfileView:
+    image_file: str
+
+
+@dataclass(frozen=True, slots=True)
+class UserView:
+    id: int
+    username: str
+    profile: Optional[ProfileView] = None
+
+
+@dataclass(frozen=True, slots=True)
+class LessonSlotView:
+    id: int
+    start_time: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class TermView:
+    """A word or phrase introduced in a lesson."""
+    content: str
+
+
+@dataclass(frozen=True, slots=True)
+class BookingView:
+    lesson_record_id: Optional[int]
+    student: UserView
+
+
+@dataclass(frozen=True, slots=True)
+class UpcomingLessonView:
+    id: int
+    start_time: datetime
+    teacher: Optional[UserView] = None
+    booking: Optional[BookingView] = None
+
+
+@dataclass(frozen=True, slots=True)
+class LessonRecordView:
+    id: int
+    lesson_slot: Optional[LessonSlotView]
+    teacher: Optional[UserView]
+    student: Optional[UserView]
+    lastEditTime: Optional[datetime] = None
+    lesson_summary: Optional[str] = None
+    strengths: Optional[str] = None
+    areas_to_improve: Optional[str] = None
+    new_words: tuple = ()
+    new_phrases: tuple = ()
+
+
+def make_user_view(user_id, username, image_file=None):
+    if user_id is None:
+        return None
+    return UserView(user_id, username, ProfileView(image_file) if image_file is not None else None)
+
+
+def _fetch_terms(kind, record_ids):
+    terms = {}
+    if record_ids:
+        rows = db.session.execute(
+            select(LessonRecordLexeme.lesson_record_id, Lexeme.content).join(
+                Lexeme, LessonRecordLexeme.lexeme_id == Lexeme.id
+            ).where(
+                LessonRecordLexeme.lesson_record_id.in_(record_ids), Lexeme.kind == kind
+            ).order_by(LessonRecordLexeme.lesson_record_id, LessonRecordLexeme.position)
+        )
+        for record_id, content in rows:
+            terms.setdefault(record_id, []).append(TermView(content))
+    return terms
+
+
+def fetch_lesson_record_views(criteria, order_by, timezone_str, limit=None, with_content=True):
+    """
+    Select lesson records as LessonRecordView objects.
+
+    Args:
+        criteria (list): WHERE clauses; LessonSlot, Teacher, Student and the profiles are joined in.
+        order_by (list): ORDER BY clauses.
+        timezone_str (str): The timezone the times are displayed in.
+        limit (int, optional): The maximum number of records to return.
+        with_content (bool, optional): Also load the summary, feedback, words and phrases.
+            Defaults to True.
+
+    Returns:
+        list: A list of LessonRecordView objects.
+    """
+    columns = [
+        LessonRecord.id, LessonRecord.lastEditTime, LessonSlot.id, LessonSlot.start_time,
+        Teacher.id, Teacher.username, TeacherProfile.image_file,
+        Student.id, Student.username, StudentProfile.image_file
+    ]
+    if with_content:
+        columns += [LessonRecord.lesson_summary, LessonRecord.strengths, LessonRecord.areas_to_improve]
+
+    stmt = select(*columns).select_from(LessonRecord).join(
+        LessonSlot, LessonRecord.lesson_slot_id == LessonSlot.id
+    ).outerjoin(
+        Teacher, LessonRecord.teacher_id == Teacher.id
+    ).outerjoin(
+        TeacherProfile, TeacherProfile.teacher_id == Teacher.id
+    ).outerjoin(
+        Student, LessonRecord.student_id == Student.id
+    ).outerjoin(
+        StudentProfile, StudentProfile.student_id == Student.id
+    ).where(*criteria).order_by(*order_by)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    rows = db.session.execute(stmt).all()
+
+    words, phrases = {}, {}
+    if with_content:
+        record_ids = [row[0] for row in rows]
+        words = _fetch_terms(Lexeme.WORD, record_ids)
+        phrases = _fetch_terms(Lexeme.PHRASE, record_ids)
+
+    # Both times of every row are localized in one pass
+    local_times = localize_utc_times([time for row in rows for time in (row[1], row[3])], timezone_str)
+
+    views = []
+    for i, row in enumerate(rows):
+        record_id, _, slot_id, _, teacher_id, teacher_name, teacher_image, student_id, student_name, student_image = row[:10]
+        content = row[10:] if with_content else (None, None, None)
+        views.append(LessonRecordView(
+            id=record_id,
+            lesson_slot=LessonSlotView(slot_id, local_times[2 * i + 1]),
+            teacher=make_user_view(teacher_id, teacher_name, teacher_image),
+            student=make_user_view(student_id, student_name, student_image),
+            lastEditTime=local_times[2 * i],
+            lesson_summary=content[0],
+            strengths=content[1],
+            areas_to_improve=content[2],
+            new_words=tuple(words.get(record_id, ())),
+            new_phrases=tuple(phrases.get(record_id, ()))
+        ))
+    return views
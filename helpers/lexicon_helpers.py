@@ -0,0 +1,98 @@
+# lexicon_helpers.py
+from sqlalchemy import select
+from database import db, insert_ignoring_conflicts
+from models import LessonRecord, LessonRecordLexeme, Lexeme
+
+
+def normalize_term(text):
+    """
+    Normalize a word or phrase for deduplication: spacing is collapsed and case is folded.
+    """
+    return ' '.join(text.split()).casefold()
+
+
+def get_or_create_lexemes(kind, contents):
+    """
+    Find the lexemes for some words or phrases, adding the ones not seen before.
+    New lexemes are inserted in the caller's transaction, so they are only kept if it commits.
+
+    Args:
+        kind (str): Lexeme.WORD or Lexeme.PHRASE.
+        contents (list): The words or phrases as typed.
+
+    Returns:
+        dict: Lexeme objects keyed by normalized text.
+    """
+    wanted = {}
+    for content in contents:
+        wanted.setdefault(normalize_term(content), ' '.join(content.split()))
+    if not wanted:
+        return {}
+
+    lexemes = {lexeme.normalized: lexeme for lexeme in db.session.execute(
+        select(Lexeme).where(Lexeme.kind == kind, Lexeme.normalized.in_(list(wanted)))
+    ).scalars()}
+    missing = [normalized for normalized in wanted if normalized not in lexemes]
+    if missing:
+        # Terms another lesson added in the meantime are skipped here and picked up below
+        db.session.execute(insert_ignoring_conflicts(Lexeme, 'kind', 'normalized').values([
+            {'kind': kind, 'content': wanted[normalized], 'normalized': normalized} for normalized in missing
+        ]))
+        lexemes.update((lexeme.normalized, lexeme) for lexeme in db.session.execute(
+            select(Lexeme).where(Lexeme.kind == kind, Lexeme.normalized.in_(missing))
+        ).scalars())
+    return lexemes
+
+
+def set_lesson_lexemes(lesson, kind, contents):
+    """
+    Set the words or phrases of a lesson, only adding, removing and moving the links that changed.
+
+    Positions only need to increase along the list, so a link keeps its stored position
+    unless it now sits in front of a lower one. Appending or removing a term touches a
+    single row.
+
+    Args:
+        lesson (LessonRecord): The lesson record to update.
+        kind (str): Lexeme.WORD or Lexeme.PHRASE.
+        contents (list): The words or phrases in order; repeats of a term are dropped.
+    """
+    lexemes = get_or_create_lexemes(kind, contents)
+    desired = list(dict.fromkeys(lexemes[normalize_term(content)] for content in contents))
+    desired_ids = {lexeme.id for lexeme in desired}
+    links = {link.lexeme_id: link for link in lesson.lexeme_links if link.lexeme.kind == kind}
+
+    for lexeme_id, link in links.items():
+        if lexeme_id not in desired_ids:
+            lesson.lexeme_links.remove(link)
+
+    last_position = -1
+    for lexeme in desired:
+        link = links.get(lexeme.id)
+        if link is None:
+            last_position += 1
+            lesson.lexeme_links.append(LessonRecordLexeme(lexeme=lexeme, position=last_position))
+        elif link.position > last_position:
+            last_position = link.position
+        else:
+            last_position += 1
+            link.position = last_position
+
+
+def get_student_vocabulary(student_id, kind=None):
+    """
+    Fetch every word and phrase a student has been taught, across all of their lessons.
+
+    Args:
+        student_id (int): The ID of the student.
+        kind (str, optional): Only return Lexeme.WORD or Lexeme.PHRASE entries.
+
+    Returns:
+        list: Distinct Lexeme objects, ordered by content.
+    """
+    query = select(Lexeme).join(LessonRecordLexeme, LessonRecordLexeme.lexeme_id == Lexeme.id).join(
+        LessonRecord, LessonRecordLexeme.lesson_record_id == LessonRecord.id
+    ).where(LessonRecord.student_id == student_id)
+    if kind is not None:
+        query = query.where(Lexeme.kind == kind)
+    return db.session.execute(query.distinct().order_by(Lexeme.content)).scalars().all()
@@ -0,0 +1,34 @@
+# query_shape_helpers.py
+"""
+Named loader shapes for the pages that still work with ORM instances.
+
+Each shape lists the relationships a page reads and how each is loaded. Collections use
+selectinload, so a LIMIT applies to parent rows and one collection never multiplies
+another's rows. Many-to-one relationships use joinedload. Where the
+instances are only read and edited, everything else raises on access, so a new lazy
+load (and the N+1 queries behind it) shows up as an error instead of as a slow page.
+Shapes for instances that may be deleted later in the same session leave the other
+relationships lazy, since the delete cascades need to load them.
+
+The record lists and dashboard cards do not need a shape: they select their columns
+directly into the views in lesson_view_helpers.
+"""
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+from models import LessonRecord, LessonRecordLexeme, LessonSlot, RecurringAvailability
+
+# teacher/editLesson.html: the student's name, and the words and phrases being edited
+EDIT_FORM = (
+    joinedload(LessonRecord.student),
+    selectinload(LessonRecord.lexeme_links).joinedload(LessonRecordLexeme.lexeme),
+    raiseload('*'),
+)
+
+# student/bookLesson.html: each slot with its teacher's name
+BOOKABLE_SLOT = (
+    joinedload(LessonSlot.teacher),
+)
+
+# Expanding weekly availability into slots, which carry the teacher along
+RECURRING_WINDOW = (
+    joinedload(RecurringAvailability.teacher),
+)
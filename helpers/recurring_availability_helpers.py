@@ -0,0 +1,339 @@
+# recurring_availability_helpers.py
+from datetime import datetime, timedelta, timezone
+from database import db, insert_ignoring_conflicts
+from sqlalchemy import select
+from models import LessonSlot, RecurringAvailability, RecurringAvailabilityOverride
+from helpers.query_shape_helpers import RECURRING_WINDOW
+from helpers.slot_interval_index import TeacherIntervals
+from helpers.time_helpers import from_epoch_minutes, get_user_timezone, to_epoch_minutes
+
+SLOT_LENGTH = timedelta(hours=1)
+SLOT_MINUTES = SLOT_LENGTH // timedelta(minutes=1)
+
+# How far before a window a real slot may start and still reach into it; no lesson runs a day
+MAX_SLOT_MINUTES = 24 * 60
+
+# Recurring slots have no row until they are booked, so they are identified by a negative id
+# packing the availability id and the slot's start in UTC epoch minutes.
+VIRTUAL_SLOT_ID_BASE = 10 ** 8
+
+
+class VirtualSlot:
+    """
+    An unmaterialized occurrence of a RecurringAvailability window.
+    Exposes the LessonSlot attributes the slot pages read, but is never added to the session.
+    """
+    __slots__ = ('id', 'teacher_id', 'teacher', 'start_time', 'end_time', 'start_minute', 'end_minute', 'is_booked')
+
+    def __init__(self, availability, start_time):
+        self.id = encode_virtual_slot_id(availability.id, start_time)
+        self.teacher_id = availability.teacher_id
+        self.teacher = availability.teacher
+        self.start_time = start_time
+        self.end_time = start_time + SLOT_LENGTH
+        self.start_minute = to_epoch_minutes(self.start_time)
+        self.end_minute = to_epoch_minutes(self.end_time)
+        self.is_booked = False
+
+
+def encode_virtual_slot_id(availability_id, start_time):
+    """
+    Build the id of a recurring slot from its availability and naive UTC start time.
+    """
+    return -(availability_id * VIRTUAL_SLOT_ID_BASE + to_epoch_minutes(start_time))
+
+
+def decode_virtual_slot_id(slot_id):
+    """
+    Split a recurring slot id back into (availability_id, naive UTC start time).
+    """
+    availability_id, epoch_minutes = divmod(-slot_id, VIRTUAL_SLOT_ID_BASE)
+    return availability_id, from_epoch_minutes(epoch_minutes)
+
+
+def is_virtual_slot_id(slot_id):
+    return slot_id is not None and slot_id < 0
+
+
+def _to_naive_utc(dt):
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def iter_occurrences(availability, start_utc, end_utc):
+    """
+    Yield the naive UTC start times of an availability's hourly slots within a window.
+
+    Args:
+        availability (RecurringAvailability): The recurring window to expand.
+        start_utc (datetime): The start of the window.
+        end_utc (datetime): The end of the window (inclusive).
+    """
+    user_timezone = get_user_timezone(availability.timezone)
+    window_start = _to_naive_utc(start_utc)
+    window_end = _to_naive_utc(end_utc)
+
+    # Pad by a day either side so windows that cross midnight in UTC are not missed
+    day = window_start.date() - timedelta(days=1)
+    last_day = window_end.date() + timedelta(days=1)
+    slots_per_day = (datetime.combine(day, availability.end_time) - datetime.combine(day, availability.start_time)) // SLOT_LENGTH
+
+    while day <= last_day:
+        if day.weekday() == availability.weekday:
+            local_start = user_timezone.localize(datetime.combine(day, availability.start_time))
+            first_slot = _to_naive_utc(local_start)
+            for i in range(slots_per_day):
+                start_time = first_slot + i * SLOT_LENGTH
+                if window_start <= start_time <= window_end:
+                    yield start_time
+        day += timedelta(days=1)
+
+
+def expand_recurring_availability(start_utc, end_utc, teacher_id=None, not_before=None):
+    """
+    Expand recurring availability into VirtualSlot objects for a window.
+
+    Occurrences that overlap a LessonSlot row (booked or opened by hand) or an occurrence
+    of another of the teacher's windows, or that the teacher has closed, are skipped, so
+    the result can be merged with real slots directly.
+
+    Args:
+        start_utc (datetime): The start of the window.
+        end_utc (datetime): The end of the window.
+        teacher_id (int, optional): The ID of the teacher to filter by. Defaults to None.
+        not_before (datetime, optional): Skip occurrences starting before this time.
+
+    Returns:
+        list: A list of VirtualSlot objects.
+    """
+    query = RecurringAvailability.query.options(*RECURRING_WINDOW)
+    if teacher_id is not None:
+        query = query.filter(RecurringAvailability.teacher_id == teacher_id)
+    availabilities = query.all()
+    if not availabilities:
+        return []
+
+    if not_before is not None:
+        start_utc = max(_to_naive_utc(start_utc), _to_naive_utc(not_before))
+    teacher_ids = {availability.teacher_id for availability in availabilities}
+    start_minute = to_epoch_minutes(start_utc)
+    end_minute = to_epoch_minutes(end_utc)
+
+    # Real slots that could overlap an occurrence starting inside the window
+    rows = db.session.execute(
+        select(LessonSlot.teacher_id, LessonSlot.start_minute, LessonSlot.end_minute, LessonSlot.id).where(
+            LessonSlot.teacher_id.in_(teacher_ids),
+            LessonSlot.start_minute > start_minute - MAX_SLOT_MINUTES,
+            LessonSlot.start_minute < end_minute + SLOT_MINUTES,
+            LessonSlot.end_minute > start_minute
+        )
+    ).all()
+    taken = {teacher: TeacherIntervals([]) for teacher in teacher_ids}
+    for teacher, slot_start, slot_end, slot_id in rows:
+        taken[teacher].add(slot_id, slot_start, slot_end)
+    closed = set(db.session.execute(
+        select(RecurringAvailabilityOverride.recurring_availability_id, RecurringAvailabilityOverride.start_time).where(
+            RecurringAvailabilityOverride.recurring_availability_id.in_([availability.id for availability in availabilities]),
+            RecurringAvailabilityOverride.start_time >= _to_naive_utc(start_utc),
+            RecurringAvailabilityOverride.start_time <= _to_naive_utc(end_utc)
+        )
+    ).all())
+
+    virtual_slots = []
+    for availability in availabilities:
+        intervals = taken[availability.teacher_id]
+        for start_time in iter_occurrences(availability, start_utc, end_utc):
+            if (availability.id, start_time) in closed:
+                continue
+            virtual_slot = VirtualSlot(availability, start_time)
+            if intervals.find_overlap(virtual_slot.start_minute, virtual_slot.end_minute, ()) is not None:
+                continue
+            intervals.add(virtual_slot.id, virtual_slot.start_minute, virtual_slot.end_minute)
+            virtual_slots.append(virtual_slot)
+    return virtual_slots
+
+
+def find_recurring_overlap(teacher_id, intervals, ignore_ids=()):
+    """
+    Find an open recurring slot of a teacher that overlaps any of the given intervals.
+    Occurrences that already have a LessonSlot row are left to slot_index.
+
+    Args:
+        teacher_id (int): The ID of the teacher.
+        intervals (list): (start_minute, end_minute) pairs in UTC epoch minutes.
+        ignore_ids (collection, optional): Recurring slot IDs to disregard, e.g. ones being closed.
+
+    Returns:
+        int: The (negative) ID of an overlapping recurring slot, or None.
+    """
+    if not intervals:
+        return None
+    # Occurrences starting up to one slot before the first interval can still reach into it
+    first = min(start for start, _ in intervals) - SLOT_MINUTES + 1
+    last = max(end for _, end in intervals) - 1
+    occurrences = TeacherIntervals([
+        (slot.start_minute, slot.end_minute, slot.id)
+        for slot in expand_recurring_availability(from_epoch_minutes(first), from_epoch_minutes(last), teacher_id)
+    ])
+    ignore_ids = set(ignore_ids)
+    for start, end in intervals:
+        slot_id = occurrences.find_overlap(start, end, ignore_ids)
+        if slot_id is not None:
+            return slot_id
+    return None
+
+
+def _find_occurrence(slot_id, teacher_id=None):
+    """
+    Resolve a recurring slot id to its availability, if the occurrence is still offered.
+    """
+    availability_id, start_time = decode_virtual_slot_id(slot_id)
+    availability = db.session.get(RecurringAvailability, availability_id)
+    if availability is None or (teacher_id is not None and availability.teacher_id != teacher_id):
+        return None, start_time
+    if start_time not in iter_occurrences(availability, start_time, start_time):
+        return None, start_time
+    is_closed = RecurringAvailabilityOverride.query.filter_by(
+        recurring_availability_id=availability.id, start_time=start_time
+    ).first() is not None
+    return (None if is_closed else availability), start_time
+
+
+def materialize_recurring_slot(slot_id):
+    """
+    Create the LessonSlot row for a recurring slot so it can be booked.
+    The row is inserted in the caller's transaction, so it is only kept if the caller commits.
+
+    Args:
+        slot_id (int): The (negative) id of the recurring slot.
+
+    Returns:
+        int: The ID of the LessonSlot row, or None if the occurrence is no longer offered.
+    """
+    availability, start_time = _find_occurrence(slot_id)
+    if availability is None:
+        return None
+
+    # A slot the teacher opened by hand for the same hour is booked in its place;
+    # one that only partly overlaps means the occurrence is not offered
+    start_minute = to_epoch_minutes(start_time)
+    overlapping = db.session.execute(
+        select(LessonSlot.id, LessonSlot.start_minute, LessonSlot.end_minute).where(
+            LessonSlot.teacher_id == availability.teacher_id,
+            LessonSlot.start_minute > start_minute - MAX_SLOT_MINUTES,
+            LessonSlot.start_minute < start_minute + SLOT_MINUTES,
+            LessonSlot.end_minute > start_minute
+        )
+    ).all()
+    if overlapping:
+        existing_id, existing_start, existing_end = overlapping[0]
+        if len(overlapping) == 1 and (existing_start, existing_end) == (start_minute, start_minute + SLOT_MINUTES):
+            return existing_id
+        return None
+
+    # If someone else materialized it first, their row is used and the caller's conditional
+    # UPDATE decides who gets it
+    db.session.execute(
+        insert_ignoring_conflicts(LessonSlot, 'teacher_id', 'start_time').values(
+            teacher_id=availability.teacher_id, start_time=start_time, end_time=start_time + SLOT_LENGTH,
+            start_minute=start_minute, end_minute=start_minute + SLOT_MINUTES, is_booked=False
+        ).execution_options(slot_index_teacher_id=availability.teacher_id)
+    )
+    return db.session.execute(
+        select(LessonSlot.id).where(LessonSlot.teacher_id == availability.teacher_id, LessonSlot.start_time == start_time)
+    ).scalar()
+
+
+def close_recurring_slots(teacher_id, slot_ids):
+    """
+    Close individual occurrences of a teacher's recurring availability.
+    Adds override rows without committing.
+
+    Args:
+        teacher_id (int): The ID of the teacher.
+        slot_ids (list): The (negative) ids of the recurring slots to close.
+
+    Returns:
+        bool: True if every slot belonged to the teacher and was still open.
+    """
+    for slot_id in slot_ids:
+        availability, start_time = _find_occurrence(slot_id, teacher_id)
+        if availability is None:
+            return False
+        db.session.add(RecurringAvailabilityOverride(recurring_availability_id=availability.id, start_time=start_time))
+    return True
+
+
+def get_recurring_availability(teacher_id):
+    """
+    Retrieve a teacher's recurring availability windows.
+
+    Args:
+        teacher_id (int): The ID of the teacher.
+
+    Returns:
+        list: A list of dictionaries describing each window.
+    """
+    availabilities = RecurringAvailability.query.filter_by(teacher_id=teacher_id).order_by(
+        RecurringAvailability.weekday, RecurringAvailability.start_time
+    ).all()
+    return [{
+        'id': availability.id,
+        'weekday': availability.weekday,
+        'start_time': availability.start_time.strftime('%H:%M'),
+        'end_time': availability.end_time.strftime('%H:%M'),
+        'timezone': availability.timezone
+    } for availability in availabilities]
+
+
+def add_recurring_availability(teacher_id, timezone_str, weekdays, start_time_str, end_time_str):
+    """
+    Add a recurring availability window on each of the given weekdays.
+
+    Args:
+        teacher_id (int): The ID of the teacher.
+        timezone_str (str): The teacher's timezone string.
+        weekdays (list): Weekday numbers, Monday being 0.
+        start_time_str (str): The local start time, e.g. '19:00'.
+        end_time_str (str): The local end time, e.g. '22:00'.
+
+    Returns:
+        dict: A dictionary indicating success or error status.
+    """
+    try:
+        start_time = datetime.strptime(start_time_str, '%H:%M').time()
+        end_time = datetime.strptime(end_time_str, '%H:%M').time()
+        weekdays = sorted({int(weekday) for weekday in weekdays})
+    except (TypeError, ValueError):
+        return {'status': 'error', 'message': 'Invalid weekdays or times.'}
+
+    if not weekdays or any(weekday < 0 or weekday > 6 for weekday in weekdays):
+        return {'status': 'error', 'message': 'Invalid weekdays or times.'}
+    if datetime.combine(datetime.min, end_time) - datetime.combine(datetime.min, start_time) < SLOT_LENGTH:
+        return {'status': 'error', 'message': 'Availability must be at least one lesson long.'}
+
+    for weekday in weekdays:
+        db.session.add(RecurringAvailability(teacher_id=teacher_id, weekday=weekday, start_time=start_time, end_time=end_time, timezone=timezone_str))
+    db.session.commit()
+    return {'status': 'success'}
+
+
+def remove_recurring_availability(teacher_id, availability_id):
+    """
+    Remove one of a teacher's recurring availability windows.
+    Slots that were already booked from it are kept.
+
+    Args:
+        teacher_id (int): The ID of the teacher.
+        availability_id (int): The ID of the window to remove.
+
+    Returns:
+        dict: A dictionary indicating success or error status.
+    """
+    availability = db.session.get(RecurringAvailability, availability_id)
+    if availability is None or availability.teacher_id != teacher_id:
+        return {'status': 'error', 'message': 'Availability not found.'}
+    db.session.delete(availability)
+    db.session.commit()
+    return {'status': 'success'}
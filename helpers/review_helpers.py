@@ -0,0 +1,299 @@
+# review_helpers.py
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime, timezone
+from sqlalchemy import exists, literal, select
+from sqlalchemy.exc import IntegrityError
+from database import db
+from models import LessonRecord, LessonRecordLexeme, Lexeme, ReviewItem
+from helpers.time_helpers import from_epoch_minutes, to_epoch_minutes
+
+MINUTES_PER_DAY = 24 * 60
+RELEARN_MINUTES = 10
+MIN_EASE = 1.3
+INITIAL_EASE = 2.5
+MATURE_INTERVAL_DAYS = 21
+
+# The grades offered on the review page, on SM-2's 0-5 scale
+GRADES = {'again': 1, 'hard': 3, 'good': 4, 'easy': 5}
+
+
+def schedule_review(repetitions, interval_days, ease, grade):
+    """
+    Work out the next review of an item with the SM-2 algorithm.
+
+    A grade below 3 is a lapse: the item starts over and comes back after RELEARN_MINUTES.
+    Otherwise the interval goes 1 day, 6 days, then grows by the ease factor. The ease
+    factor is adjusted by every grade and never drops below MIN_EASE.
+
+    Args:
+        repetitions (int): Successful reviews in a row so far.
+        interval_days (float): The current interval in days.
+        ease (float): The current ease factor.
+        grade (int): How well the item was recalled, from 0 (blackout) to 5 (perfect).
+
+    Returns:
+        tuple: (repetitions, interval_days, ease, due_in_minutes, lapsed)
+    """
+    ease = max(MIN_EASE, ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    if grade < 3:
+        return 0, 0.0, ease, RELEARN_MINUTES, True
+
+    if repetitions == 0:
+        interval_days = 1.0
+    elif repetitions == 1:
+        interval_days = 6.0
+    else:
+        interval_days = round(interval_days * ease, 2)
+    return repetitions + 1, interval_days, ease, round(interval_days * MINUTES_PER_DAY), False
+
+
+class _StudentDeck:
+    """
+    One student's review items as parallel typed arrays sorted by due minute, so the
+    items due now are always a prefix found with one bisect.
+    """
+    __slots__ = ('due', 'lexeme_ids', 'intervals', 'eases', 'loaded_at')
+
+    def __init__(self, rows):
+        rows = sorted(rows)
+        self.due = array('q', [due for due, _, _, _ in rows])
+        self.lexeme_ids = array('q', [lexeme_id for _, lexeme_id, _, _ in rows])
+        self.intervals = array('f', [interval for _, _, interval, _ in rows])
+        self.eases = array('f', [ease for _, _, _, ease in rows])
+        self.loaded_at = time.monotonic()
+
+    def due_count(self, now_minute):
+        return bisect_right(self.due, now_minute)
+
+    def stats(self, now_minute):
+        mature = sum(1 for interval in self.intervals if interval >= MATURE_INTERVAL_DAYS)
+        return {
+            'total': len(self.due),
+            'due': self.due_count(now_minute),
+            'learning': self.intervals.count(0.0),
+            'mature': mature,
+        }
+
+    def reschedule(self, lexeme_id, due_minute, interval_days, ease):
+        try:
+            i = self.lexeme_ids.index(lexeme_id)
+        except ValueError:
+            pass
+        else:
+            del self.due[i], self.lexeme_ids[i], self.intervals[i], self.eases[i]
+        i = bisect_right(self.due, due_minute)
+        self.due.insert(i, due_minute)
+        self.lexeme_ids.insert(i, lexeme_id)
+        self.intervals.insert(i, interval_days)
+        self.eases.insert(i, ease)
+
+
+class ReviewDeckStore:
+    """
+    In-memory review decks, one per student, kept as compact arrays of due minutes,
+    intervals and ease factors.
+
+    A student's deck is loaded on first use, after adding review items for any words or
+    phrases from their lessons that do not have one yet. Grades recorded through
+    record_review update the deck in place. Decks older than REVIEW_DECK_TTL_SECONDS are
+    reloaded, which picks up new vocabulary and other worker processes' reviews, and at
+    most REVIEW_DECK_MAX_STUDENTS decks are kept, least recently used first out.
+
+    Decks are loaded on their own database connection, outside the lock, so a slow load
+    holds up no other student and never commits the request's session; the lock only
+    guards swapping decks in and out. Look decks up before flushing any writes in the
+    request: on SQLite the request's transaction would hold the lock the load waits on.
+    """
+    def __init__(self, ttl_seconds=300, max_students=256):
+        self.ttl_seconds = ttl_seconds
+        self.max_students = max_students
+        self._decks = OrderedDict()
+        # Bumped by every apply and reset, so a deck loaded while one ran is not kept
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('REVIEW_DECK_TTL_SECONDS', 300)
+        app.config.setdefault('REVIEW_DECK_MAX_STUDENTS', 256)
+        self.ttl_seconds = app.config['REVIEW_DECK_TTL_SECONDS']
+        self.max_students = app.config['REVIEW_DECK_MAX_STUDENTS']
+
+    def _cached_deck(self, student_id):
+        deck = self._decks.get(student_id)
+        if deck is None or time.monotonic() - deck.loaded_at > self.ttl_seconds:
+            return None
+        self._decks.move_to_end(student_id)
+        return deck
+
+    def _install(self, student_id, deck, generation):
+        if generation != self._generation:
+            # A review was applied while this deck was read and may be missing from it
+            return
+        self._decks[student_id] = deck
+        self._decks.move_to_end(student_id)
+        while len(self._decks) > self.max_students:
+            self._decks.popitem(last=False)
+
+    def due(self, student_id, now_minute, limit):
+        """
+        Find the items a student has due, most overdue first.
+
+        Args:
+            student_id (int): The ID of the student.
+            now_minute (int): The current time as UTC epoch minutes.
+            limit (int): The most lexeme IDs to return.
+
+        Returns:
+            tuple: (list of lexeme IDs, deck stats dict)
+        """
+        with self._lock:
+            deck = self._cached_deck(student_id)
+            if deck is not None:
+                count = deck.due_count(now_minute)
+                return deck.lexeme_ids[:min(count, limit)].tolist(), deck.stats(now_minute)
+            generation = self._generation
+
+        deck = load_deck(student_id, now_minute)
+        with self._lock:
+            self._install(student_id, deck, generation)
+            count = deck.due_count(now_minute)
+            return deck.lexeme_ids[:min(count, limit)].tolist(), deck.stats(now_minute)
+
+    def apply(self, student_id, lexeme_id, due_minute, interval_days, ease):
+        """
+        Apply a committed review to the student's deck, if it is loaded.
+        """
+        with self._lock:
+            self._generation += 1
+            deck = self._decks.get(student_id)
+            if deck is not None:
+                deck.reschedule(lexeme_id, due_minute, interval_days, ease)
+
+    def reset(self, student_id=None):
+        """
+        Forget one student's deck (or everyone's), so it is reloaded on next use.
+        """
+        with self._lock:
+            self._generation += 1
+            if student_id is None:
+                self._decks.clear()
+            else:
+                self._decks.pop(student_id, None)
+
+
+review_decks = ReviewDeckStore()
+
+
+def sync_review_items(student_id, now_minute):
+    """
+    Add review items, due now, for the student's lesson vocabulary that has none yet.
+    Done in one INSERT ... SELECT, so a student with a long lesson history costs one statement.
+    Runs in its own transaction, so the caller's session is left as it was.
+
+    Args:
+        student_id (int): The ID of the student.
+        now_minute (int): The current time as UTC epoch minutes.
+    """
+    missing = select(
+        literal(student_id), LessonRecordLexeme.lexeme_id, literal(now_minute),
+        literal(0.0), literal(INITIAL_EASE), literal(0), literal(0)
+    ).join(LessonRecord, LessonRecordLexeme.lesson_record_id == LessonRecord.id).where(
+        LessonRecord.student_id == student_id,
+        ~exists().where(ReviewItem.student_id == student_id, ReviewItem.lexeme_id == LessonRecordLexeme.lexeme_id)
+    ).distinct()
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(ReviewItem.__table__.insert().from_select(
+                ['student_id', 'lexeme_id', 'due_minute', 'interval_days', 'ease', 'repetitions', 'lapses'], missing
+            ))
+    except IntegrityError:
+        # Another request added the same items first
+        pass
+
+
+def load_deck(student_id, now_minute):
+    """
+    Sync a student's review items and read them into a deck.
+
+    Args:
+        student_id (int): The ID of the student.
+        now_minute (int): The current time as UTC epoch minutes.
+
+    Returns:
+        _StudentDeck: The student's deck.
+    """
+    sync_review_items(student_id, now_minute)
+    with db.engine.connect() as connection:
+        rows = connection.execute(
+            select(ReviewItem.due_minute, ReviewItem.lexeme_id, ReviewItem.interval_days, ReviewItem.ease).where(
+                ReviewItem.student_id == student_id
+            )
+        ).all()
+    return _StudentDeck([tuple(row) for row in rows])
+
+
+def get_due_reviews(student_id, limit=20, now=None):
+    """
+    Fetch the words and phrases a student has due for review.
+
+    Args:
+        student_id (int): The ID of the student.
+        limit (int, optional): The most items to return.
+        now (datetime, optional): The current time, defaults to now in UTC.
+
+    Returns:
+        dict: The due items, most overdue first, and counts for the whole deck.
+    """
+    now_minute = to_epoch_minutes(now or datetime.now(timezone.utc))
+    lexeme_ids, stats = review_decks.due(student_id, now_minute, limit)
+    lexemes = {lexeme.id: lexeme for lexeme in db.session.execute(
+        select(Lexeme).where(Lexeme.id.in_(lexeme_ids))
+    ).scalars()} if lexeme_ids else {}
+    items = [
+        {'lexeme_id': lexeme_id, 'kind': lexemes[lexeme_id].kind, 'content': lexemes[lexeme_id].content}
+        for lexeme_id in lexeme_ids if lexeme_id in lexemes
+    ]
+    return {'items': items, **stats}
+
+
+def record_review(student_id, lexeme_id, grade, now=None):
+    """
+    Record how well a student recalled an item and schedule its next review.
+
+    Args:
+        student_id (int): The ID of the student.
+        lexeme_id (int): The ID of the word or phrase reviewed.
+        grade (int): The recall grade, from 0 to 5.
+        now (datetime, optional): The time of the review, defaults to now in UTC.
+
+    Returns:
+        dict: Status, message and, on success, the next due time in UTC.
+    """
+    if not isinstance(grade, int) or isinstance(grade, bool) or not 0 <= grade <= 5:
+        return {'status': 'error', 'message': 'Grade must be a whole number from 0 to 5'}
+
+    item = db.session.get(ReviewItem, (student_id, lexeme_id))
+    if item is None:
+        return {'status': 'error', 'message': 'Review item not found'}
+
+    now_minute = to_epoch_minutes(now or datetime.now(timezone.utc))
+    item.repetitions, item.interval_days, item.ease, due_in, lapsed = schedule_review(
+        item.repetitions, item.interval_days, item.ease, grade
+    )
+    item.due_minute = now_minute + due_in
+    item.lapses += lapsed
+    item.last_reviewed = from_epoch_minutes(now_minute)
+    due_minute, interval_days, ease = item.due_minute, item.interval_days, item.ease
+    db.session.commit()
+
+    review_decks.apply(student_id, lexeme_id, due_minute, interval_days, ease)
+    return {
+        'status': 'success',
+        'message': 'Review recorded',
+        'due': from_epoch_minutes(due_minute).isoformat() + 'Z',
+        'interval_days': interval_days,
+    }
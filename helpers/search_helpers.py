@@ -0,0 +1,250 @@
+# search_helpers.py
+"""
+Full-text search over lesson records, backed by an SQLite FTS5 table.
+
+lesson_record_fts holds one row per lesson record (rowid = lesson_record.id) with the
+summary, feedback and the record's words and phrases. Triggers on lesson_record and
+lesson_record_lexeme keep it in step with every write, ORM or not. The scope column holds
+'t<teacher_id> s<student_id>' tokens, so restricting a search to one teacher or student is
+part of the MATCH instead of a filter over every hit.
+
+The index is created by the migration, or by `flask search create` on a database made
+with db.create_all(); until it exists, search is reported as unavailable.
+"""
+import re
+import time
+import click
+from dataclasses import dataclass
+from flask.cli import AppGroup
+from markupsafe import Markup, escape
+from sqlalchemy import func, select, text
+from database import db, read_only
+from models import LessonRecord
+from helpers.lesson_view_helpers import LessonRecordView, fetch_lesson_record_views
+
+SEARCH_RESULTS_PER_PAGE = 10
+
+# bm25 weights for scope, lesson_summary, strengths, areas_to_improve and terms
+RANK_WEIGHTS = (0.0, 5.0, 2.0, 2.0, 3.0)
+
+# Columns a snippet may come from, in order of preference (scope is never shown)
+SNIPPET_COLUMNS = (1, 2, 3, 4)
+
+# Snippet markers; the snippet is escaped before they are turned into <mark> tags
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+# Words and phrases in the lesson's order; the inner ORDER BY feeds group_concat in that order
+_TERMS = """(SELECT group_concat(content, ' ') FROM (SELECT lexeme.content FROM lesson_record_lexeme
+    JOIN lexeme ON lexeme.id = lesson_record_lexeme.lexeme_id
+    WHERE lesson_record_lexeme.lesson_record_id = {record_id}
+    ORDER BY lesson_record_lexeme.position))"""
+_SCOPE = "'t' || coalesce({row}.teacher_id, '') || ' s' || coalesce({row}.student_id, '')"
+
+SEARCH_INDEX_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS lesson_record_fts USING fts5(
+        scope, lesson_summary, strengths, areas_to_improve, terms,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS lesson_record_fts_insert AFTER INSERT ON lesson_record BEGIN
+        INSERT INTO lesson_record_fts (rowid, scope, lesson_summary, strengths, areas_to_improve, terms)
+        VALUES (new.id, {_SCOPE.format(row='new')}, new.lesson_summary, new.strengths, new.areas_to_improve,
+                {_TERMS.format(record_id='new.id')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS lesson_record_fts_update
+    AFTER UPDATE OF teacher_id, student_id, lesson_summary, strengths, areas_to_improve ON lesson_record BEGIN
+        UPDATE lesson_record_fts SET scope = {_SCOPE.format(row='new')}, lesson_summary = new.lesson_summary,
+            strengths = new.strengths, areas_to_improve = new.areas_to_improve
+        WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS lesson_record_fts_delete AFTER DELETE ON lesson_record BEGIN
+        DELETE FROM lesson_record_fts WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS lesson_record_fts_terms_insert AFTER INSERT ON lesson_record_lexeme BEGIN
+        UPDATE lesson_record_fts SET terms = {_TERMS.format(record_id='new.lesson_record_id')}
+        WHERE rowid = new.lesson_record_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS lesson_record_fts_terms_delete AFTER DELETE ON lesson_record_lexeme BEGIN
+        UPDATE lesson_record_fts SET terms = {_TERMS.format(record_id='old.lesson_record_id')}
+        WHERE rowid = old.lesson_record_id;
+    END""",
+    # Reordering a lesson's terms only moves positions
+    f"""CREATE TRIGGER IF NOT EXISTS lesson_record_fts_terms_update AFTER UPDATE OF position ON lesson_record_lexeme BEGIN
+        UPDATE lesson_record_fts SET terms = {_TERMS.format(record_id='new.lesson_record_id')}
+        WHERE rowid = new.lesson_record_id;
+    END""",
+]
+
+
+@dataclass(frozen=True, slots=True)
+class SearchHit:
+    record: LessonRecordView
+    snippet: Markup
+
+
+def search_supported():
+    """
+    Check whether the database supports the FTS5 lesson search (SQLite only).
+    """
+    return db.engine.dialect.name == 'sqlite'
+
+
+def search_available():
+    """
+    Check whether the lesson search index exists and can be queried.
+    """
+    return search_supported() and db.session.execute(
+        text("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = 'lesson_record_fts'")
+    ).scalar() > 0
+
+
+def ensure_search_index():
+    """
+    Create the search table and its triggers if they are missing, indexing the existing
+    lesson records when the table is new. Does nothing on databases other than SQLite.
+    """
+    if not search_supported():
+        return
+    created = not search_available()
+    for statement in SEARCH_INDEX_DDL:
+        db.session.execute(text(statement))
+    db.session.commit()
+    if created:
+        rebuild_search_index()
+
+
+def rebuild_search_index(batch_size=5000):
+    """
+    Re-index every lesson record from scratch, committing after each batch of IDs.
+
+    Args:
+        batch_size (int, optional): The number of lesson record IDs indexed per transaction.
+
+    Returns:
+        dict: The number of records indexed, the number of batches and the elapsed time.
+    """
+    started = time.perf_counter()
+    db.session.execute(text("DELETE FROM lesson_record_fts"))
+    db.session.commit()
+
+    max_id = db.session.execute(select(func.max(LessonRecord.id))).scalar() or 0
+    indexed = batches = 0
+    for first_id in range(1, max_id + 1, batch_size):
+        result = db.session.execute(text(f"""
+            INSERT INTO lesson_record_fts (rowid, scope, lesson_summary, strengths, areas_to_improve, terms)
+            SELECT lesson_record.id, {_SCOPE.format(row='lesson_record')}, lesson_record.lesson_summary,
+                   lesson_record.strengths, lesson_record.areas_to_improve, {_TERMS.format(record_id='lesson_record.id')}
+            FROM lesson_record WHERE lesson_record.id >= :first_id AND lesson_record.id < :last_id
+        """), {'first_id': first_id, 'last_id': first_id + batch_size})
+        db.session.commit()
+        indexed += result.rowcount
+        batches += 1
+
+    # Merge the per-batch segments so queries read a single b-tree per term
+    db.session.execute(text("INSERT INTO lesson_record_fts (lesson_record_fts) VALUES ('optimize')"))
+    db.session.commit()
+    return {'indexed': indexed, 'batches': batches, 'elapsed_seconds': round(time.perf_counter() - started, 3)}
+
+
+def build_match_query(query):
+    """
+    Turn what a user typed into an FTS5 query over the lesson text columns.
+
+    "Quoted text" is kept as a phrase and every other word must appear somewhere in the
+    record. Each word is quoted, so FTS5 operators and punctuation in the input are inert.
+
+    Args:
+        query (str): The search box text.
+
+    Returns:
+        str: The FTS5 expression, or None if the text has no searchable words.
+    """
+    parts = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        words = re.findall(r'\w+', phrase or word)
+        if words:
+            parts.append('"' + ' '.join(words) + '"')
+    if not parts:
+        return None
+    return '{lesson_summary strengths areas_to_improve terms}: (' + ' '.join(parts) + ')'
+
+
+def _highlight(snippet):
+    return Markup(str(escape(snippet or '')).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+@read_only()
+def search_lesson_records(user_id, user_type, query, timezone_str, student_id=None, page=1, per_page=SEARCH_RESULTS_PER_PAGE):
+    """
+    Search a user's lesson records, best match first.
+
+    Args:
+        user_id (int): The ID of the user (student or teacher).
+        user_type (str): The type of the user ('student' or 'teacher').
+        query (str): The search box text.
+        timezone_str (str): The timezone the lesson times are displayed in.
+        student_id (int, optional): For teachers, only search lessons with this student.
+        page (int, optional): The page of results, starting at 1.
+        per_page (int, optional): The number of results per page.
+
+    Returns:
+        tuple: A list of SearchHit objects and whether there is a next page.
+    """
+    match = build_match_query(query or '')
+    if match is None:
+        return [], False
+
+    scope = [f'"s{user_id}"'] if user_type == 'student' else [f'"t{user_id}"']
+    if user_type == 'teacher' and student_id is not None:
+        scope.append(f'"s{student_id}"')
+    match = ' AND '.join(f'scope: {token}' for token in scope) + f' AND {match}'
+
+    rows = db.session.execute(text(f"""
+        SELECT rowid, {', '.join(f"snippet(lesson_record_fts, {column}, :start, :end, '…', 16)" for column in SNIPPET_COLUMNS)}
+        FROM lesson_record_fts WHERE lesson_record_fts MATCH :match
+        ORDER BY bm25(lesson_record_fts, {', '.join(map(str, RANK_WEIGHTS))})
+        LIMIT :limit OFFSET :offset
+    """), {
+        'start': _MARK_START, 'end': _MARK_END, 'match': match,
+        'limit': per_page + 1, 'offset': (max(page, 1) - 1) * per_page
+    }).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    views = {view.id: view for view in fetch_lesson_record_views(
+        [LessonRecord.id.in_([row[0] for row in rows])], [], timezone_str, with_content=False
+    )} if rows else {}
+    hits = []
+    for record_id, *snippets in rows:
+        if record_id in views:
+            # The first column the match was found in
+            snippet = next((snippet for snippet in snippets if snippet and _MARK_START in snippet), snippets[0])
+            hits.append(SearchHit(views[record_id], _highlight(snippet)))
+    return hits, has_next
+
+
+search_cli = AppGroup('search', help='Lesson search index commands.')
+
+
+@search_cli.command('create')
+def create_command():
+    """
+    Create the lesson search index if it is missing (flask search create).
+    """
+    if not search_supported():
+        raise click.ClickException('Lesson search needs an SQLite database with FTS5.')
+    ensure_search_index()
+    click.echo('Lesson search index is ready.')
+
+
+@search_cli.command('rebuild')
+@click.option('--batch-size', default=5000, show_default=True, help='Lesson records indexed per transaction.')
+def rebuild_command(batch_size):
+    """
+    Re-index every lesson record for /search (flask search rebuild).
+    """
+    if not search_supported():
+        raise click.ClickException('Lesson search needs an SQLite database with FTS5.')
+    ensure_search_index()
+    metrics = rebuild_search_index(batch_size=batch_size)
+    for key, value in metrics.items():
+        click.echo(f"{key}: {value}")
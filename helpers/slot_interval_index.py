@@ -0,0 +1,165 @@
+# slot_interval_index.py
+import threading
+import time
+from bisect import bisect_left
+from sqlalchemy import event, select
+from database import RoutingSession, db
+from models import LessonSlot
+
+
+class TeacherIntervals:
+    """
+    One teacher's slots as parallel arrays sorted by start minute.
+    """
+    __slots__ = ('starts', 'ends', 'ids', 'longest', 'loaded_at')
+
+    def __init__(self, rows):
+        rows = sorted(rows)
+        self.starts = [start for start, _, _ in rows]
+        self.ends = [end for _, end, _ in rows]
+        self.ids = [slot_id for _, _, slot_id in rows]
+        self.longest = max((end - start for start, end, _ in rows), default=0)
+        self.loaded_at = time.monotonic()
+
+    def find_overlap(self, start, end, ignore_ids):
+        # Only slots starting before `end`, and after `start - longest`, can reach into the interval
+        i = bisect_left(self.starts, end) - 1
+        while i >= 0 and self.starts[i] > start - self.longest:
+            if self.ends[i] > start and self.ids[i] not in ignore_ids:
+                return self.ids[i]
+            i -= 1
+        return None
+
+    def add(self, slot_id, start, end):
+        i = bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.ids.insert(i, slot_id)
+        self.longest = max(self.longest, end - start)
+
+    def remove(self, slot_id):
+        if slot_id in self.ids:
+            i = self.ids.index(slot_id)
+            del self.starts[i], self.ends[i], self.ids[i]
+
+
+class SlotIntervalIndex:
+    """
+    In-memory index of each teacher's lesson slots as sorted epoch-minute intervals,
+    so checking a new slot for overlaps is a bisect instead of a query.
+
+    A teacher's slots are loaded on first use and kept in step with writes committed
+    through db.session. Entries older than SLOT_INDEX_TTL_SECONDS are reloaded, which
+    bounds how long another worker process's writes can go unseen.
+    """
+    def __init__(self, ttl_seconds=60):
+        self.ttl_seconds = ttl_seconds
+        self._teachers = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('SLOT_INDEX_TTL_SECONDS', 60)
+        self.ttl_seconds = app.config['SLOT_INDEX_TTL_SECONDS']
+
+    def _intervals(self, teacher_id):
+        intervals = self._teachers.get(teacher_id)
+        if intervals is None or time.monotonic() - intervals.loaded_at > self.ttl_seconds:
+            rows = db.session.execute(
+                select(LessonSlot.start_minute, LessonSlot.end_minute, LessonSlot.id).where(
+                    LessonSlot.teacher_id == teacher_id,
+                    LessonSlot.start_minute.isnot(None)
+                )
+            ).all()
+            intervals = self._teachers[teacher_id] = TeacherIntervals([tuple(row) for row in rows])
+        return intervals
+
+    def find_overlap(self, teacher_id, start_minute, end_minute, ignore_ids=()):
+        """
+        Find one of a teacher's slots overlapping [start_minute, end_minute).
+
+        Args:
+            teacher_id (int): The ID of the teacher.
+            start_minute (int): The start as UTC epoch minutes.
+            end_minute (int): The end as UTC epoch minutes.
+            ignore_ids (collection, optional): Slot IDs to disregard, e.g. ones being closed.
+
+        Returns:
+            int: The ID of an overlapping slot, or None.
+        """
+        with self._lock:
+            return self._intervals(teacher_id).find_overlap(start_minute, end_minute, set(ignore_ids))
+
+    def apply(self, added, removed):
+        """
+        Apply committed slot changes to the teachers already loaded.
+
+        Args:
+            added (list): (teacher_id, slot_id, start_minute, end_minute) tuples.
+            removed (list): (teacher_id, slot_id) tuples.
+        """
+        with self._lock:
+            for teacher_id, slot_id in removed:
+                if teacher_id in self._teachers:
+                    self._teachers[teacher_id].remove(slot_id)
+            for teacher_id, slot_id, start_minute, end_minute in added:
+                if teacher_id in self._teachers and start_minute is not None:
+                    self._teachers[teacher_id].add(slot_id, start_minute, end_minute)
+
+    def reset(self, teacher_id=None):
+        """
+        Forget one teacher's slots (or everyone's), so they are reloaded on next use.
+        """
+        with self._lock:
+            if teacher_id is None:
+                self._teachers.clear()
+            else:
+                self._teachers.pop(teacher_id, None)
+
+
+slot_index = SlotIntervalIndex()
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _collect_slot_changes(session, flush_context):
+    added = session.info.setdefault('slot_index_added', [])
+    removed = session.info.setdefault('slot_index_removed', [])
+    for obj in session.new:
+        if isinstance(obj, LessonSlot):
+            added.append((obj.teacher_id, obj.id, obj.start_minute, obj.end_minute))
+    for obj in session.deleted:
+        if isinstance(obj, LessonSlot):
+            removed.append((obj.teacher_id, obj.id))
+    for obj in session.dirty:
+        if isinstance(obj, LessonSlot) and session.is_modified(obj):
+            removed.append((obj.teacher_id, obj.id))
+            added.append((obj.teacher_id, obj.id, obj.start_minute, obj.end_minute))
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _collect_bulk_slot_changes(orm_execute_state):
+    # Bulk UPDATEs only ever flip is_booked, so only inserts and deletes move intervals.
+    # Statements may name the one teacher they touch with the slot_index_teacher_id option.
+    if not (orm_execute_state.is_insert or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is LessonSlot:
+        teacher_id = orm_execute_state.execution_options.get('slot_index_teacher_id')
+        orm_execute_state.session.info.setdefault('slot_index_resets', set()).add(teacher_id)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _apply_committed_slot_changes(session):
+    slot_index.apply(session.info.pop('slot_index_added', []), session.info.pop('slot_index_removed', []))
+    resets = session.info.pop('slot_index_resets', set())
+    if None in resets:
+        slot_index.reset()
+    else:
+        for teacher_id in resets:
+            slot_index.reset(teacher_id)
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _discard_slot_changes(session, transaction):
+    if transaction.parent is None:
+        for key in ('slot_index_added', 'slot_index_removed', 'slot_index_resets'):
+            session.info.pop(key, None)
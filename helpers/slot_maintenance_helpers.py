@@ -0,0 +1,128 @@
+# slot_maintenance_helpers.py
+import logging
+import threading
+import time
+import click
+from datetime import datetime, timedelta, timezone
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, select
+from database import db
+from models import LessonSlot, RecurringAvailabilityOverride
+
+
+def _purge_in_batches(model, condition, batch_size, sleep_seconds):
+    """
+    Delete rows matching a condition in chunks of batch_size, committing after each chunk
+    so the write lock is only ever held for one small batch.
+
+    Returns:
+        tuple: The number of rows deleted and the number of batches run.
+    """
+    deleted = 0
+    batches = 0
+    while True:
+        batch_ids = select(model.id).where(condition).limit(batch_size).scalar_subquery()
+        result = db.session.execute(delete(model).where(model.id.in_(batch_ids)).execution_options(synchronize_session=False))
+        db.session.commit()
+        if result.rowcount == 0:
+            break
+        deleted += result.rowcount
+        batches += 1
+        if result.rowcount < batch_size:
+            break
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+    return deleted, batches
+
+
+def purge_expired_slots(batch_size=500, sleep_seconds=0.0, dry_run=False, older_than=timedelta(days=1)):
+    """
+    Remove expired lesson slots from the database.
+
+    An expired slot is one where the end time is more than a day ago and the slot is not booked.
+    Overrides for recurring slots that have passed are removed as well.
+
+    Args:
+        batch_size (int, optional): The number of rows to delete per batch. Defaults to 500.
+        sleep_seconds (float, optional): The pause between batches. Defaults to 0.
+        dry_run (bool, optional): Only count what would be deleted. Defaults to False.
+        older_than (timedelta, optional): How long after ending a slot is kept. Defaults to one day.
+
+    Returns:
+        dict: The matched and deleted counts, the number of batches and the elapsed time.
+    """
+    started = time.perf_counter()
+    cutoff = datetime.now(timezone.utc) - older_than
+    expired_slot = (LessonSlot.end_time < cutoff) & (LessonSlot.is_booked == False)
+    expired_override = RecurringAvailabilityOverride.start_time < cutoff
+
+    metrics = {
+        'expired_slots': db.session.scalar(select(func.count()).select_from(LessonSlot).where(expired_slot)),
+        'expired_overrides': db.session.scalar(select(func.count()).select_from(RecurringAvailabilityOverride).where(expired_override)),
+        'deleted_slots': 0,
+        'deleted_overrides': 0,
+        'batches': 0,
+        'dry_run': dry_run
+    }
+
+    if not dry_run:
+        metrics['deleted_slots'], slot_batches = _purge_in_batches(LessonSlot, expired_slot, batch_size, sleep_seconds)
+        metrics['deleted_overrides'], override_batches = _purge_in_batches(RecurringAvailabilityOverride, expired_override, batch_size, sleep_seconds)
+        metrics['batches'] = slot_batches + override_batches
+
+    metrics['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+    logging.info(f"Expired slot purge: {metrics}")
+    return metrics
+
+
+slots_cli = AppGroup('slots', help='Lesson slot maintenance commands.')
+
+
+@slots_cli.command('purge')
+@click.option('--batch-size', default=500, show_default=True, help='Rows deleted per transaction.')
+@click.option('--sleep', 'sleep_seconds', default=0.0, show_default=True, help='Seconds to pause between batches.')
+@click.option('--dry-run', is_flag=True, help='Only report how many rows would be deleted.')
+def purge_command(batch_size, sleep_seconds, dry_run):
+    """
+    Remove expired, unbooked lesson slots (flask slots purge).
+    """
+    metrics = purge_expired_slots(batch_size=batch_size, sleep_seconds=sleep_seconds, dry_run=dry_run)
+    for key, value in metrics.items():
+        click.echo(f"{key}: {value}")
+
+
+def start_purge_scheduler(app):
+    """
+    Run the expired slot purge periodically on a background thread.
+
+    Enabled by setting SLOT_PURGE_INTERVAL_SECONDS; SLOT_PURGE_BATCH_SIZE and
+    SLOT_PURGE_SLEEP_SECONDS tune each run.
+
+    Args:
+        app (Flask): The Flask application.
+
+    Returns:
+        threading.Thread: The scheduler thread, or None if the purge is not scheduled.
+    """
+    interval = app.config.get('SLOT_PURGE_INTERVAL_SECONDS')
+    if not interval:
+        return None
+
+    def run():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    purge_expired_slots(
+                        batch_size=app.config.get('SLOT_PURGE_BATCH_SIZE', 500),
+                        sleep_seconds=app.config.get('SLOT_PURGE_SLEEP_SECONDS', 0.0)
+                    )
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.error(f"Error purging expired slots: {e}")
+                finally:
+                    db.session.remove()
+
+    thread = threading.Thread(target=run, name='slot-purge-scheduler', daemon=True)
+    thread.start()
+    return thread
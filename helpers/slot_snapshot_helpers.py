@@ -0,0 +1,192 @@
+# slot_snapshot_helpers.py
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import Integer, Text, cast, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from database import db
+from models import CacheEntry
+
+
+class InMemorySnapshotBackend:
+    """
+    Default snapshot backend: a thread-safe, in-process LRU with TTL eviction.
+
+    Any object exposing the same get/set/delete/incr methods (e.g. one backed by Redis,
+    or DatabaseSnapshotBackend) can be used instead. Each worker process has its own
+    memory, so entries here are only seen by the worker that stored them.
+    """
+    def __init__(self, max_entries=1024, ttl_seconds=900):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl_seconds=None):
+        with self._lock:
+            ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            expires_at, value = self._entries.get(key, (float('inf'), 0))
+            self._entries[key] = (expires_at, value + 1)
+            return value + 1
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+
+class DatabaseSnapshotBackend:
+    """
+    Snapshot backend kept in the cache_entry table, so every worker process sees the same
+    entries. Values must be JSON-serializable.
+
+    Each call runs on its own connection and transaction, never the request's db.session,
+    so storing an entry cannot commit (or be rolled back with) the caller's changes.
+    Expired rows are skipped on read and deleted at most every PURGE_INTERVAL_SECONDS.
+    """
+    PURGE_INTERVAL_SECONDS = 60
+
+    def __init__(self, ttl_seconds=900):
+        self.ttl_seconds = ttl_seconds
+        self._purged_at = 0.0
+
+    @staticmethod
+    def _insert(connection):
+        dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+        return dialect.insert(CacheEntry)
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        """
+        Fetch several entries in one query, in the order of keys (None for missing ones).
+        """
+        now = int(time.time())
+        with db.engine.connect() as connection:
+            rows = dict(connection.execute(
+                select(CacheEntry.key, CacheEntry.value).where(
+                    CacheEntry.key.in_(keys),
+                    (CacheEntry.expires_at.is_(None)) | (CacheEntry.expires_at >= now)
+                )
+            ).all())
+        return [json.loads(rows[key]) if key in rows else None for key in keys]
+
+    def set(self, key, value, ttl_seconds=None):
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        values = {'key': key, 'value': json.dumps(value), 'expires_at': int(now + ttl_seconds)}
+        with db.engine.begin() as connection:
+            statement = self._insert(connection).values(**values)
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=[CacheEntry.key],
+                set_={'value': statement.excluded.value, 'expires_at': statement.excluded.expires_at}
+            ))
+            if now - self._purged_at > self.PURGE_INTERVAL_SECONDS:
+                self._purged_at = now
+                connection.execute(delete(CacheEntry).where(CacheEntry.expires_at < int(now)))
+
+    def delete(self, key):
+        with db.engine.begin() as connection:
+            connection.execute(delete(CacheEntry).where(CacheEntry.key == key))
+
+    def incr(self, key):
+        """
+        Atomically add one to a counter that never expires, starting from 0, and return it.
+        """
+        with db.engine.begin() as connection:
+            statement = self._insert(connection).values(key=key, value='1', expires_at=None)
+            return int(connection.execute(statement.on_conflict_do_update(
+                index_elements=[CacheEntry.key],
+                set_={'value': cast(cast(CacheEntry.value, Integer) + 1, Text)}
+            ).returning(CacheEntry.value)).scalar())
+
+
+class SlotSnapshotStore:
+    """
+    Server-side store for the slot lists shown on /student/bookLesson.
+
+    Each rendering of the page stores its list under a new token, which the booking form
+    carries back in a hidden field, so the session cookie does not grow with the number of
+    slots and two open tabs never replace each other's list. Snapshots are kept in the
+    cache_entry table by default, so the POST can be handled by any worker.
+    Configured from SLOT_SNAPSHOT_TTL_SECONDS.
+    """
+    def __init__(self, backend=None):
+        self.backend = backend
+
+    def init_app(self, app, backend=None):
+        app.config.setdefault('SLOT_SNAPSHOT_TTL_SECONDS', 900)
+        if backend is not None:
+            self.backend = backend
+        elif self.backend is None:
+            self.backend = DatabaseSnapshotBackend(ttl_seconds=app.config['SLOT_SNAPSHOT_TTL_SECONDS'])
+
+    @staticmethod
+    def _owner(token):
+        return token.split(':')[1] if token and token.count(':') == 2 else None
+
+    def save(self, student_id, slots_dict):
+        """
+        Store a slot list under a new token.
+
+        Args:
+            student_id (int): The ID of the student viewing the slots.
+            slots_dict (list): The slots as produced by convert_slots_to_dict.
+
+        Returns:
+            str: The token naming the snapshot, for the booking form.
+        """
+        token = f"slots:{student_id}:{secrets.token_urlsafe(12)}"
+        self.backend.set(token, slots_dict)
+        return token
+
+    def load(self, token, student_id):
+        """
+        Fetch the slot list a booking form refers to.
+
+        Args:
+            token (str): The token from the booking form.
+            student_id (int): The ID of the student submitting the form.
+
+        Returns:
+            list: The stored slots, or None if the token is missing, expired or belongs to
+            another student.
+        """
+        if self._owner(token) != str(student_id):
+            return None
+        return self.backend.get(token)
+
+    def discard_slot(self, token, slot_id):
+        """
+        Remove a slot (e.g. one that was just booked) from a snapshot.
+        """
+        slots_dict = self.backend.get(token) if token else None
+        if slots_dict is not None:
+            self.backend.set(token, [slot for slot in slots_dict if slot['id'] != slot_id])
+
+
+slot_snapshots = SlotSnapshotStore()
@@ -1,8 +1,13 @@
-from models import LessonSlot, Booking, LessonRecord
+from models import LessonSlot, Booking, LessonRecord, Student, Teacher
 from database import db
+from helpers.recurring_availability_helpers import expand_recurring_availability, materialize_recurring_slot, is_virtual_slot_id
+from helpers.query_shape_helpers import BOOKABLE_SLOT
+from helpers.slot_snapshot_helpers import slot_snapshots
+from helpers.time_helpers import localize_utc_times
 from datetime import datetime, timezone
-from helpers.time_helpers import ensure_timezone_aware
-from sqlalchemy.orm import joinedload
+from typing import NamedTuple
+from sqlalchemy import select, update
+from sqlalchemy.orm import aliased
 
 
 def fetch_available_slots(_, start_of_week_utc, end_of_week_utc, teacher_id=None):
@@ -16,46 +21,120 @@ def fetch_available_slots(_, start_of_week_utc, end_of_week_utc, teacher_id=None
         teacher_id (int, optional): The ID of the teacher to filter by. Defaults to None.
 
     Returns:
-        list: A list of available LessonSlot objects.
+        list: A list of available LessonSlot objects, plus VirtualSlot objects for open
+        recurring availability.
     """
     available_slots = LessonSlot.query.filter(
         LessonSlot.start_time.between(start_of_week_utc, end_of_week_utc),
         LessonSlot.start_time > datetime.now(timezone.utc),
         LessonSlot.is_booked == False,
         (LessonSlot.teacher_id == teacher_id) if teacher_id is not None else True,
+    ).options(
+        *BOOKABLE_SLOT
     ).order_by(LessonSlot.start_time.asc()).all()
+
+    recurring_slots = expand_recurring_availability(start_of_week_utc, end_of_week_utc, teacher_id, not_before=datetime.now(timezone.utc))
+    if recurring_slots:
+        available_slots = sorted(available_slots + recurring_slots, key=lambda slot: slot.start_time)
     return available_slots
 
 
-def convert_slots_to_dict(lesson_slots):
+class TeacherView(NamedTuple):
+    """
+    The teacher fields shown next to a slot on the booking page.
+    """
+    id: int
+    username: str
+
+
+class SlotView:
+    """
+    Lightweight, detached stand-in for a LessonSlot on the booking page.
+
+    Used on both the GET path (built from ORM rows) and the POST path (rebuilt from
+    the stored snapshot), so neither has to synthesize classes per slot or touch ORM
+    instances when converting times for display.
+    """
+    __slots__ = ('id', 'start_time', 'end_time', 'teacher')
+
+    def __init__(self, id, start_time, end_time, teacher):
+        self.id = id
+        self.start_time = start_time
+        self.end_time = end_time
+        self.teacher = teacher
+
+    @classmethod
+    def from_lesson_slot(cls, slot):
+        return cls(slot.id, slot.start_time, slot.end_time, TeacherView(slot.teacher.id, slot.teacher.username))
+
+    @classmethod
+    def from_dict(cls, slot_dict):
+        return cls(
+            slot_dict['id'],
+            datetime.fromisoformat(slot_dict['start_time']),
+            datetime.fromisoformat(slot_dict['end_time']),
+            TeacherView(slot_dict['teacher_id'], slot_dict['teacher_username'])
+        )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'start_time': self.start_time.isoformat(),
+            'end_time': self.end_time.isoformat(),
+            'teacher_id': self.teacher.id,
+            'teacher_username': self.teacher.username,
+        }
+
+
+def convert_slots_to_views(lesson_slots):
     """
-    Convert lesson slot objects to a dictionary format.
+    Convert LessonSlot objects to SlotView objects.
 
     Args:
         lesson_slots (list): A list of LessonSlot objects.
 
+    Returns:
+        list: A list of SlotView objects.
+    """
+    return [SlotView.from_lesson_slot(slot) for slot in lesson_slots]
+
+
+def convert_slots_to_dict(slot_views):
+    """
+    Convert SlotView objects to a dictionary format.
+
+    Args:
+        slot_views (list): A list of SlotView objects.
+
     Returns:
         list: A list of dictionaries representing the lesson slots.
     """
-    available_slots_dict = [
-        {
-            'id': slot.id,
-            'start_time': slot.start_time.isoformat(),
-            'end_time': slot.end_time.isoformat(),
-            'teacher_id': slot.teacher.id,
-            'teacher_username': slot.teacher.username,
-        }
-        for slot in lesson_slots
-    ]
-    return available_slots_dict
+    return [slot.to_dict() for slot in slot_views]
+
+
+def convert_dict_to_slots(slots_dict):
+    """
+    Rebuild SlotView objects from the output of convert_slots_to_dict.
+
+    Args:
+        slots_dict (list): A list of dictionaries representing the lesson slots.
+
+    Returns:
+        list: A list of SlotView objects.
+    """
+    return [SlotView.from_dict(slot_dict) for slot_dict in slots_dict]
 
 
-def update_student_booking(session, form, student, current_time):
+def update_student_booking(form, student, current_time):
     """
     Update a student's booking for a lesson.
 
+    The slot and the student's lesson credits are claimed with conditional UPDATEs
+    (e.g. SET is_booked=1 WHERE id=? AND is_booked=0) rather than read-check-write,
+    so two students racing for the same slot can never both succeed: the loser
+    simply sees zero affected rows.
+
     Args:
-        session (dict): The session object.
         form (Form): The form containing booking data.
         student (Student): The student object.
         current_time (datetime): The current time.
@@ -65,34 +144,110 @@ def update_student_booking(session, form, student, current_time):
     """
     lesson_slot_id = form.lesson_slot.data
     teacher_id = form.teacher.data
+    current_time_utc = current_time.astimezone(timezone.utc)
 
-    lesson_slot = db.session.get(LessonSlot, lesson_slot_id)
-    if lesson_slot is None or lesson_slot.is_booked or ensure_timezone_aware(lesson_slot.start_time, student.timezone) < current_time:
-        return None, 'Invalid or unavailable lesson slot selected.'
-
-    if student.lessons_purchased <= student.number_of_lessons:
-        return None, 'Not enough points to book a lesson.'
+    try:
+        # Recurring slots only get a row once someone books them
+        slot_row_id = materialize_recurring_slot(lesson_slot_id) if is_virtual_slot_id(lesson_slot_id) else lesson_slot_id
 
-    lesson_record = LessonRecord(student_id=student.id, teacher_id=teacher_id, lesson_slot_id=lesson_slot.id)
-    db.session.add(lesson_record)
-    db.session.flush()
+        slot_claimed = db.session.execute(
+            update(LessonSlot)
+            .where(
+                LessonSlot.id == slot_row_id,
+                LessonSlot.is_booked == False,
+                LessonSlot.start_time >= current_time_utc
+            )
+            .values(is_booked=True)
+        ).rowcount
+        if slot_claimed != 1:
+            db.session.rollback()
+            return None, 'Invalid or unavailable lesson slot selected.'
 
-    booking = Booking(student_id=student.id, lesson_slot_id=lesson_slot.id, status='booked', lesson_record_id=lesson_record.id)
-    db.session.add(booking)
+        credit_taken = db.session.execute(
+            update(Student)
+            .where(
+                Student.id == student.id,
+                Student.number_of_lessons < Student.lessons_purchased
+            )
+            .values(number_of_lessons=Student.number_of_lessons + 1)
+        ).rowcount
+        if credit_taken != 1:
+            db.session.rollback()
+            return None, 'Not enough points to book a lesson.'
 
-    lesson_slot.is_booked = True
-    student.number_of_lessons += 1
+        lesson_record = LessonRecord(student_id=student.id, teacher_id=teacher_id, lesson_slot_id=slot_row_id)
+        db.session.add(lesson_record)
+        db.session.flush()
 
-    session['available_slots'] = [slot for slot in session['available_slots'] if slot['id'] != lesson_slot_id]
+        booking = Booking(student_id=student.id, lesson_slot_id=slot_row_id, status='booked', lesson_record_id=lesson_record.id)
+        db.session.add(booking)
 
-    try:
         db.session.commit()
-        return lesson_record, None
     except Exception as e:
         db.session.rollback()
         return None, f'Error booking lesson: {e}'
+
+    slot_snapshots.discard_slot(form.snapshot.data, lesson_slot_id)
+    return lesson_record, None
     
 
+def query_open_slots(student_id, start_of_week, end_of_week, teacher_id=None):
+    """
+    Fetch the open slots a student could book in a week, in a single query.
+
+    The teacher is joined in rather than lazy-loaded per slot, and slots that clash with
+    one of the student's existing bookings are excluded in SQL. Open recurring availability
+    is expanded and merged in afterwards.
+
+    Args:
+        student_id (int): The ID of the student.
+        start_of_week (datetime): The start of the week in UTC.
+        end_of_week (datetime): The end of the week in UTC.
+        teacher_id (int, optional): The ID of the teacher to filter by. Defaults to None.
+
+    Returns:
+        list: Rows of (id, start_time, end_time, teacher_id, teacher_username), ordered by start time.
+    """
+    booked_slot = aliased(LessonSlot)
+    clashing_booking = select(Booking.id).join(booked_slot, Booking.lesson_slot_id == booked_slot.id).where(
+        Booking.student_id == student_id,
+        booked_slot.start_time == LessonSlot.start_time
+    )
+
+    query = select(
+        LessonSlot.id,
+        LessonSlot.start_time,
+        LessonSlot.end_time,
+        LessonSlot.teacher_id,
+        Teacher.username
+    ).join(Teacher, LessonSlot.teacher_id == Teacher.id).where(
+        LessonSlot.is_booked == False,
+        LessonSlot.start_time >= start_of_week,
+        LessonSlot.start_time <= end_of_week,
+        LessonSlot.start_time >= datetime.now(timezone.utc),
+        ~clashing_booking.exists()
+    )
+    if teacher_id is not None:
+        query = query.where(LessonSlot.teacher_id == teacher_id)
+
+    open_slots = db.session.execute(query.order_by(LessonSlot.start_time.asc())).all()
+
+    recurring_slots = expand_recurring_availability(start_of_week, end_of_week, teacher_id, not_before=datetime.now(timezone.utc))
+    if recurring_slots:
+        booked_start_times = set(db.session.execute(
+            select(LessonSlot.start_time).join(Booking, Booking.lesson_slot_id == LessonSlot.id).where(
+                Booking.student_id == student_id,
+                LessonSlot.start_time >= start_of_week,
+                LessonSlot.start_time <= end_of_week
+            )
+        ).scalars())
+        open_slots = sorted(open_slots + [
+            (slot.id, slot.start_time, slot.end_time, slot.teacher_id, slot.teacher.username)
+            for slot in recurring_slots if slot.start_time not in booked_start_times
+        ], key=lambda row: row[1])
+    return open_slots
+
+
 def fetch_and_format_slots(student, teacher_id, start_of_week, end_of_week, user_timezone):
     """
     Fetch and format lesson slots for a student and teacher.
@@ -107,34 +262,47 @@ def fetch_and_format_slots(student, teacher_id, start_of_week, end_of_week, user
     Returns:
         list: A list of dictionaries representing the lesson slots.
     """
-    current_time_utc = datetime.now(timezone.utc)
+    rows = query_open_slots(student.id, start_of_week, end_of_week, teacher_id)
+    start_times = localize_utc_times([row[1] for row in rows], user_timezone.zone, '%Y-%m-%d %I:%M %p')
+    end_times = localize_utc_times([row[2] for row in rows], user_timezone.zone, '%I:%M %p')
+    return [{
+        'id': slot_id,
+        'start_time': start_time,
+        'end_time': end_time,
+        'teacher': username
+    } for (slot_id, _, _, _, username), start_time, end_time in zip(rows, start_times, end_times)]
 
-    # Get the student's existing bookings
-    existing_bookings = Booking.query.options(joinedload(Booking.lesson_slot)).filter(
-        Booking.student_id == student.id,
-        LessonSlot.start_time >= start_of_week,
-        LessonSlot.end_time <= end_of_week
-    ).all()
 
-    # Get the start times of the LessonSlots associated with the existing bookings
-    existing_booking_start_times = [booking.lesson_slot.start_time for booking in existing_bookings]
+def fetch_weekly_availability(student, start_of_week, end_of_week, user_timezone):
+    """
+    Build a columnar payload of every teacher's open slots for the week.
 
-    slots = LessonSlot.query.filter(
-        LessonSlot.teacher_id == teacher_id,
-        LessonSlot.is_booked == False,
-        LessonSlot.start_time >= start_of_week,
-        LessonSlot.start_time <= end_of_week,
-        LessonSlot.start_time >= current_time_utc
-    ).all()
+    Slots are returned as parallel arrays, with each slot pointing at its teacher by
+    index into the teachers arrays, so the booking page can filter by teacher in the
+    browser without another round trip.
+
+    Args:
+        student (Student): The student object.
+        start_of_week (datetime): The start of the week in UTC.
+        end_of_week (datetime): The end of the week in UTC.
+        user_timezone (timezone): The user's timezone.
 
-    # Filter out slots that start at the same time as existing bookings
-    slots = [slot for slot in slots if slot.start_time not in existing_booking_start_times]
+    Returns:
+        dict: The teachers and slots for the week.
+    """
+    teachers = {'id': [], 'username': []}
+    slots = {'id': [], 'teacher': [], 'start_time': [], 'end_time': []}
+    teacher_index = {}
 
-    slots_dict = [{
-        'id': slot.id,
-        'start_time': slot.start_time.replace(tzinfo=timezone.utc).astimezone(user_timezone).strftime('%Y-%m-%d %I:%M %p'),
-        'end_time': slot.end_time.replace(tzinfo=timezone.utc).astimezone(user_timezone).strftime('%I:%M %p'),
-        'teacher': slot.teacher.username
-    } for slot in slots]
+    rows = query_open_slots(student.id, start_of_week, end_of_week)
+    for slot_id, _, _, teacher_id, username in rows:
+        if teacher_id not in teacher_index:
+            teacher_index[teacher_id] = len(teachers['id'])
+            teachers['id'].append(teacher_id)
+            teachers['username'].append(username)
+        slots['id'].append(slot_id)
+        slots['teacher'].append(teacher_index[teacher_id])
+    slots['start_time'] = localize_utc_times([row[1] for row in rows], user_timezone.zone, '%Y-%m-%d %I:%M %p')
+    slots['end_time'] = localize_utc_times([row[2] for row in rows], user_timezone.zone, '%I:%M %p')
 
-    return slots_dict
+    return {'teachers': teachers, 'slots': slots}
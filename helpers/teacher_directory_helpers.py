@@ -0,0 +1,320 @@
+# teacher_directory_helpers.py
+"""
+The public teacher directory on /meetYourTeachers.
+
+Each page is selected as columns into frozen card views (one query for the cards, one for
+the count), so the template never lazy-loads a profile. Built pages are cached. Committing
+a change to a teacher or profile drops every cached page, and changes to slots or recurring
+availability drop only the pages filtered by availability.
+"""
+import threading
+import pytz
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import event, func, select
+from database import RoutingSession, db, read_only
+from models import LessonSlot, RecurringAvailability, RecurringAvailabilityOverride, Teacher, TeacherProfile
+from helpers.recurring_availability_helpers import expand_recurring_availability
+from helpers.slot_snapshot_helpers import DatabaseSnapshotBackend, InMemorySnapshotBackend
+from helpers.time_helpers import get_zone, to_epoch_minutes
+
+TEACHERS_PER_PAGE = 6
+AVAILABILITY_DAY_CHOICES = (1, 3, 7, 14)
+DEFAULT_OFFSET_HOURS = 3
+
+# Changes to these models show up on every directory page, or only on availability-filtered ones
+PROFILE_MODELS = (Teacher, TeacherProfile)
+AVAILABILITY_MODELS = (LessonSlot, RecurringAvailability, RecurringAvailabilityOverride)
+
+
+@dataclass(frozen=True, slots=True)
+class TeacherProfileView:
+    image_file: str
+    age: Optional[int] = None
+    hobbies: Optional[str] = None
+    motto: Optional[str] = None
+    blood_type: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class TeacherCardView:
+    id: int
+    username: str
+    timezone: Optional[str]
+    profile: Optional[TeacherProfileView] = None
+
+
+@dataclass(frozen=True, slots=True)
+class DirectoryFilters:
+    """
+    The filters a visitor picked on /meetYourTeachers.
+
+    available_days keeps teachers with an open slot in that many days from now, hobby matches
+    part of their hobbies, and timezone keeps teachers whose UTC offset is within
+    DEFAULT_OFFSET_HOURS of the visitor's.
+    """
+    available_days: Optional[int] = None
+    hobby: Optional[str] = None
+    timezone: Optional[str] = None
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        Read the filters from request arguments, dropping values that are not valid.
+        """
+        available_days = args.get('days', type=int)
+        hobby = (args.get('hobby') or '').strip()[:50]
+        timezone_str = args.get('tz') or None
+        if timezone_str is not None:
+            try:
+                get_zone(timezone_str)
+            except pytz.UnknownTimeZoneError:
+                timezone_str = None
+        return cls(
+            available_days=available_days if available_days in AVAILABILITY_DAY_CHOICES else None,
+            hobby=hobby or None,
+            timezone=timezone_str
+        )
+
+    @property
+    def depends_on_slots(self):
+        return self.available_days is not None
+
+    @property
+    def utc_offset_minutes(self):
+        if self.timezone is None:
+            return None
+        return int(datetime.now(timezone.utc).astimezone(get_zone(self.timezone)).utcoffset() // timedelta(minutes=1))
+
+    @property
+    def cache_key(self):
+        # Visitors in different zones with the same offset share pages
+        return f"{self.available_days}:{(self.hobby or '').casefold()}:{self.utc_offset_minutes}"
+
+    def query_args(self):
+        """
+        The filters as request arguments, for links to other pages of the same listing.
+        """
+        args = {'days': self.available_days, 'hobby': self.hobby, 'tz': self.timezone}
+        return {key: value for key, value in args.items() if value is not None}
+
+
+class DirectoryPage:
+    """
+    One page of teacher cards, with the same paging attributes as a Flask-SQLAlchemy Pagination.
+    """
+    def __init__(self, items, page, per_page, total):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+
+    @property
+    def pages(self):
+        return max(1, -(-self.total // self.per_page))
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+
+def _zones_near(offset_minutes, hours):
+    # Only the zones teachers actually use are checked, usually a handful
+    now = datetime.now(timezone.utc)
+    zones = []
+    for (timezone_str,) in db.session.execute(select(Teacher.timezone).where(Teacher.timezone.isnot(None)).distinct()):
+        try:
+            zone_offset = now.astimezone(get_zone(timezone_str)).utcoffset() // timedelta(minutes=1)
+        except pytz.UnknownTimeZoneError:
+            continue
+        if abs(zone_offset - offset_minutes) <= hours * 60:
+            zones.append(timezone_str)
+    return zones
+
+
+def _available_teacher_ids(days):
+    now = datetime.now(timezone.utc)
+    end = now + timedelta(days=days)
+    teacher_ids = set(db.session.execute(
+        select(LessonSlot.teacher_id).where(
+            LessonSlot.is_booked == False,
+            LessonSlot.start_minute.between(to_epoch_minutes(now), to_epoch_minutes(end))
+        ).distinct()
+    ).scalars())
+    teacher_ids.update(slot.teacher_id for slot in expand_recurring_availability(now, end, not_before=now))
+    return teacher_ids
+
+
+@read_only()
+def fetch_directory_page(filters, page, per_page=TEACHERS_PER_PAGE):
+    """
+    Select one page of the teacher directory.
+
+    Args:
+        filters (DirectoryFilters): The filters to apply.
+        page (int): The page number, starting at 1.
+        per_page (int, optional): The number of teachers per page.
+
+    Returns:
+        DirectoryPage: The page, whose items are TeacherCardView objects.
+    """
+    criteria = []
+    if filters.hobby:
+        pattern = filters.hobby.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        criteria.append(TeacherProfile.hobbies.ilike(f'%{pattern}%', escape='\\'))
+    if filters.timezone:
+        criteria.append(Teacher.timezone.in_(_zones_near(filters.utc_offset_minutes, DEFAULT_OFFSET_HOURS)))
+    if filters.available_days:
+        criteria.append(Teacher.id.in_(_available_teacher_ids(filters.available_days)))
+
+    total = db.session.execute(
+        select(func.count(Teacher.id)).select_from(Teacher).outerjoin(
+            TeacherProfile, TeacherProfile.teacher_id == Teacher.id
+        ).where(*criteria)
+    ).scalar()
+    rows = db.session.execute(
+        select(
+            Teacher.id, Teacher.username, Teacher.timezone, TeacherProfile.id, TeacherProfile.image_file,
+            TeacherProfile.age, TeacherProfile.hobbies, TeacherProfile.motto, TeacherProfile.blood_type
+        ).select_from(Teacher).outerjoin(
+            TeacherProfile, TeacherProfile.teacher_id == Teacher.id
+        ).where(*criteria).order_by(Teacher.id).limit(per_page).offset((page - 1) * per_page)
+    ).all()
+
+    items = [
+        TeacherCardView(
+            id=teacher_id,
+            username=username,
+            timezone=timezone_str,
+            profile=TeacherProfileView(image_file, age, hobbies, motto, blood_type) if profile_id is not None else None
+        )
+        for teacher_id, username, timezone_str, profile_id, image_file, age, hobbies, motto, blood_type in rows
+    ]
+    return DirectoryPage(items, page, per_page, total)
+
+
+class TeacherDirectoryCache:
+    """
+    Cache of built /meetYourTeachers pages, keyed by filters and page number.
+
+    Keys carry a profile version, and availability-filtered pages also carry a slot version.
+    Committed changes bump the matching version, so stale pages are simply never asked for
+    again and age out of the LRU. Entries also expire after TEACHER_DIRECTORY_TTL_SECONDS,
+    since "available in the next N days" moves with the clock. The versions live in
+    version_backend, the cache_entry table by default, so every worker sees every bump.
+    Configured from TEACHER_DIRECTORY_MAX_ENTRIES and TEACHER_DIRECTORY_TTL_SECONDS.
+    """
+    def __init__(self, backend=None, version_backend=None):
+        self.backend = backend
+        self.version_backend = version_backend
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        self._lock = threading.Lock()
+
+    def init_app(self, app, backend=None, version_backend=None):
+        app.config.setdefault('TEACHER_DIRECTORY_MAX_ENTRIES', 512)
+        app.config.setdefault('TEACHER_DIRECTORY_TTL_SECONDS', 120)
+        if backend is not None:
+            self.backend = backend
+        elif self.backend is None:
+            self.backend = InMemorySnapshotBackend(
+                max_entries=app.config['TEACHER_DIRECTORY_MAX_ENTRIES'],
+                ttl_seconds=app.config['TEACHER_DIRECTORY_TTL_SECONDS']
+            )
+        if version_backend is not None:
+            self.version_backend = version_backend
+        elif self.version_backend is None:
+            self.version_backend = DatabaseSnapshotBackend()
+
+    def make_key(self, filters, page):
+        profiles_version, slots_version = (
+            version or 0 for version in self.version_backend.get_many(['directory-version:profiles', 'directory-version:slots'])
+        )
+        slots_version = slots_version if filters.depends_on_slots else '-'
+        return f"directory:{filters.cache_key}:{page}:{profiles_version}.{slots_version}"
+
+    def get_page(self, filters, page):
+        """
+        Return a page of the teacher directory, building and storing it on a miss.
+
+        Args:
+            filters (DirectoryFilters): The filters to apply.
+            page (int): The page number, starting at 1.
+
+        Returns:
+            DirectoryPage: The page of teacher cards.
+        """
+        key = self.make_key(filters, page)
+        directory_page = self.backend.get(key)
+        with self._lock:
+            self.stats['hits' if directory_page is not None else 'misses'] += 1
+        if directory_page is None:
+            directory_page = fetch_directory_page(filters, page)
+            self.backend.set(key, directory_page)
+        return directory_page
+
+    def invalidate(self, kind):
+        """
+        Drop the cached pages that depend on 'profiles' (all of them) or on 'slots'.
+        """
+        self.version_backend.incr(f"directory-version:{kind}")
+        with self._lock:
+            self.stats['invalidations'] += 1
+
+
+teacher_directory = TeacherDirectoryCache()
+
+
+def _directory_change(model):
+    if issubclass(model, PROFILE_MODELS):
+        return 'profiles'
+    if issubclass(model, AVAILABILITY_MODELS):
+        return 'slots'
+    return None
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _collect_directory_changes(session, flush_context):
+    changed = session.info.setdefault('directory_changes', set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        kind = _directory_change(type(obj))
+        if kind is not None:
+            changed.add(kind)
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _collect_bulk_directory_changes(orm_execute_state):
+    # e.g. claiming a slot on booking is a bulk UPDATE of LessonSlot
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    kind = _directory_change(mapper.class_) if mapper is not None else None
+    if kind is not None:
+        orm_execute_state.session.info.setdefault('directory_changes', set()).add(kind)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _invalidate_directory_pages(session):
+    if session.in_nested_transaction():
+        # A released SAVEPOINT; the outer transaction still holds its changes (and on SQLite the write lock)
+        return
+    for kind in session.info.pop('directory_changes', ()):
+        teacher_directory.invalidate(kind)
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _discard_directory_changes(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('directory_changes', None)
@@ -1,10 +1,8 @@
 # helpers/teacher_helpers.py
-from database import db
+from database import db, read_only
 from datetime import datetime, timezone
-from sqlalchemy.orm import joinedload
-from sqlalchemy import and_
 from helpers.file_helpers import save_image_file
-from helpers.time_helpers import ensure_timezone_aware
+from helpers.lesson_view_helpers import fetch_lesson_record_views
 from models import Teacher, TeacherProfile, LessonRecord, LessonSlot, Student, Booking
 
 
@@ -54,62 +52,7 @@ def update_teacher_profile(profile, form):
     db.session.commit()
 
 
-def get_most_recent_lesson_record(teacher_id, timezone_str):
-    """
-    Retrieve the most recent lesson record for a teacher.
-    Query is based on the last edit time and the presence of a lesson summary.
-    Created with help from ChatGPT!
-    Args:
-        teacher_id (int): The ID of the teacher.
-        timezone_str (str): The timezone string to make times timezone aware.
-
-    Returns:
-        LessonRecord: The most recent lesson record if found, else None.
-    """
-    most_recent_record = LessonRecord.query.filter(
-        and_(
-            LessonRecord.teacher_id == teacher_id,
-            LessonRecord.lastEditTime <= datetime.now(timezone.utc),
-            LessonRecord.lesson_summary.isnot(None)
-        )
-    ).options(
-        joinedload(LessonRecord.student).joinedload(Student.profile)
-    ).order_by(LessonRecord.lastEditTime.desc()).first()
-
-    if most_recent_record:
-        most_recent_record.lastEditTime = ensure_timezone_aware(most_recent_record.lastEditTime, timezone_str)
-        most_recent_record.lesson_slot.start_time = ensure_timezone_aware(most_recent_record.lesson_slot.start_time, timezone_str)
-
-    return most_recent_record
-
-
-def get_upcoming_lessons(teacher_id, timezone_str):
-    """
-    Retrieve upcoming lessons for a teacher.
-    Created with help from ChatGPT
-    Args:
-        teacher_id (int): The ID of the teacher.
-        timezone_str (str): The timezone string to make times timezone aware.
-
-    Returns:
-        list: A list of upcoming LessonSlot objects.
-    """
-    upcoming_lessons = LessonSlot.query.filter(
-        and_(
-            LessonSlot.teacher_id == teacher_id,
-            LessonSlot.start_time >= datetime.now(timezone.utc),
-            LessonSlot.is_booked == True
-        )
-    ).options(
-        joinedload(LessonSlot.booking).joinedload(Booking.student).joinedload(Student.profile)
-    ).order_by(LessonSlot.start_time.asc()).all()
-
-    for lesson in upcoming_lessons:
-        lesson.start_time = ensure_timezone_aware(lesson.start_time, timezone_str)
-
-    return upcoming_lessons
-
-
+@read_only()
 def get_outstanding_lessons(teacher_id, timezone_str):
     """
     Retrieve outstanding lessons for a teacher that have not been summarized.
@@ -119,23 +62,18 @@ def get_outstanding_lessons(teacher_id, timezone_str):
         timezone_str (str): The timezone string to make times timezone aware.
 
     Returns:
-        list: A list of outstanding LessonRecord objects.
+        list: A list of outstanding LessonRecordView objects.
     """
-    outstanding_lessons = LessonRecord.query.filter(
-        and_(
+    return fetch_lesson_record_views(
+        [
             LessonRecord.teacher_id == teacher_id,
             LessonRecord.lesson_summary == None,
-            LessonRecord.lesson_slot.has(LessonSlot.start_time <= datetime.now(timezone.utc))
-        )
-    ).options(
-        joinedload(LessonRecord.student).joinedload(Student.profile),
-        joinedload(LessonRecord.lesson_slot)
-    ).join(LessonSlot, LessonRecord.lesson_slot_id == LessonSlot.id).order_by(LessonSlot.start_time.asc()).all()
-
-    for lesson in outstanding_lessons:
-        lesson.lesson_slot.start_time = ensure_timezone_aware(lesson.lesson_slot.start_time, timezone_str)
-
-    return outstanding_lessons
+            LessonSlot.start_time <= datetime.now(timezone.utc)
+        ],
+        [LessonSlot.start_time.asc()],
+        timezone_str,
+        with_content=False
+    )
 
 
 def update_student_profile_from_form(student_profile, form):
@@ -1,8 +1,19 @@
-from datetime import datetime
+import base64
+from datetime import datetime, timedelta
 from database import db
 import pytz
+from sqlalchemy import delete, insert
 from models import LessonSlot
-from helpers.time_helpers import ensure_timezone_aware
+from helpers.recurring_availability_helpers import expand_recurring_availability, close_recurring_slots, find_recurring_overlap, is_virtual_slot_id
+from helpers.slot_interval_index import slot_index
+from helpers.time_helpers import ensure_timezone_aware, localize_utc_times, to_epoch_minutes, wall_clock_to_utc
+
+# The week grid on the slot management page: one cell per hour, Monday 00:00 first
+WEEK_GRID_CELL_MINUTES = 60
+WEEK_GRID_CELLS = 7 * 24 * 60 // WEEK_GRID_CELL_MINUTES
+
+# Two bits per cell
+CELL_EMPTY, CELL_OPEN, CELL_BOOKED, CELL_CLOSED = range(4)
 
 
 # Helper functions
@@ -33,6 +44,9 @@ def manage_slot(start_time_str, end_time_str, teacher_id, timezone_str, action):
         db.session.delete(existing_slot)
         return {'status': 'success', 'message': 'Lesson slot closed!'}
     elif not existing_slot and action == 'open':
+        interval = (to_epoch_minutes(start_time), to_epoch_minutes(end_time))
+        if slot_index.find_overlap(teacher_id, *interval) is not None or find_recurring_overlap(teacher_id, [interval]) is not None:
+            return {'status': 'error', 'message': 'This slot overlaps one of your existing slots.'}
         new_slot = LessonSlot(teacher_id=teacher_id, start_time=start_time, end_time=end_time)
         db.session.add(new_slot)
         return {'status': 'success', 'message': 'New lesson slot created!'}
@@ -50,15 +64,73 @@ def get_lesson_slots_for_week(teacher_id, start_of_week_utc, end_of_week_utc):
         end_of_week_utc (datetime): The end of the week in UTC.
 
     Returns:
-        list: A list of LessonSlot objects for the week.
+        list: A list of LessonSlot objects for the week, plus VirtualSlot objects for
+        open recurring availability.
     """
-    return LessonSlot.query.filter(
+    lesson_slots = LessonSlot.query.filter(
         LessonSlot.teacher_id == teacher_id,
-        LessonSlot.start_time >= start_of_week_utc,
-        LessonSlot.start_time <= end_of_week_utc
+        LessonSlot.start_minute >= to_epoch_minutes(start_of_week_utc),
+        LessonSlot.start_minute <= to_epoch_minutes(end_of_week_utc)
     ).all()
+    return lesson_slots + expand_recurring_availability(start_of_week_utc, end_of_week_utc, teacher_id)
     
     
+def build_week_bitmap(lesson_slots, week_start, timezone_str, now=None):
+    """
+    Pack a week of lesson slots into a bitmap of the slot management grid.
+
+    Each cell holds two bits (empty, open, booked or closed), four cells to a byte with
+    the first cell in the low bits. Cells are hours of the teacher's wall clock counted
+    from midnight on week_start, and slots are placed by their start_minute, the column
+    the week was selected on. Slots that do not start on a cell boundary inside the week
+    are left out, as the page has no cell for them. The IDs of the open slots are listed
+    in cell order, since closing a slot needs it.
+
+    Args:
+        lesson_slots (list): The output of get_lesson_slots_for_week.
+        week_start (date): The Monday the grid starts on, in the teacher's timezone.
+        timezone_str (str): The teacher's timezone string.
+        now (datetime, optional): The aware current time. Defaults to now.
+
+    Returns:
+        dict: The week start, cell size, base64 bitmap, open slot IDs and the number of
+        cells that have already started.
+    """
+    now = now or datetime.now(pytz.UTC)
+    now_minute = to_epoch_minutes(now)
+    origin = datetime.combine(week_start, datetime.min.time())
+    cell_length = timedelta(minutes=WEEK_GRID_CELL_MINUTES)
+    cells = bytearray(WEEK_GRID_CELLS // 4)
+    open_ids = {}
+
+    local_starts = localize_utc_times([slot.start_minute for slot in lesson_slots], timezone_str)
+    for slot, local_start in zip(lesson_slots, local_starts):
+        if local_start is None:
+            continue
+        cell, offset = divmod(local_start.replace(tzinfo=None) - origin, cell_length)
+        if offset or not 0 <= cell < WEEK_GRID_CELLS:
+            continue
+        if slot.is_booked:
+            state = CELL_BOOKED
+        elif slot.start_minute > now_minute:
+            state = CELL_OPEN
+            open_ids[cell] = slot.id
+        else:
+            state = CELL_CLOSED
+        cells[cell // 4] |= state << (cell % 4 * 2)
+
+    local_now = localize_utc_times([now], timezone_str)[0].replace(tzinfo=None)
+    past_cells = min(max(-((origin - local_now) // cell_length), 0), WEEK_GRID_CELLS)
+
+    return {
+        'week_start': week_start.isoformat(),
+        'cell_minutes': WEEK_GRID_CELL_MINUTES,
+        'cells': base64.b64encode(cells).decode('ascii'),
+        'open_ids': [open_ids[cell] for cell in sorted(open_ids)],
+        'past_cells': past_cells
+    }
+
+
 def open_slot(start_time, end_time, teacher_id, timezone):
     """
     Open a new lesson slot.
@@ -67,13 +139,16 @@ def open_slot(start_time, end_time, teacher_id, timezone):
         start_time (datetime): The start time of the slot.
         end_time (datetime): The end time of the slot.
         teacher_id (int): The ID of the teacher.
-        timezone (timezone): The teacher's timezone.
+        timezone (str): The teacher's timezone string.
 
     Returns:
         dict: A dictionary indicating success and the new slot ID.
     """
     start_time = ensure_timezone_aware(start_time, timezone).astimezone(pytz.UTC)
     end_time = ensure_timezone_aware(end_time, timezone).astimezone(pytz.UTC)
+    interval = (to_epoch_minutes(start_time), to_epoch_minutes(end_time))
+    if slot_index.find_overlap(teacher_id, *interval) is not None or find_recurring_overlap(teacher_id, [interval]) is not None:
+        return {'status': 'error', 'message': 'This slot overlaps one of your existing slots.'}
     new_slot = LessonSlot(teacher_id=teacher_id, start_time=start_time, end_time=end_time, is_booked=False)
     db.session.add(new_slot)
     db.session.commit()
@@ -91,10 +166,111 @@ def close_slot(slot_id, teacher_id):
     Returns:
         dict: A dictionary indicating success or error status.
     """
+    if is_virtual_slot_id(slot_id):
+        if not close_recurring_slots(teacher_id, [slot_id]):
+            db.session.rollback()
+            return {'status': 'error'}
+        db.session.commit()
+        return {'status': 'success'}
+
     slot = LessonSlot.query.get(slot_id)
     if slot and slot.teacher_id == teacher_id:
         db.session.delete(slot)
         db.session.commit()
         return {'status': 'success'}
     else:
-        return {'status': 'error'}
\ No newline at end of file
+        return {'status': 'error'}
+
+
+def apply_slot_changes(teacher_id, timezone_str, changes):
+    """
+    Open and close a batch of lesson slots in a single transaction.
+
+    The whole batch is validated before anything is written. Closes are issued as one
+    DELETE restricted to the teacher's unbooked slots (recurring slots get an override
+    row instead) and opens as one multi-row INSERT with RETURNING, followed by a single
+    commit. If any slot cannot be closed, nothing is changed.
+
+    Args:
+        teacher_id (int): The ID of the teacher.
+        timezone_str (str): The teacher's timezone string.
+        changes (list): Dictionaries with an 'action' of 'open' (with 'start_time' and
+            'end_time' ISO strings, read as the teacher's wall clock unless they carry an
+            offset) or 'close' (with a 'slot_id').
+
+    Returns:
+        dict: A dictionary indicating success (with the applied updates) or error status.
+
+    Raises:
+        ValueError: If any change in the batch is malformed.
+    """
+    new_slots = []
+    close_ids = []
+    for change in changes:
+        try:
+            action = change['action']
+            if action == 'open':
+                start_time = wall_clock_to_utc(datetime.fromisoformat(change['start_time']), timezone_str)
+                end_time = wall_clock_to_utc(datetime.fromisoformat(change['end_time']), timezone_str)
+                if end_time <= start_time:
+                    raise ValueError('Slot must end after it starts.')
+                new_slots.append({
+                    'teacher_id': teacher_id,
+                    'start_time': start_time,
+                    'end_time': end_time,
+                    'start_minute': to_epoch_minutes(start_time),
+                    'end_minute': to_epoch_minutes(end_time),
+                    'is_booked': False
+                })
+            elif action == 'close':
+                close_ids.append(int(change['slot_id']))
+            else:
+                raise ValueError(f"Unknown slot action: {action}")
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid slot change {change!r}: {e}") from e
+
+    updates = []
+    close_ids = list(dict.fromkeys(close_ids))
+    recurring_close_ids = [slot_id for slot_id in close_ids if is_virtual_slot_id(slot_id)]
+    close_ids = [slot_id for slot_id in close_ids if not is_virtual_slot_id(slot_id)]
+
+    # New slots may not overlap each other, any slot that stays open or an open recurring slot
+    by_start = sorted(new_slots, key=lambda slot: slot['start_minute'])
+    for previous, slot in zip(by_start, by_start[1:]):
+        if slot['start_minute'] < previous['end_minute']:
+            return {'status': 'error', 'message': 'Slots cannot overlap.'}
+    for slot in new_slots:
+        if slot_index.find_overlap(teacher_id, slot['start_minute'], slot['end_minute'], ignore_ids=close_ids) is not None:
+            return {'status': 'error', 'message': 'Slots cannot overlap.'}
+    intervals = [(slot['start_minute'], slot['end_minute']) for slot in new_slots]
+    if find_recurring_overlap(teacher_id, intervals, ignore_ids=recurring_close_ids) is not None:
+        return {'status': 'error', 'message': 'Slots cannot overlap your weekly availability.'}
+
+    if recurring_close_ids:
+        if not close_recurring_slots(teacher_id, recurring_close_ids):
+            db.session.rollback()
+            return {'status': 'error', 'message': 'Cannot close a slot that is already booked or does not exist.'}
+        updates.extend({'action': 'close', 'slot_id': slot_id} for slot_id in recurring_close_ids)
+
+    if close_ids:
+        closed = db.session.execute(
+            delete(LessonSlot).where(
+                LessonSlot.id.in_(close_ids),
+                LessonSlot.teacher_id == teacher_id,
+                LessonSlot.is_booked == False
+            ).execution_options(slot_index_teacher_id=teacher_id)
+        ).rowcount
+        if closed != len(close_ids):
+            db.session.rollback()
+            return {'status': 'error', 'message': 'Cannot close a slot that is already booked or does not exist.'}
+        updates.extend({'action': 'close', 'slot_id': slot_id} for slot_id in close_ids)
+
+    if new_slots:
+        opened = db.session.execute(
+            insert(LessonSlot).returning(LessonSlot.id, LessonSlot.start_time, sort_by_parameter_order=True).execution_options(slot_index_teacher_id=teacher_id),
+            new_slots
+        ).all()
+        updates.extend({'action': 'open', 'slot_id': slot_id, 'start_time': start_time.isoformat()} for slot_id, start_time in opened)
+
+    db.session.commit()
+    return {'status': 'success', 'updates': updates}
@@ -1,5 +1,26 @@
 import pytz
+from bisect import bisect_right
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+EPOCH = datetime(1970, 1, 1)
+
+
+@lru_cache(maxsize=None)
+def get_zone(timezone_str):
+    """
+    Look up a timezone by name, memoized so each zone is only resolved once per process.
+
+    Args:
+        timezone_str (str): The timezone name, e.g. 'Asia/Tokyo'.
+
+    Returns:
+        timezone: The pytz timezone object.
+
+    Raises:
+        pytz.UnknownTimeZoneError: If the name is not a known timezone.
+    """
+    return pytz.timezone(timezone_str)
 
 
 def get_user_timezone(timezone_str):
@@ -13,9 +34,9 @@ def get_user_timezone(timezone_str):
         timezone: The valid timezone object.
     """
     try:
-        return pytz.timezone(timezone_str)
+        return get_zone(timezone_str)
     except pytz.UnknownTimeZoneError:
-        return pytz.timezone('America/Los_Angeles')
+        return get_zone('America/Los_Angeles')
     
 
 def ensure_timezone_aware(dt, timezone_str):
@@ -32,7 +53,7 @@ def ensure_timezone_aware(dt, timezone_str):
     Returns:
         datetime: The timezone-aware datetime object.
     """
-    user_timezone = pytz.timezone(timezone_str)
+    user_timezone = get_zone(timezone_str)
     if dt.tzinfo is None:
         dt = pytz.utc.localize(dt)
     return dt.astimezone(user_timezone)
@@ -42,6 +63,23 @@ def convert_to_utc(dt, timezone):
     return dt.astimezone(pytz.utc)
 
 
+def wall_clock_to_utc(dt, timezone_str):
+    """
+    Convert a wall-clock time in the user's timezone to a naive UTC datetime, the way
+    lesson slot times are stored. Aware datetimes keep their own offset.
+
+    Args:
+        dt (datetime): The naive local time, or an aware datetime.
+        timezone_str (str): The timezone naive values are read in.
+
+    Returns:
+        datetime: The naive UTC datetime.
+    """
+    if dt.tzinfo is None:
+        dt = get_zone(timezone_str).localize(dt)
+    return dt.astimezone(pytz.utc).replace(tzinfo=None)
+
+
 def get_week_boundaries(user_timezone_str, week_offset=0):
     """
     Get the start and end of the week in the user's timezone.
@@ -53,7 +91,7 @@ def get_week_boundaries(user_timezone_str, week_offset=0):
     Returns:
         tuple: The start and end of the week as UTC datetime objects.
     """
-    user_timezone = pytz.timezone(user_timezone_str)
+    user_timezone = get_zone(user_timezone_str)
     today = datetime.now(timezone.utc).astimezone(user_timezone)
     
     # Calculate the start and end of the current week in the user's timezone
@@ -62,4 +100,87 @@ def get_week_boundaries(user_timezone_str, week_offset=0):
     start_of_week_utc = start_of_week.astimezone(timezone.utc)
     end_of_week_utc = end_of_week.astimezone(timezone.utc)
 
-    return start_of_week_utc, end_of_week_utc
\ No newline at end of file
+    return start_of_week_utc, end_of_week_utc
+
+
+def to_epoch_minutes(dt):
+    """
+    Convert a datetime (naive values are taken as UTC) to whole minutes since the UTC epoch.
+    """
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - EPOCH) // timedelta(minutes=1)
+
+
+def from_epoch_minutes(minutes):
+    """
+    Convert minutes since the UTC epoch back to a naive UTC datetime.
+    """
+    return EPOCH + timedelta(minutes=minutes)
+
+
+def _to_naive_utc(value):
+    if isinstance(value, int):
+        return from_epoch_minutes(value)
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _offset_table(zone, first_utc, last_utc):
+    """
+    Build the (UTC start, tzinfo, offset) periods of a zone covering a naive UTC window,
+    from the transition times pytz precomputes for each zone.
+    """
+    transitions = getattr(zone, '_utc_transition_times', None) or [datetime.min]
+    first = max(bisect_right(transitions, first_utc) - 1, 0)
+    last = max(bisect_right(transitions, last_utc) - 1, 0)
+
+    starts, periods = [], []
+    for transition in transitions[first:last + 1]:
+        local = zone.fromutc(max(transition, first_utc).replace(tzinfo=zone))
+        starts.append(transition)
+        periods.append((local.tzinfo, local.utcoffset()))
+    return starts, periods
+
+
+def localize_utc_times(values, timezone_str, fmt=None):
+    """
+    Convert many UTC times to one timezone in a single pass.
+
+    The zone's UTC offsets are looked up once for the span the values cover (a week
+    normally has one or two), instead of resolving the zone and its offset per value.
+
+    Args:
+        values (iterable): Naive UTC datetimes, aware datetimes or integer UTC epoch minutes.
+            None values are passed through.
+        timezone_str (str): The timezone to convert to.
+        fmt (str, optional): A strftime format; if given, formatted strings are returned.
+
+    Returns:
+        list: Timezone-aware datetimes (or strings), in the same order as values.
+    """
+    utc_times = [_to_naive_utc(value) if value is not None else None for value in values]
+    present = [utc_time for utc_time in utc_times if utc_time is not None]
+    if not present:
+        return utc_times
+
+    starts, periods = _offset_table(get_zone(timezone_str), min(present), max(present))
+    single_period = periods[0] if len(periods) == 1 else None
+
+    localized = []
+    formatted = {}
+    for utc_time in utc_times:
+        if utc_time is None:
+            localized.append(None)
+            continue
+        tzinfo, offset = single_period or periods[bisect_right(starts, utc_time) - 1]
+        local_time = (utc_time + offset).replace(tzinfo=tzinfo)
+        if fmt:
+            # Slots fall on a handful of distinct times, so most strings are reused
+            if utc_time not in formatted:
+                formatted[utc_time] = local_time.strftime(fmt)
+            localized.append(formatted[utc_time])
+        else:
+            localized.append(local_time)
+    return localized
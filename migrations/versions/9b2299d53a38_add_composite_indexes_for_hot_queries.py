@@ -0,0 +1,59 @@
+"""Add composite indexes for hot queries
+
+Revision ID: 9b2299d53a38
+Revises: 3a5983220d0c
+Create Date: 2026-10-18 13:10:02.418327
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b2299d53a38'
+down_revision = '3a5983220d0c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('lesson_slot', schema=None) as batch_op:
+        batch_op.create_index('ix_lesson_slot_teacher_id_start_time', ['teacher_id', 'start_time'], unique=False)
+        batch_op.create_index('ix_lesson_slot_is_booked_start_time', ['is_booked', 'start_time'], unique=False)
+        batch_op.create_index('ix_lesson_slot_open_start_time', ['start_time'], unique=False,
+                              sqlite_where=sa.text('is_booked = 0'), postgresql_where=sa.text('is_booked = false'))
+
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.create_index('ix_booking_student_id_lesson_slot_id', ['student_id', 'lesson_slot_id'], unique=False)
+        batch_op.create_index('ix_booking_lesson_slot_id', ['lesson_slot_id'], unique=False)
+
+    with op.batch_alter_table('lesson_record', schema=None) as batch_op:
+        batch_op.create_index('ix_lesson_record_teacher_id_last_edit_time', ['teacher_id', 'lastEditTime'], unique=False)
+        batch_op.create_index('ix_lesson_record_student_id_last_edit_time', ['student_id', 'lastEditTime'], unique=False)
+
+    with op.batch_alter_table('word', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_word_lesson_record_id'), ['lesson_record_id'], unique=False)
+
+    with op.batch_alter_table('phrase', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_phrase_lesson_record_id'), ['lesson_record_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('phrase', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_phrase_lesson_record_id'))
+
+    with op.batch_alter_table('word', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_word_lesson_record_id'))
+
+    with op.batch_alter_table('lesson_record', schema=None) as batch_op:
+        batch_op.drop_index('ix_lesson_record_student_id_last_edit_time')
+        batch_op.drop_index('ix_lesson_record_teacher_id_last_edit_time')
+
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.drop_index('ix_booking_lesson_slot_id')
+        batch_op.drop_index('ix_booking_student_id_lesson_slot_id')
+
+    with op.batch_alter_table('lesson_slot', schema=None) as batch_op:
+        batch_op.drop_index('ix_lesson_slot_open_start_time')
+        batch_op.drop_index('ix_lesson_slot_is_booked_start_time')
+        batch_op.drop_index('ix_lesson_slot_teacher_id_start_time')
@@ -0,0 +1,56 @@
+"""Store lesson slot times in UTC where they were saved as the teacher's wall clock
+
+Revision ID: a9d1c6e4b205
+Revises: f8c3a6e20b91
+Create Date: 2026-10-19 10:12:51.804317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d1c6e4b205'
+down_revision = 'f8c3a6e20b91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # start_time and end_time hold naive UTC, and start_minute and end_minute the same times as
+    # UTC epoch minutes (c41e7d2a9f60 backfilled them by that rule). Slots opened in a batch from
+    # /teacher/updateSlots were saved with the teacher's wall clock in start_time but true UTC
+    # minutes, so those rows are put back in step from the minutes. A row whose corrected time
+    # is already taken by another slot of the same teacher is left for the teacher to close.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("""
+            UPDATE lesson_slot SET
+                start_time = to_timestamp(start_minute * 60) AT TIME ZONE 'UTC',
+                end_time = to_timestamp(end_minute * 60) AT TIME ZONE 'UTC'
+            WHERE start_minute IS NOT NULL
+              AND CAST(EXTRACT(EPOCH FROM start_time) AS BIGINT) / 60 != start_minute
+              AND NOT EXISTS (
+                  SELECT 1 FROM lesson_slot AS other
+                  WHERE other.teacher_id = lesson_slot.teacher_id
+                    AND other.start_time = to_timestamp(lesson_slot.start_minute * 60) AT TIME ZONE 'UTC'
+              )
+        """)
+    else:
+        # Written in the format SQLAlchemy stores SQLite DateTimes in, so equality filters still match
+        op.execute("""
+            UPDATE lesson_slot SET
+                start_time = strftime('%Y-%m-%d %H:%M:%S.000000', start_minute * 60, 'unixepoch'),
+                end_time = strftime('%Y-%m-%d %H:%M:%S.000000', end_minute * 60, 'unixepoch')
+            WHERE start_minute IS NOT NULL
+              AND CAST(strftime('%s', start_time) AS INTEGER) / 60 != start_minute
+              AND NOT EXISTS (
+                  SELECT 1 FROM lesson_slot AS other
+                  WHERE other.teacher_id = lesson_slot.teacher_id
+                    AND other.start_time = strftime('%Y-%m-%d %H:%M:%S.000000', lesson_slot.start_minute * 60, 'unixepoch')
+              )
+        """)
+
+
+def downgrade():
+    # The wall-clock times were never meant to be stored, so there is nothing to restore
+    pass
@@ -0,0 +1,35 @@
+"""Add the cache_entry table shared by all app workers
+
+Revision ID: b4e8f2a7c613
+Revises: a9d1c6e4b205
+Create Date: 2026-10-19 11:03:27.415590
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e8f2a7c613'
+down_revision = 'a9d1c6e4b205'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # app.py runs db.create_all() on import, so the table may already exist
+    if 'cache_entry' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('cache_entry',
+        sa.Column('key', sa.String(length=200), nullable=False),
+        sa.Column('value', sa.Text(), nullable=False),
+        sa.Column('expires_at', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('key')
+        )
+        with op.batch_alter_table('cache_entry', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_cache_entry_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('cache_entry', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_cache_entry_expires_at'))
+    op.drop_table('cache_entry')
@@ -0,0 +1,76 @@
+"""Add recurring availability
+
+Revision ID: ba966bba4991
+Revises: 9b2299d53a38
+Create Date: 2026-10-18 14:02:37.114950
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ba966bba4991'
+down_revision = '9b2299d53a38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # app.py runs db.create_all() on import, so the new tables may already exist
+    existing_tables = sa.inspect(op.get_bind()).get_table_names()
+
+    if 'recurring_availability' not in existing_tables:
+        op.create_table('recurring_availability',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('teacher_id', sa.Integer(), nullable=False),
+        sa.Column('weekday', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.Time(), nullable=False),
+        sa.Column('end_time', sa.Time(), nullable=False),
+        sa.Column('timezone', sa.String(length=50), nullable=False),
+        sa.ForeignKeyConstraint(['teacher_id'], ['teacher.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('recurring_availability', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_recurring_availability_teacher_id'), ['teacher_id'], unique=False)
+
+    if 'recurring_availability_override' not in existing_tables:
+        op.create_table('recurring_availability_override',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('recurring_availability_id', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['recurring_availability_id'], ['recurring_availability.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('recurring_availability_id', 'start_time', name='uq_recurring_availability_override_start_time')
+        )
+
+    # A recurring slot must only ever be materialized once, so (teacher_id, start_time) becomes unique.
+    # Drop unbooked, unreferenced duplicates first, keeping a booked copy or else the oldest one.
+    op.execute("""
+        DELETE FROM lesson_slot WHERE id IN (
+            SELECT s.id FROM lesson_slot s
+            WHERE s.is_booked IS NOT TRUE
+            AND NOT EXISTS (SELECT 1 FROM booking b WHERE b.lesson_slot_id = s.id)
+            AND NOT EXISTS (SELECT 1 FROM lesson_record r WHERE r.lesson_slot_id = s.id)
+            AND EXISTS (
+                SELECT 1 FROM lesson_slot o
+                WHERE o.teacher_id = s.teacher_id AND o.start_time = s.start_time AND o.id <> s.id
+                AND (o.is_booked IS TRUE OR o.id < s.id)
+            )
+        )
+    """)
+    with op.batch_alter_table('lesson_slot', schema=None) as batch_op:
+        batch_op.drop_index('ix_lesson_slot_teacher_id_start_time')
+        batch_op.create_index('uq_lesson_slot_teacher_id_start_time', ['teacher_id', 'start_time'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('lesson_slot', schema=None) as batch_op:
+        batch_op.drop_index('uq_lesson_slot_teacher_id_start_time')
+        batch_op.create_index('ix_lesson_slot_teacher_id_start_time', ['teacher_id', 'start_time'], unique=False)
+
+    op.drop_table('recurring_availability_override')
+    with op.batch_alter_table('recurring_availability', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_recurring_availability_teacher_id'))
+
+    op.drop_table('recurring_availability')
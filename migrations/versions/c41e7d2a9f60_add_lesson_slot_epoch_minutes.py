@@ -0,0 +1,53 @@
+"""Add lesson slot epoch minutes
+
+Revision ID: c41e7d2a9f60
+Revises: ba966bba4991
+Create Date: 2026-10-18 15:21:44.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41e7d2a9f60'
+down_revision = 'ba966bba4991'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # app.py runs db.create_all() on import, so a fresh database may already have the columns
+    existing_columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('lesson_slot')}
+    existing_indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('lesson_slot')}
+
+    with op.batch_alter_table('lesson_slot', schema=None) as batch_op:
+        if 'start_minute' not in existing_columns:
+            batch_op.add_column(sa.Column('start_minute', sa.Integer(), nullable=True))
+        if 'end_minute' not in existing_columns:
+            batch_op.add_column(sa.Column('end_minute', sa.Integer(), nullable=True))
+
+    # Backfill from the DateTime columns, which hold naive UTC times
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("""
+            UPDATE lesson_slot SET
+                start_minute = CAST(EXTRACT(EPOCH FROM start_time) AS BIGINT) / 60,
+                end_minute = CAST(EXTRACT(EPOCH FROM end_time) AS BIGINT) / 60
+        """)
+    else:
+        op.execute("""
+            UPDATE lesson_slot SET
+                start_minute = CAST(strftime('%s', start_time) AS INTEGER) / 60,
+                end_minute = CAST(strftime('%s', end_time) AS INTEGER) / 60
+        """)
+
+    if 'ix_lesson_slot_teacher_id_start_minute' not in existing_indexes:
+        with op.batch_alter_table('lesson_slot', schema=None) as batch_op:
+            batch_op.create_index('ix_lesson_slot_teacher_id_start_minute', ['teacher_id', 'start_minute', 'end_minute'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('lesson_slot', schema=None) as batch_op:
+        batch_op.drop_index('ix_lesson_slot_teacher_id_start_minute')
+        batch_op.drop_column('end_minute')
+        batch_op.drop_column('start_minute')
@@ -0,0 +1,44 @@
+"""Refresh a lesson record's indexed terms when its words and phrases are reordered
+
+Revision ID: c7e2a9d4f318
+Revises: b4e8f2a7c613
+Create Date: 2026-10-19 15:42:10.118204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2a9d4f318'
+down_revision = 'b4e8f2a7c613'
+branch_labels = None
+depends_on = None
+
+TERMS_UPDATE_TRIGGER = """CREATE TRIGGER IF NOT EXISTS lesson_record_fts_terms_update
+    AFTER UPDATE OF position ON lesson_record_lexeme BEGIN
+        UPDATE lesson_record_fts SET terms = (SELECT group_concat(content, ' ') FROM (SELECT lexeme.content FROM lesson_record_lexeme
+            JOIN lexeme ON lexeme.id = lesson_record_lexeme.lexeme_id
+            WHERE lesson_record_lexeme.lesson_record_id = new.lesson_record_id
+            ORDER BY lesson_record_lexeme.position))
+        WHERE rowid = new.lesson_record_id;
+    END"""
+
+
+def upgrade():
+    # The search index only exists on SQLite
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(TERMS_UPDATE_TRIGGER)
+    # Records reordered before the trigger existed
+    op.execute("""
+        UPDATE lesson_record_fts SET terms = (SELECT group_concat(content, ' ') FROM (SELECT lexeme.content FROM lesson_record_lexeme
+            JOIN lexeme ON lexeme.id = lesson_record_lexeme.lexeme_id
+            WHERE lesson_record_lexeme.lesson_record_id = lesson_record_fts.rowid
+            ORDER BY lesson_record_lexeme.position))
+    """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute('DROP TRIGGER IF EXISTS lesson_record_fts_terms_update')
@@ -0,0 +1,133 @@
+"""Move lesson words and phrases into a deduplicated lexeme table
+
+Revision ID: d7a3f1c58e2b
+Revises: c41e7d2a9f60
+Create Date: 2026-10-18 17:06:12.482317
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a3f1c58e2b'
+down_revision = 'c41e7d2a9f60'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+lexeme = sa.Table('lexeme', sa.MetaData(),
+    sa.Column('id', sa.Integer, primary_key=True), sa.Column('kind', sa.String), sa.Column('content', sa.String),
+    sa.Column('normalized', sa.String), sa.Column('first_seen', sa.DateTime))
+lesson_record_lexeme = sa.table('lesson_record_lexeme',
+    sa.column('lesson_record_id', sa.Integer), sa.column('lexeme_id', sa.Integer), sa.column('position', sa.Integer))
+
+
+def _normalize(text):
+    # Kept in step with helpers.lexicon_helpers.normalize_term
+    return ' '.join(text.split()).casefold()
+
+
+def _term_table(name):
+    return sa.table(name, sa.column('id', sa.Integer), sa.column('content', sa.String), sa.column('lesson_record_id', sa.Integer))
+
+
+def _backfill(bind, kind, table_name, linked_records):
+    terms = _term_table(table_name)
+    lexeme_ids = dict(bind.execute(sa.select(lexeme.c.normalized, lexeme.c.id).where(lexeme.c.kind == kind)).all())
+    positions = {}
+    links = []
+    now = datetime.utcnow()
+
+    rows = bind.execute(
+        sa.select(terms.c.content, terms.c.lesson_record_id).where(terms.c.lesson_record_id.isnot(None)).order_by(terms.c.id)
+    ).all()
+    for content, lesson_record_id in rows:
+        if lesson_record_id in linked_records:
+            continue
+        normalized = _normalize(content or '')
+        if not normalized:
+            continue
+        lexeme_id = lexeme_ids.get(normalized)
+        if lexeme_id is None:
+            lexeme_id = bind.execute(sa.insert(lexeme).values(
+                kind=kind, content=' '.join(content.split()), normalized=normalized, first_seen=now
+            )).inserted_primary_key[0]
+            lexeme_ids[normalized] = lexeme_id
+        seen = positions.setdefault(lesson_record_id, {})
+        if lexeme_id in seen:
+            continue
+        seen[lexeme_id] = len(seen)
+        links.append({'lesson_record_id': lesson_record_id, 'lexeme_id': lexeme_id, 'position': seen[lexeme_id]})
+        if len(links) >= BATCH_SIZE:
+            bind.execute(sa.insert(lesson_record_lexeme), links)
+            links = []
+    if links:
+        bind.execute(sa.insert(lesson_record_lexeme), links)
+
+
+def upgrade():
+    # app.py runs db.create_all() on import, so the new tables may already exist and the old ones may not
+    bind = op.get_bind()
+    existing_tables = sa.inspect(bind).get_table_names()
+
+    if 'lexeme' not in existing_tables:
+        op.create_table('lexeme',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=10), nullable=False),
+        sa.Column('content', sa.String(length=100), nullable=False),
+        sa.Column('normalized', sa.String(length=100), nullable=False),
+        sa.Column('first_seen', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('kind', 'normalized', name='uq_lexeme_kind_normalized')
+        )
+
+    if 'lesson_record_lexeme' not in existing_tables:
+        op.create_table('lesson_record_lexeme',
+        sa.Column('lesson_record_id', sa.Integer(), nullable=False),
+        sa.Column('lexeme_id', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['lesson_record_id'], ['lesson_record.id'], ),
+        sa.ForeignKeyConstraint(['lexeme_id'], ['lexeme.id'], ),
+        sa.PrimaryKeyConstraint('lesson_record_id', 'lexeme_id')
+        )
+        with op.batch_alter_table('lesson_record_lexeme', schema=None) as batch_op:
+            batch_op.create_index('ix_lesson_record_lexeme_lexeme_id', ['lexeme_id'], unique=False)
+
+    # Terms are numbered per lesson in their original (id) order; repeats within a lesson collapse.
+    # Lessons the app already linked before this migration ran are left as they are.
+    linked_records = set(bind.execute(sa.select(lesson_record_lexeme.c.lesson_record_id).distinct()).scalars())
+    for kind, table_name in (('word', 'word'), ('phrase', 'phrase')):
+        if table_name in existing_tables:
+            _backfill(bind, kind, table_name, linked_records)
+            op.drop_table(table_name)
+
+
+def downgrade():
+    bind = op.get_bind()
+    for kind, table_name in (('word', 'word'), ('phrase', 'phrase')):
+        op.create_table(table_name,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.String(length=100), nullable=False),
+        sa.Column('lesson_record_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['lesson_record_id'], ['lesson_record.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.create_index(batch_op.f(f'ix_{table_name}_lesson_record_id'), ['lesson_record_id'], unique=False)
+
+        terms = _term_table(table_name)
+        bind.execute(sa.insert(terms).from_select(
+            ['content', 'lesson_record_id'],
+            sa.select(lexeme.c.content, lesson_record_lexeme.c.lesson_record_id).select_from(
+                lesson_record_lexeme.join(lexeme, lesson_record_lexeme.c.lexeme_id == lexeme.c.id)
+            ).where(lexeme.c.kind == kind).order_by(lesson_record_lexeme.c.lesson_record_id, lesson_record_lexeme.c.position)
+        ))
+
+    with op.batch_alter_table('lesson_record_lexeme', schema=None) as batch_op:
+        batch_op.drop_index('ix_lesson_record_lexeme_lexeme_id')
+
+    op.drop_table('lesson_record_lexeme')
+    op.drop_table('lexeme')
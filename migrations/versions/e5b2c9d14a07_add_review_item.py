@@ -0,0 +1,39 @@
+"""Add spaced-repetition review items for student vocabulary
+
+Revision ID: e5b2c9d14a07
+Revises: d7a3f1c58e2b
+Create Date: 2026-10-18 19:42:37.118904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b2c9d14a07'
+down_revision = 'd7a3f1c58e2b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # app.py runs db.create_all() on import, so the table may already exist.
+    # Items are created from the student's lessons the first time their deck is loaded.
+    if 'review_item' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('review_item',
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('lexeme_id', sa.Integer(), nullable=False),
+        sa.Column('due_minute', sa.Integer(), nullable=False),
+        sa.Column('interval_days', sa.Float(), nullable=False),
+        sa.Column('ease', sa.Float(), nullable=False),
+        sa.Column('repetitions', sa.Integer(), nullable=False),
+        sa.Column('lapses', sa.Integer(), nullable=False),
+        sa.Column('last_reviewed', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['lexeme_id'], ['lexeme.id'], ),
+        sa.ForeignKeyConstraint(['student_id'], ['student.id'], ),
+        sa.PrimaryKeyConstraint('student_id', 'lexeme_id')
+        )
+
+
+def downgrade():
+    op.drop_table('review_item')
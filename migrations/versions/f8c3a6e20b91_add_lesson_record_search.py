@@ -0,0 +1,95 @@
+"""Add the FTS5 lesson record search index and the triggers that maintain it
+
+Revision ID: f8c3a6e20b91
+Revises: e5b2c9d14a07
+Create Date: 2026-10-18 21:15:04.530612
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8c3a6e20b91'
+down_revision = 'e5b2c9d14a07'
+branch_labels = None
+depends_on = None
+
+# A copy of the index as first shipped; later changes belong in their own migrations
+SEARCH_INDEX_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS lesson_record_fts USING fts5(
+        scope, lesson_summary, strengths, areas_to_improve, terms,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS lesson_record_fts_insert AFTER INSERT ON lesson_record BEGIN
+        INSERT INTO lesson_record_fts (rowid, scope, lesson_summary, strengths, areas_to_improve, terms)
+        VALUES (new.id, 't' || coalesce(new.teacher_id, '') || ' s' || coalesce(new.student_id, ''),
+                new.lesson_summary, new.strengths, new.areas_to_improve,
+                (SELECT group_concat(content, ' ') FROM (SELECT lexeme.content FROM lesson_record_lexeme
+                 JOIN lexeme ON lexeme.id = lesson_record_lexeme.lexeme_id
+                 WHERE lesson_record_lexeme.lesson_record_id = new.id
+                 ORDER BY lesson_record_lexeme.position)));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS lesson_record_fts_update
+    AFTER UPDATE OF teacher_id, student_id, lesson_summary, strengths, areas_to_improve ON lesson_record BEGIN
+        UPDATE lesson_record_fts SET scope = 't' || coalesce(new.teacher_id, '') || ' s' || coalesce(new.student_id, ''),
+            lesson_summary = new.lesson_summary, strengths = new.strengths, areas_to_improve = new.areas_to_improve
+        WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS lesson_record_fts_delete AFTER DELETE ON lesson_record BEGIN
+        DELETE FROM lesson_record_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS lesson_record_fts_terms_insert AFTER INSERT ON lesson_record_lexeme BEGIN
+        UPDATE lesson_record_fts SET terms = (SELECT group_concat(content, ' ') FROM (SELECT lexeme.content FROM lesson_record_lexeme
+            JOIN lexeme ON lexeme.id = lesson_record_lexeme.lexeme_id
+            WHERE lesson_record_lexeme.lesson_record_id = new.lesson_record_id
+            ORDER BY lesson_record_lexeme.position))
+        WHERE rowid = new.lesson_record_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS lesson_record_fts_terms_delete AFTER DELETE ON lesson_record_lexeme BEGIN
+        UPDATE lesson_record_fts SET terms = (SELECT group_concat(content, ' ') FROM (SELECT lexeme.content FROM lesson_record_lexeme
+            JOIN lexeme ON lexeme.id = lesson_record_lexeme.lexeme_id
+            WHERE lesson_record_lexeme.lesson_record_id = old.lesson_record_id
+            ORDER BY lesson_record_lexeme.position))
+        WHERE rowid = old.lesson_record_id;
+    END""",
+)
+
+TRIGGERS = (
+    'lesson_record_fts_insert', 'lesson_record_fts_update', 'lesson_record_fts_delete',
+    'lesson_record_fts_terms_insert', 'lesson_record_fts_terms_delete',
+)
+
+
+def upgrade():
+    # FTS5 is SQLite only; other databases go without lesson search
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    # IF NOT EXISTS, as `flask search create` may have built the index already
+    bind = op.get_bind()
+    created = 'lesson_record_fts' not in sa.inspect(bind).get_table_names()
+    for statement in SEARCH_INDEX_DDL:
+        op.execute(statement)
+
+    if created:
+        op.execute("""
+            INSERT INTO lesson_record_fts (rowid, scope, lesson_summary, strengths, areas_to_improve, terms)
+            SELECT lesson_record.id,
+                   't' || coalesce(lesson_record.teacher_id, '') || ' s' || coalesce(lesson_record.student_id, ''),
+                   lesson_record.lesson_summary, lesson_record.strengths, lesson_record.areas_to_improve,
+                   (SELECT group_concat(content, ' ') FROM (SELECT lexeme.content FROM lesson_record_lexeme
+                    JOIN lexeme ON lexeme.id = lesson_record_lexeme.lexeme_id
+                    WHERE lesson_record_lexeme.lesson_record_id = lesson_record.id
+                    ORDER BY lesson_record_lexeme.position))
+            FROM lesson_record
+        """)
+        op.execute("INSERT INTO lesson_record_fts (lesson_record_fts) VALUES ('optimize')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for trigger in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.execute('DROP TABLE IF EXISTS lesson_record_fts')
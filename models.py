@@ -1,7 +1,8 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from flask_login import UserMixin
 from database import db
-from sqlalchemy.orm import backref
+from sqlalchemy.orm import backref, validates
+from helpers.time_helpers import to_epoch_minutes
 
 
 class User(UserMixin):
@@ -71,6 +72,7 @@ class Teacher(db.Model, UserMixin):
     profile = db.relationship('TeacherProfile', uselist=False, back_populates='teacher')
     lesson_records = db.relationship('LessonRecord', back_populates='teacher')
     lesson_slots = db.relationship('LessonSlot', back_populates='teacher')
+    recurring_availability = db.relationship('RecurringAvailability', back_populates='teacher', cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"Teacher('{self.username}', '{self.email}')"
@@ -100,14 +102,17 @@ class LessonRecord(db.Model):
     Relationship between student, teacher, and lesson slot added with AI guidance
     """    
     __tablename__ = 'lesson_record'
+    __table_args__ = (
+        db.Index('ix_lesson_record_teacher_id_last_edit_time', 'teacher_id', 'lastEditTime'),
+        db.Index('ix_lesson_record_student_id_last_edit_time', 'student_id', 'lastEditTime'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('student.id'))
     teacher_id = db.Column(db.Integer, db.ForeignKey('teacher.id'))
     lesson_slot_id = db.Column(db.Integer, db.ForeignKey('lesson_slot.id'), nullable=False)
     strengths = db.Column(db.String(1000))
     areas_to_improve = db.Column(db.String(1000))
-    new_words = db.relationship('Word', backref='lesson_record', cascade="all, delete-orphan")
-    new_phrases = db.relationship('Phrase', backref='lesson_record', cascade="all, delete-orphan")
+    lexeme_links = db.relationship('LessonRecordLexeme', back_populates='lesson_record', cascade="all, delete-orphan")
     lesson_summary = db.Column(db.String(1000))
     lastEditTime = db.Column(db.DateTime, default=datetime.utcnow)
     student = db.relationship('Student', back_populates='lesson_records')
@@ -115,56 +120,184 @@ class LessonRecord(db.Model):
     lesson_slot = db.relationship('LessonSlot', back_populates='lesson_records')
     booking = db.relationship('Booking', back_populates='lesson_record', uselist=False)
 
+    def _lexemes(self, kind):
+        return [link.lexeme for link in sorted(self.lexeme_links, key=lambda link: link.position) if link.lexeme.kind == kind]
+
+    @property
+    def new_words(self):
+        return self._lexemes(Lexeme.WORD)
+
+    @property
+    def new_phrases(self):
+        return self._lexemes(Lexeme.PHRASE)
+
     def __repr__(self):
         return f"LessonRecord('{self.strengths}', '{self.areas_to_improve}', '{self.lesson_summary}', '{self.lastEditTime}')"
 
 
-class Word(db.Model):
+class Lexeme(db.Model):
     """
-    Represents a new word introduced in a lesson.
-    """    
-    __tablename__ = 'word'
+    Represents a word or phrase, stored once however many lessons introduce it.
+    Entries are deduplicated on their normalized text, ignoring case and spacing, and keep the
+    spelling they were first seen with.
+    """
+    __tablename__ = 'lexeme'
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'normalized', name='uq_lexeme_kind_normalized'),
+    )
+    WORD = 'word'
+    PHRASE = 'phrase'
+
     id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)
     content = db.Column(db.String(100), nullable=False)
-    lesson_record_id = db.Column(db.Integer, db.ForeignKey('lesson_record.id'))
+    normalized = db.Column(db.String(100), nullable=False)
+    first_seen = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
+    def __repr__(self):
+        return f"Lexeme('{self.kind}', '{self.content}')"
 
-class Phrase(db.Model):
+
+class LessonRecordLexeme(db.Model):
     """
-    Represents a new phrase introduced in a lesson.
-    """    
-    __tablename__ = 'phrase'
-    id = db.Column(db.Integer, primary_key=True)
-    content = db.Column(db.String(100), nullable=False)
-    lesson_record_id = db.Column(db.Integer, db.ForeignKey('lesson_record.id'))
+    Links a lesson record to a word or phrase introduced in it, at a position in the lesson's list.
+    """
+    __tablename__ = 'lesson_record_lexeme'
+    __table_args__ = (
+        db.Index('ix_lesson_record_lexeme_lexeme_id', 'lexeme_id'),
+    )
+    lesson_record_id = db.Column(db.Integer, db.ForeignKey('lesson_record.id'), primary_key=True)
+    lexeme_id = db.Column(db.Integer, db.ForeignKey('lexeme.id'), primary_key=True)
+    position = db.Column(db.Integer, nullable=False)
+    lesson_record = db.relationship('LessonRecord', back_populates='lexeme_links')
+    lexeme = db.relationship('Lexeme')
+
+    def __repr__(self):
+        return f"LessonRecordLexeme('{self.lesson_record_id}', '{self.lexeme_id}', '{self.position}')"
+
+
+class CacheEntry(db.Model):
+    """
+    Represents a cached value shared by every app worker, e.g. a booking page's slot list or
+    a cache version counter. value holds JSON; expires_at is in UTC epoch seconds, or None
+    for entries that never expire.
+    """
+    __tablename__ = 'cache_entry'
+    key = db.Column(db.String(200), primary_key=True)
+    value = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.Integer, nullable=True, index=True)
+
+    def __repr__(self):
+        return f"CacheEntry('{self.key}', '{self.expires_at}')"
+
+
+class ReviewItem(db.Model):
+    """
+    Represents a student's spaced-repetition schedule for one word or phrase from their lessons.
+    due_minute is in UTC epoch minutes, like LessonSlot.start_minute.
+    """
+    __tablename__ = 'review_item'
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), primary_key=True)
+    lexeme_id = db.Column(db.Integer, db.ForeignKey('lexeme.id'), primary_key=True)
+    due_minute = db.Column(db.Integer, nullable=False)
+    interval_days = db.Column(db.Float, nullable=False, default=0.0)
+    ease = db.Column(db.Float, nullable=False, default=2.5)
+    repetitions = db.Column(db.Integer, nullable=False, default=0)
+    lapses = db.Column(db.Integer, nullable=False, default=0)
+    last_reviewed = db.Column(db.DateTime, nullable=True)
+    lexeme = db.relationship('Lexeme')
+
+    def __repr__(self):
+        return f"ReviewItem('{self.student_id}', '{self.lexeme_id}', '{self.due_minute}')"
+
 
-    
-    
 class LessonSlot(db.Model):
     """
     Represents a time slot available for lessons.
     Relationships with other models added with AI guidance
     """    
     __tablename__ = 'lesson_slot'
+    __table_args__ = (
+        # Unique so a recurring slot can only ever be materialized once
+        db.Index('uq_lesson_slot_teacher_id_start_time', 'teacher_id', 'start_time', unique=True),
+        db.Index('ix_lesson_slot_is_booked_start_time', 'is_booked', 'start_time'),
+        # Partial index covering only open slots, which is what the booking pages scan
+        db.Index('ix_lesson_slot_open_start_time', 'start_time',
+                 sqlite_where=db.text('is_booked = 0'), postgresql_where=db.text('is_booked = false')),
+        db.Index('ix_lesson_slot_teacher_id_start_minute', 'teacher_id', 'start_minute', 'end_minute'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     teacher_id = db.Column(db.Integer, db.ForeignKey('teacher.id'), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False, index=True)
     end_time = db.Column(db.DateTime, nullable=False)
+    # The same times as UTC epoch minutes, kept in step by _sync_epoch_minutes (bulk inserts must set them too)
+    start_minute = db.Column(db.Integer)
+    end_minute = db.Column(db.Integer)
     is_booked = db.Column(db.Boolean, default=False)
     teacher = db.relationship('Teacher', back_populates='lesson_slots')
     booking = db.relationship('Booking', uselist=False, back_populates='lesson_slot')
     lesson_records = db.relationship('LessonRecord', back_populates='lesson_slot')
 
+    @validates('start_time', 'end_time')
+    def _sync_epoch_minutes(self, key, value):
+        # Times are stored as naive UTC; SQLite would otherwise keep an aware value's local wall clock
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        minute_key = 'start_minute' if key == 'start_time' else 'end_minute'
+        setattr(self, minute_key, to_epoch_minutes(value) if value is not None else None)
+        return value
+
     def __repr__(self):
         return f"LessonSlot('{self.teacher_id}', '{self.start_time}', '{self.end_time}', '{self.is_booked}')"
 
 
+class RecurringAvailability(db.Model):
+    """
+    Represents a weekly window in which a teacher is open for lessons, e.g. Mondays 19:00-22:00.
+    Times are wall-clock times in the teacher's timezone. Hourly slots inside the window are
+    expanded on the fly and only stored as LessonSlot rows once booked or overridden.
+    """
+    __tablename__ = 'recurring_availability'
+    id = db.Column(db.Integer, primary_key=True)
+    teacher_id = db.Column(db.Integer, db.ForeignKey('teacher.id'), nullable=False, index=True)
+    weekday = db.Column(db.Integer, nullable=False)
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    timezone = db.Column(db.String(50), nullable=False)
+    teacher = db.relationship('Teacher', back_populates='recurring_availability')
+    overrides = db.relationship('RecurringAvailabilityOverride', back_populates='recurring_availability', cascade="all, delete-orphan")
+
+    def __repr__(self):
+        return f"RecurringAvailability('{self.teacher_id}', '{self.weekday}', '{self.start_time}', '{self.end_time}', '{self.timezone}')"
+
+
+class RecurringAvailabilityOverride(db.Model):
+    """
+    Marks a single occurrence of a recurring availability window as closed by the teacher.
+    """
+    __tablename__ = 'recurring_availability_override'
+    __table_args__ = (
+        db.UniqueConstraint('recurring_availability_id', 'start_time', name='uq_recurring_availability_override_start_time'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    recurring_availability_id = db.Column(db.Integer, db.ForeignKey('recurring_availability.id'), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    recurring_availability = db.relationship('RecurringAvailability', back_populates='overrides')
+
+    def __repr__(self):
+        return f"RecurringAvailabilityOverride('{self.recurring_availability_id}', '{self.start_time}')"
+
+
 class Booking(db.Model):
     """
     Represents a booking of a lesson slot by a student.
     Relationships with other models added with AI guidance
     """    
     __tablename__ = 'booking'
+    __table_args__ = (
+        db.Index('ix_booking_student_id_lesson_slot_id', 'student_id', 'lesson_slot_id'),
+        db.Index('ix_booking_lesson_slot_id', 'lesson_slot_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
     lesson_slot_id = db.Column(db.Integer, db.ForeignKey('lesson_slot.id'), nullable=False)
@@ -2,32 +2,22 @@
 This script removes expired lesson slots from the database.
 
 Expired slots are defined as those that ended more than a day ago and have not been booked.
+The same job is available as `flask slots purge` and can be scheduled in-process by setting
+SLOT_PURGE_INTERVAL_SECONDS.
 """
 
-from datetime import datetime, timedelta, timezone
-from app import db, LessonSlot
+from app import app
+from helpers.slot_maintenance_helpers import purge_expired_slots
 
 def remove_expired_slots():
     """
     Remove expired lesson slots from the database.
 
     An expired slot is one where the end time is more than a day ago and the slot is not booked.
+    Slots are deleted in batches so the write lock is never held for long.
     """
-    # Calculate the current time minus one day
-    now = datetime.now(timezone.utc) - timedelta(days=1)
-
-    # Query for expired slots that are not booked
-    expired_slots = LessonSlot.query.filter(
-        LessonSlot.end_time < now,
-        LessonSlot.is_booked == False
-    ).all()
-
-    # Delete the expired slots
-    for slot in expired_slots:
-        db.session.delete(slot)
-
-    # Commit the changes to the database
-    db.session.commit()
+    with app.app_context():
+        return purge_expired_slots()
 
 if __name__ == "__main__":
-    remove_expired_slots()
+    print(remove_expired_slots())
@@ -0,0 +1,140 @@
+# conftest.py
+"""
+Shared fixtures for the tests and benchmarks.
+
+app.py creates its tables when it is imported, so DATABASE_URL is pointed at a throwaway
+SQLite file before the import; every test then starts from empty tables. Benchmarks are
+marked bench and only run with `python -m pytest -m bench`.
+"""
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db')
+
+from app import app as flask_app  # noqa: E402
+from database import db  # noqa: E402
+from models import Booking, LessonRecord, LessonSlot, Student, Teacher  # noqa: E402
+from helpers.review_helpers import review_decks  # noqa: E402
+from helpers.slot_interval_index import slot_index  # noqa: E402
+
+
+class StatementRecorder:
+    """
+    Records the SQL statements, with their parameters, that reach the engine inside a with block.
+    """
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def __enter__(self):
+        self.statements.clear()
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    def _record(self, connection, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    @property
+    def selects(self):
+        return [(statement, parameters) for statement, parameters in self.statements
+                if statement.lstrip().upper().startswith('SELECT')]
+
+    def selected_rows(self):
+        """
+        Run the recorded SELECTs again and count the rows each one returns.
+        """
+        with self.engine.connect() as connection:
+            return [len(connection.exec_driver_sql(statement, parameters).fetchall()) for statement, parameters in self.selects]
+
+
+def best_of(fn, repeat=5):
+    """
+    Run fn repeat times and return the fastest run in milliseconds, with its last result.
+    """
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best, result
+
+
+@pytest.fixture
+def bench_report(capsys):
+    """
+    Print a benchmark's results as a table, past pytest's output capturing.
+    """
+    def report(title, header, rows):
+        widths = [max(len(str(cell)) for cell in column) for column in zip(header, *rows)]
+        with capsys.disabled():
+            print(f"\n{title}")
+            for row in (header, *rows):
+                print('  '.join(str(cell).rjust(width) for cell, width in zip(row, widths)))
+    return report
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        slot_index.reset()
+        review_decks.reset()
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture
+def recorder(app):
+    return StatementRecorder(db.engine)
+
+
+def make_teacher(name='teacher', timezone='UTC'):
+    teacher = Teacher(username=name, email=f'{name}@example.com', password='x', timezone=timezone)
+    db.session.add(teacher)
+    db.session.flush()
+    return teacher
+
+
+def make_student(name='student', timezone='UTC'):
+    student = Student(username=name, email=f'{name}@example.com', password='x', timezone=timezone)
+    db.session.add(student)
+    db.session.flush()
+    return student
+
+
+def make_slot(teacher, start_time, is_booked=False):
+    slot = LessonSlot(teacher_id=teacher.id, start_time=start_time, end_time=start_time + timedelta(hours=1), is_booked=is_booked)
+    db.session.add(slot)
+    db.session.flush()
+    return slot
+
+
+def make_lesson(teacher, student, start_time, last_edit_time=None):
+    """
+    A booked slot with its lesson record and booking.
+    """
+    slot = make_slot(teacher, start_time, is_booked=True)
+    record = LessonRecord(teacher_id=teacher.id, student_id=student.id, lesson_slot_id=slot.id,
+                          lastEditTime=last_edit_time or datetime.utcnow())
+    db.session.add(record)
+    db.session.flush()
+    db.session.add(Booking(student_id=student.id, lesson_slot_id=slot.id, lesson_record_id=record.id))
+    return record
+
+
+def make_booking_form(slot_id, teacher_id, snapshot=None):
+    """
+    Stands in for StudentLessonSlotForm in update_student_booking.
+    """
+    return SimpleNamespace(lesson_slot=SimpleNamespace(data=slot_id), teacher=SimpleNamespace(data=teacher_id),
+                           snapshot=SimpleNamespace(data=snapshot))
@@ -0,0 +1,139 @@
+# test_bench_load.py
+"""
+Multi-process load on the shared SQLite file (python -m pytest -m bench).
+
+Student processes book lessons and poll /api/availability while teacher processes post
+/teacher/updateSlots batches and reload their slot grid, each through its own test
+client and connection pool, as separate app workers would. With WAL and busy_timeout
+(database_config.DEFAULT_SQLITE_PRAGMAS) no request may fail with a 5xx or
+"database is locked", and no slot may be booked twice.
+"""
+import multiprocessing
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from database import db
+from models import Booking, LessonSlot, Student, Teacher
+
+pytestmark = pytest.mark.bench
+
+STUDENTS = 8
+TEACHERS = 4
+SECONDS = 4
+SLOTS_PER_TEACHER = 150
+
+SLOT_OPTION = re.compile(r'data-teacher-id="(\d+)" value="(-?\d+)"')
+SNAPSHOT = re.compile(r'name="snapshot" type="hidden" value="([^"]*)"')
+
+
+def seed():
+    password = generate_password_hash('pw')
+    for i in range(TEACHERS):
+        db.session.add(Teacher(username=f'teacher{i}', email=f'teacher{i}@example.com', password=password, timezone='UTC'))
+    for i in range(STUDENTS):
+        db.session.add(Student(username=f'student{i}', email=f'student{i}@example.com', password=password,
+                               timezone='UTC', lessons_purchased=1000))
+    db.session.flush()
+    teacher_ids = db.session.execute(db.select(Teacher.id)).scalars().all()
+    # Slots spread over the next few days, so most of them show on this week's booking page
+    now = datetime.now(timezone.utc).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+    db.session.add_all([LessonSlot(teacher_id=teacher_id, start_time=now + timedelta(hours=hour + 1),
+                                   end_time=now + timedelta(hours=hour + 2))
+                        for teacher_id in teacher_ids for hour in range(SLOTS_PER_TEACHER)])
+    db.session.commit()
+
+
+def worker(app, role, i, results):
+    """
+    Log in as one user and keep sending that role's requests for SECONDS.
+    """
+    # The pool was copied from the parent: leave its connections to the parent
+    db.engine.dispose(close=False)
+    errors = []
+    app_module = sys.modules[app.import_name]
+    update_student_booking = app_module.update_student_booking
+
+    def recording_booking(*args):
+        # The booking page only prints why a booking failed
+        lesson_record, error = update_student_booking(*args)
+        if error and error.startswith('Error booking lesson'):
+            errors.append(error)
+        return lesson_record, error
+    app_module.update_student_booking = recording_booking
+
+    client = app.test_client()
+    step = student_step if role == 'student' else teacher_step
+    done, failed, started = 0, 0, time.time()
+    try:
+        client.post(f'/{role}/login', data={'username': f'{role}{i}', 'password': 'pw'})
+        while time.time() - started < SECONDS:
+            statuses = step(client, i, done)
+            if statuses is None:
+                break
+            done += 1
+            failed += sum(status >= 500 for status in statuses)
+    except Exception as e:
+        # In debug mode a failing request raises here instead of answering 500
+        errors.append(repr(e))
+    finally:
+        results.put((role, done, failed, errors))
+
+
+def student_step(client, i, _):
+    page = client.get('/student/bookLesson')
+    slots = SLOT_OPTION.findall(page.get_data(as_text=True))
+    if page.status_code != 200 or not slots:
+        return None if page.status_code == 200 else [page.status_code]
+    teacher_id, slot_id = random.choice(slots)
+    booked = client.post('/student/bookLesson', data={
+        'teacher': teacher_id, 'lesson_slot': slot_id, 'snapshot': SNAPSHOT.search(page.get_data(as_text=True)).group(1)
+    })
+    return [page.status_code, booked.status_code, client.get('/api/availability').status_code]
+
+
+def teacher_step(client, i, batch):
+    # Each teacher opens slots in a year of their own, far from the booked ones
+    start = datetime(2031 + i, 1, 1) + timedelta(hours=10 * batch)
+    updated = client.post('/teacher/updateSlots', json=[
+        {'action': 'open', 'start_time': (start + timedelta(hours=hour)).isoformat(),
+         'end_time': (start + timedelta(hours=hour + 1)).isoformat()} for hour in range(10)
+    ])
+    grid = client.get('/teacher/lessonSlots', headers={'X-Requested-With': 'XMLHttpRequest'})
+    return [updated.status_code, grid.status_code]
+
+
+def test_students_and_teachers_under_load(app, monkeypatch, bench_report):
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+    seed()
+    db.session.remove()
+    db.engine.dispose()
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(app, role, i, results))
+                 for role, count in (('student', STUDENTS), ('teacher', TEACHERS)) for i in range(count)]
+    for process in processes:
+        process.start()
+    outcomes = [results.get(timeout=SECONDS * 10) for _ in processes]
+    for process in processes:
+        process.join()
+
+    rows = []
+    for role in ('student', 'teacher'):
+        mine = [outcome for outcome in outcomes if outcome[0] == role]
+        rows.append((role, len(mine), sum(outcome[1] for outcome in mine), sum(outcome[2] for outcome in mine),
+                     sum(len(outcome[3]) for outcome in mine)))
+    bench_report(f'{SECONDS}s of load on SQLite', ('role', 'processes', 'rounds', '5xx', 'errors'), rows)
+
+    assert all(failed == 0 and not errors for _, _, failed, errors in outcomes), outcomes
+    double_booked = db.session.execute(
+        db.select(Booking.lesson_slot_id).group_by(Booking.lesson_slot_id).having(db.func.count() > 1)
+    ).all()
+    assert not double_booked
+    assert db.session.execute(db.select(db.func.count(Booking.id))).scalar() > 0
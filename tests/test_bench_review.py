@@ -0,0 +1,45 @@
+# test_bench_review.py
+"""
+Benchmark of a 100k-item review deck: building it, finding the items due and
+rescheduling a reviewed item (python -m pytest -m bench).
+"""
+import random
+import tracemalloc
+
+import pytest
+
+from conftest import best_of
+from helpers.review_helpers import INITIAL_EASE, MINUTES_PER_DAY, _StudentDeck
+
+pytestmark = pytest.mark.bench
+
+ITEMS = 100_000
+NOW_MINUTE = 30_000_000
+
+
+def test_deck_of_100k_items(bench_report):
+    rng = random.Random(1)
+    rows = [(NOW_MINUTE + rng.randint(-30, 30) * MINUTES_PER_DAY, lexeme_id, rng.uniform(0, 60), INITIAL_EASE)
+            for lexeme_id in range(ITEMS)]
+
+    tracemalloc.start()
+    build_ms, deck = best_of(lambda: _StudentDeck(rows), repeat=3)
+    deck_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    due_ms, due_ids = best_of(lambda: deck.lexeme_ids[:min(deck.due_count(NOW_MINUTE), 20)].tolist(), repeat=1000)
+    stats_ms, stats = best_of(lambda: deck.stats(NOW_MINUTE))
+
+    reviewed = [rng.randrange(ITEMS) for _ in range(200)]
+    reschedule_ms, _ = best_of(lambda: [deck.reschedule(lexeme_id, NOW_MINUTE + 6 * MINUTES_PER_DAY, 6.0, INITIAL_EASE)
+                                        for lexeme_id in reviewed], repeat=1)
+
+    assert len(due_ids) == 20 and stats['total'] == ITEMS
+    assert list(deck.due) == sorted(deck.due) and len(deck.lexeme_ids) == ITEMS
+    bench_report(f'Review deck, {ITEMS} items', ('operation', 'ms'), [
+        ('build deck', f'{build_ms:.1f}'),
+        ('due now (20)', f'{due_ms:.4f}'),
+        ('deck stats', f'{stats_ms:.2f}'),
+        ('reschedule (each)', f'{reschedule_ms / len(reviewed):.3f}'),
+        ('deck memory (MB)', f'{deck_bytes / 1e6:.1f}'),
+    ])
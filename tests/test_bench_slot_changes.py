@@ -0,0 +1,62 @@
+# test_bench_slot_changes.py
+"""
+Benchmark of /teacher/updateSlots batches of 10, 100 and 1000 slots: apply_slot_changes,
+one transaction per batch, against open_slot/close_slot, one commit per slot as the route
+used to do (python -m pytest -m bench).
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import best_of, make_teacher
+from database import db
+from models import LessonSlot
+from helpers.teacher_lesson_slot_mgmt_helpers import apply_slot_changes, close_slot, open_slot
+
+pytestmark = pytest.mark.bench
+
+BATCHES = (10, 100, 1000)
+
+# A Monday well in the future
+WEEK_START = datetime(2031, 1, 6)
+
+
+def slot_times(size):
+    return [(WEEK_START + timedelta(hours=hour), WEEK_START + timedelta(hours=hour + 1)) for hour in range(size)]
+
+
+def batched(teacher_id, times):
+    opened = apply_slot_changes(teacher_id, 'UTC', [
+        {'action': 'open', 'start_time': start.isoformat(), 'end_time': end.isoformat()} for start, end in times
+    ])
+    slot_ids = [update['slot_id'] for update in opened['updates']]
+    return lambda: apply_slot_changes(teacher_id, 'UTC', [{'action': 'close', 'slot_id': slot_id} for slot_id in slot_ids])
+
+
+def per_slot(teacher_id, times):
+    slot_ids = [open_slot(start, end, teacher_id, 'UTC')['slot_id'] for start, end in times]
+    return lambda: [close_slot(slot_id, teacher_id) for slot_id in slot_ids]
+
+
+def time_open_and_close(apply, teacher_id, times):
+    """
+    Time opening the slots, then closing them again, leaving the teacher with none.
+    """
+    open_ms, close = best_of(lambda: apply(teacher_id, times), repeat=1)
+    close_ms, _ = best_of(close, repeat=1)
+    assert db.session.execute(db.select(db.func.count(LessonSlot.id))).scalar() == 0
+    return open_ms, close_ms
+
+
+def test_slot_batches(app, bench_report):
+    teacher_id = make_teacher().id
+    db.session.commit()
+
+    rows = []
+    for size in BATCHES:
+        times = slot_times(size)
+        per_slot_ms = time_open_and_close(per_slot, teacher_id, times)
+        batched_ms = time_open_and_close(batched, teacher_id, times)
+        rows.append((size, *(f'{ms:.1f}' for ms in per_slot_ms + batched_ms)))
+
+    bench_report('Slot batches (ms)', ('slots', 'per-slot open', 'per-slot close', 'batch open', 'batch close'), rows)
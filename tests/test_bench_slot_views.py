@@ -0,0 +1,61 @@
+# test_bench_slot_views.py
+"""
+Benchmark of rebuilding the booking page's slots from the stored snapshot, for 50, 500 and
+5000 slots: SlotView against the two type() classes per slot the POST path used to build
+(python -m pytest -m bench).
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import best_of
+from helpers.student_booking_helpers import convert_dict_to_slots, convert_slots_to_dict, convert_slots_to_views
+
+pytestmark = pytest.mark.bench
+
+SIZES = (50, 500, 5000)
+
+WEEK_START = datetime(2031, 1, 6)
+
+
+def snapshot(size):
+    teachers = [SimpleNamespace(id=i, username=f'teacher{i}') for i in range(20)]
+    slots = [SimpleNamespace(id=i, start_time=WEEK_START + timedelta(minutes=30 * i),
+                             end_time=WEEK_START + timedelta(minutes=30 * i + 60), teacher=teachers[i % 20])
+             for i in range(size)]
+    return slots, convert_slots_to_dict(convert_slots_to_views(slots))
+
+
+def rebuild_with_type(slots_dict):
+    # The POST path before SlotView
+    return [
+        type('LessonSlot', (object,), {
+            'id': slot_dict['id'],
+            'start_time': datetime.fromisoformat(slot_dict['start_time']),
+            'end_time': datetime.fromisoformat(slot_dict['end_time']),
+            'teacher': type('Teacher', (object,), {
+                'id': slot_dict['teacher_id'],
+                'username': slot_dict['teacher_username']
+            })()
+        })()
+        for slot_dict in slots_dict
+    ]
+
+
+def fields(slots):
+    return [(slot.id, slot.start_time, slot.end_time, slot.teacher.id, slot.teacher.username) for slot in slots]
+
+
+def test_slot_views(bench_report):
+    rows = []
+    for size in SIZES:
+        slots, slots_dict = snapshot(size)
+        type_ms, typed = best_of(lambda: rebuild_with_type(slots_dict))
+        view_ms, views = best_of(lambda: convert_dict_to_slots(slots_dict))
+        from_rows_ms, _ = best_of(lambda: convert_slots_to_views(slots))
+
+        assert fields(views) == fields(typed) == fields(slots)
+        rows.append((size, f'{type_ms:.2f}', f'{view_ms:.2f}', f'{from_rows_ms:.2f}'))
+
+    bench_report('Booking page slots (ms)', ('slots', 'type() from snapshot', 'SlotView from snapshot', 'SlotView from rows'), rows)
@@ -0,0 +1,42 @@
+# test_bench_time_helpers.py
+"""
+Benchmark of converting 10k slot times in a week that clocks go forward in, to
+America/New_York: localize_utc_times against resolving the zone and calling astimezone
+per value (python -m pytest -m bench).
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytz
+
+from conftest import best_of
+from helpers.time_helpers import localize_utc_times
+
+pytestmark = pytest.mark.bench
+
+ZONE = 'America/New_York'
+FMT = '%a %d %b %H:%M'
+TIMES = 10_000
+
+# The week of 10 March 2030, when clocks go forward
+WEEK_START = datetime(2030, 3, 7)
+
+
+def per_value(utc_times, fmt=None):
+    localized = [utc_time.replace(tzinfo=timezone.utc).astimezone(pytz.timezone(ZONE)) for utc_time in utc_times]
+    return [local_time.strftime(fmt) for local_time in localized] if fmt else localized
+
+
+def test_localize_10k_times(bench_report):
+    # One time per minute, and the start of an hourly slot repeated as on a busy booking page
+    every_minute = [WEEK_START + timedelta(minutes=i) for i in range(TIMES)]
+    hourly = [WEEK_START + timedelta(hours=i % (7 * 24)) for i in range(TIMES)]
+
+    rows = []
+    for label, utc_times, fmt in (('datetimes, every minute', every_minute, None), ('strings, hourly slots', hourly, FMT)):
+        per_value_ms, expected = best_of(lambda: per_value(utc_times, fmt), repeat=7)
+        batch_ms, localized = best_of(lambda: localize_utc_times(utc_times, ZONE, fmt), repeat=7)
+        assert localized == expected
+        rows.append((label, f'{per_value_ms:.1f}', f'{batch_ms:.1f}'))
+
+    bench_report(f'{TIMES} times to {ZONE} (ms)', ('values', 'per-value astimezone', 'localize_utc_times'), rows)
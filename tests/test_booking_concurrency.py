@@ -0,0 +1,99 @@
+# test_booking_concurrency.py
+"""
+Concurrent booking stress test.
+
+Several threads, each with its own app context and database connection, book the same
+slots on the file-backed test database through update_student_booking. The conditional
+UPDATEs must let exactly one student have each slot and never spend a credit twice.
+"""
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from conftest import make_booking_form, make_slot, make_student, make_teacher
+from database import db
+from models import Booking, LessonSlot, Student
+from helpers.student_booking_helpers import update_student_booking
+
+STUDENTS = 8
+SLOTS = 20
+
+
+def seed(lessons_purchased):
+    teacher = make_teacher()
+    now = datetime.now(timezone.utc).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+    slot_ids = [make_slot(teacher, now + timedelta(hours=hour + 1)).id for hour in range(SLOTS)]
+    student_ids = []
+    for i in range(STUDENTS):
+        student = make_student(f'student{i}')
+        student.lessons_purchased = lessons_purchased
+        student_ids.append(student.id)
+    db.session.commit()
+    return teacher.id, slot_ids, student_ids
+
+
+def book_concurrently(app, teacher_id, slot_ids, student_ids):
+    """
+    Start every student at once, each trying every slot, and collect what they got back.
+    """
+    start = threading.Barrier(len(student_ids))
+    results = []
+
+    def student_books(student_id, offset):
+        with app.app_context():
+            student = db.session.get(Student, student_id)
+            start.wait()
+            # Each student walks the slots from a different place, so they collide mid-list too
+            for slot_id in slot_ids[offset:] + slot_ids[:offset]:
+                lesson_record, error = update_student_booking(make_booking_form(slot_id, teacher_id), student, datetime.now(timezone.utc))
+                results.append((student_id, slot_id, lesson_record is not None, error))
+            db.session.remove()
+
+    threads = [threading.Thread(target=student_books, args=(student_id, i * 3)) for i, student_id in enumerate(student_ids)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def booking_counts():
+    return Counter(db.session.execute(db.select(Booking.lesson_slot_id)).scalars())
+
+
+def assert_consistent(results):
+    # Losing a race is an expected outcome; a database error is not
+    errors = {error for _, _, _, error in results if error and error.startswith('Error booking lesson')}
+    assert not errors
+
+    bookings = booking_counts()
+    assert all(count == 1 for count in bookings.values()), bookings
+    booked = set(db.session.execute(db.select(LessonSlot.id).where(LessonSlot.is_booked == True)).scalars())
+    assert booked == set(bookings)
+    assert Counter(slot_id for _, slot_id, ok, _ in results if ok) == bookings
+
+    bookings_by_student = Counter(db.session.execute(db.select(Booking.student_id)).scalars())
+    for student in db.session.execute(db.select(Student)).scalars():
+        assert student.number_of_lessons <= student.lessons_purchased
+        assert student.number_of_lessons == bookings_by_student[student.id]
+
+
+def test_every_slot_is_booked_exactly_once(app):
+    teacher_id, slot_ids, student_ids = seed(lessons_purchased=SLOTS)
+
+    results = book_concurrently(app, teacher_id, slot_ids, student_ids)
+
+    db.session.expire_all()
+    assert_consistent(results)
+    assert sorted(booking_counts()) == sorted(slot_ids)
+
+
+def test_credits_are_never_overspent(app):
+    # 16 credits between them for 20 slots
+    teacher_id, slot_ids, student_ids = seed(lessons_purchased=2)
+
+    results = book_concurrently(app, teacher_id, slot_ids, student_ids)
+
+    db.session.expire_all()
+    assert_consistent(results)
+    assert sum(booking_counts().values()) <= STUDENTS * 2
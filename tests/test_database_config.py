@@ -0,0 +1,57 @@
+# test_database_config.py
+"""
+The connection settings from database_config: every new SQLite connection is tuned with
+the configured pragmas, and the URI and pool options come from the environment.
+"""
+import pytest
+from sqlalchemy import create_engine
+
+from database import db
+from database_config import DEFAULT_SQLITE_PRAGMAS, get_database_uri, get_engine_options, register_sqlite_pragmas
+
+
+def pragmas(connection, *names):
+    return {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in names}
+
+
+def test_new_connections_get_the_default_pragmas(app):
+    # Start from fresh connections rather than whatever the pool already holds
+    db.engine.dispose()
+    with db.engine.connect() as first, db.engine.connect() as second:
+        for connection in (first, second):
+            assert pragmas(connection, 'journal_mode', 'busy_timeout', 'synchronous', 'cache_size') == {
+                'journal_mode': 'wal',
+                'busy_timeout': DEFAULT_SQLITE_PRAGMAS['busy_timeout'],
+                'synchronous': 1,
+                'cache_size': DEFAULT_SQLITE_PRAGMAS['cache_size'],
+            }
+
+
+def test_configured_pragmas_replace_the_defaults(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+    register_sqlite_pragmas(engine, {'journal_mode': 'TRUNCATE', 'busy_timeout': 250})
+
+    with engine.connect() as connection:
+        assert pragmas(connection, 'journal_mode', 'busy_timeout') == {'journal_mode': 'truncate', 'busy_timeout': 250}
+    engine.dispose()
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('postgres://user@db/app', 'postgresql://user@db/app'),
+    ('postgresql://user@db/app', 'postgresql://user@db/app'),
+    ('sqlite:///site.db', 'sqlite:///site.db'),
+])
+def test_postgres_urls_are_normalized(monkeypatch, url, expected):
+    monkeypatch.setenv('DATABASE_URL', url)
+    assert get_database_uri() == expected
+
+
+def test_engine_options_follow_the_backend(monkeypatch):
+    monkeypatch.setenv('DB_POOL_SIZE', '3')
+
+    assert get_engine_options('sqlite:///:memory:') == {}
+    sqlite_options = get_engine_options('sqlite:///site.db')
+    assert sqlite_options['pool_size'] == 3
+    assert sqlite_options['connect_args'] == {'timeout': DEFAULT_SQLITE_PRAGMAS['busy_timeout'] / 1000}
+    postgres_options = get_engine_options('postgresql://user@db/app')
+    assert postgres_options['pool_size'] == 3 and postgres_options['pool_pre_ping']
@@ -0,0 +1,38 @@
+# test_lexicon.py
+"""
+Lesson vocabulary: words and phrases are shared lexemes, linked to lessons in order.
+"""
+from datetime import datetime
+
+from conftest import make_lesson, make_student, make_teacher
+from database import db
+from models import LessonRecordLexeme, Lexeme
+from helpers.edit_lesson_record_helpers import update_lesson_terms
+from helpers.lexicon_helpers import get_or_create_lexemes
+
+
+def count(model):
+    return db.session.execute(db.select(db.func.count()).select_from(model)).scalar()
+
+
+def test_new_lexemes_are_rolled_back_with_the_edit(app):
+    record = make_lesson(make_teacher(), make_student(), datetime(2024, 1, 1))
+    db.session.commit()
+
+    update_lesson_terms(record, ['hello', 'world'], ['how are you'])
+    db.session.rollback()
+
+    assert count(Lexeme) == 0
+    assert count(LessonRecordLexeme) == 0
+
+
+def test_existing_lexemes_are_reused(app):
+    first = get_or_create_lexemes(Lexeme.WORD, ['Hello', 'world'])
+    db.session.commit()
+
+    second = get_or_create_lexemes(Lexeme.WORD, ['  HELLO ', 'again'])
+    db.session.commit()
+
+    assert second['hello'].id == first['hello'].id
+    assert second['hello'].content == 'Hello'
+    assert count(Lexeme) == 3
@@ -0,0 +1,126 @@
+# test_query_shapes.py
+"""
+Statement and row counts for the loader shapes in query_shape_helpers and the column-select views.
+
+Each page's query is run over 1, 10 and 100 rows, touching everything the template reads.
+The number of SQL statements must not grow with the rows: a relationship that slips back
+to lazy loading adds a statement per row (N+1) and fails here. The rows those statements
+return must grow in step with the rows seeded: joining two collections into one query
+returns their product (words x phrases on the edit form) and fails here too.
+"""
+from datetime import datetime, time, timedelta
+
+import pytest
+
+from conftest import StatementRecorder, make_lesson, make_slot, make_student, make_teacher
+from database import db
+from models import RecurringAvailability
+from helpers.dashboard_helpers import get_upcoming_lessons
+from helpers.edit_lesson_record_helpers import get_lesson_by_id, update_lesson_terms
+from helpers.lesson_record_helpers import get_paginated_lesson_records
+from helpers.recurring_availability_helpers import expand_recurring_availability
+from helpers.student_booking_helpers import fetch_available_slots
+
+SIZES = (1, 10, 100)
+
+# Monday of a week well in the future, so no slot is in the past; record lists only show past lessons
+WEEK_START = datetime(2031, 1, 6)
+WEEK_END = WEEK_START + timedelta(days=7)
+PAST = datetime(2024, 1, 1)
+
+
+def seed_edit_form(size):
+    teacher, student = make_teacher(), make_student()
+    record = make_lesson(teacher, student, WEEK_START)
+    update_lesson_terms(record, [f'word{i}' for i in range(size)], [f'phrase number {i}' for i in range(size)])
+    return record.id
+
+
+def load_edit_form(record_id):
+    record = get_lesson_by_id(record_id)
+    return [(record.student.username, word.content, phrase.content) for word, phrase in zip(record.new_words, record.new_phrases)]
+
+
+def seed_bookable_slots(size):
+    for i in range(size):
+        make_slot(make_teacher(f'teacher{i}'), WEEK_START + timedelta(hours=i))
+
+
+def load_bookable_slots(_):
+    return [slot.teacher.username for slot in fetch_available_slots(None, WEEK_START, WEEK_END)]
+
+
+def seed_recurring_windows(size):
+    for i in range(size):
+        db.session.add(RecurringAvailability(teacher_id=make_teacher(f'teacher{i}').id, weekday=i % 7,
+                                             start_time=time(1 + i % 22), end_time=time(2 + i % 22), timezone='UTC'))
+
+
+def load_recurring_windows(_):
+    return [slot.teacher.username for slot in expand_recurring_availability(WEEK_START, WEEK_END)]
+
+
+def seed_lesson_records(size):
+    teacher = make_teacher()
+    for i in range(size):
+        record = make_lesson(teacher, make_student(f'student{i}'), PAST + timedelta(hours=i))
+        update_lesson_terms(record, ['hello', f'word{i}'], [f'phrase number {i}'])
+    return teacher.id
+
+
+def load_lesson_records(teacher_id):
+    page = get_paginated_lesson_records(teacher_id, 'teacher', 'UTC', per_page=max(SIZES))
+    return [(record.student.username, record.new_words, record.new_phrases) for record in page.items]
+
+
+def seed_upcoming_lessons(size):
+    teacher = make_teacher()
+    for i in range(size):
+        make_lesson(teacher, make_student(f'student{i}'), WEEK_START + timedelta(hours=i))
+    return teacher.id
+
+
+def load_upcoming_lessons(teacher_id):
+    return [(lesson.booking.student.username, lesson.start_time) for lesson in get_upcoming_lessons(teacher_id, 'teacher', 'UTC')]
+
+
+SHAPES = {
+    'edit form': (seed_edit_form, load_edit_form),
+    'bookable slots': (seed_bookable_slots, load_bookable_slots),
+    'recurring windows': (seed_recurring_windows, load_recurring_windows),
+    'lesson record list': (seed_lesson_records, load_lesson_records),
+    'upcoming lessons': (seed_upcoming_lessons, load_upcoming_lessons),
+}
+
+
+def measure(name):
+    """
+    Seed each size in turn and record the statements sent, and the rows they returned, while loading it.
+    """
+    seed, load = SHAPES[name]
+    recorder = StatementRecorder(db.engine)
+    statements, rows = {}, {}
+    for size in SIZES:
+        db.drop_all()
+        db.create_all()
+        key = seed(size)
+        db.session.commit()
+        db.session.expunge_all()
+        with recorder:
+            loaded = load(key)
+        db.session.rollback()
+        assert len(loaded) == size
+        statements[size] = len(recorder.statements)
+        rows[size] = sum(recorder.selected_rows())
+    return statements, rows
+
+
+@pytest.mark.parametrize('name', SHAPES)
+def test_queries_grow_with_rows_only_as_expected(app, name):
+    statements, rows = measure(name)
+
+    assert len(set(statements.values())) == 1, f'{name}: statements by row count {statements}'
+    # The rows returned per seeded row, from the two smallest sizes, must carry over to the largest
+    small, medium, large = SIZES
+    per_row = (rows[medium] - rows[small]) / (medium - small)
+    assert rows[large] == rows[medium] + per_row * (large - medium), f'{name}: rows returned by row count {rows}'
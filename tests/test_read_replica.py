@@ -0,0 +1,87 @@
+# test_read_replica.py
+"""
+Read replica routing: queries inside read_only() go to the DATABASE_REPLICA_URL bind,
+everything else to the primary, and a user who just wrote stays on the primary for
+REPLICA_STICKY_SECONDS.
+
+The shared test app has no replica, so these tests bind db to an app of their own, with
+the primary and the replica in two SQLite files that hold different data.
+"""
+import time
+
+import pytest
+from flask import Flask, session as flask_session
+
+from database import LAST_WRITE_SESSION_KEY, db, init_database, read_only
+from database_config import REPLICA_BIND_KEY
+from models import Teacher
+
+STICKY_SECONDS = 30
+
+
+@pytest.fixture
+def replica_app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_REPLICA_URL', f"sqlite:///{tmp_path / 'replica.db'}")
+    # init_app registers a metadata for the replica bind, which the shared app's create_all would then look for
+    monkeypatch.setattr(db, 'metadatas', dict(db.metadatas))
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', REPLICA_STICKY_SECONDS=STICKY_SECONDS,
+                      SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.db'}")
+    init_database(app)
+
+    with app.app_context():
+        for bind_key, username in ((None, 'on-primary'), (REPLICA_BIND_KEY, 'on-replica')):
+            engine = db.engines[bind_key]
+            db.metadata.create_all(engine)
+            with engine.begin() as connection:
+                connection.execute(db.insert(Teacher).values(id=1, username=username, email='t@example.com',
+                                                             password='x', timezone='UTC'))
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def teacher_name():
+    return db.session.execute(db.select(Teacher.username).where(Teacher.id == 1)).scalar()
+
+
+def test_reads_inside_read_only_use_the_replica(replica_app):
+    with read_only():
+        assert teacher_name() == 'on-replica'
+    assert teacher_name() == 'on-primary'
+
+
+def test_writes_inside_read_only_use_the_primary(replica_app):
+    with read_only():
+        db.session.get(Teacher, 1).timezone = 'Europe/Paris'
+        db.session.commit()
+
+    assert db.session.execute(db.select(Teacher.timezone)).scalar() == 'Europe/Paris'
+    with db.engines[REPLICA_BIND_KEY].connect() as connection:
+        assert connection.execute(db.select(Teacher.timezone)).scalar() == 'UTC'
+
+
+def test_user_who_just_wrote_reads_from_the_primary(replica_app):
+    with replica_app.test_request_context():
+        db.session.execute(db.update(Teacher).where(Teacher.id == 1).values(timezone='Europe/Paris'))
+        db.session.commit()
+
+        assert time.time() - flask_session[LAST_WRITE_SESSION_KEY] < 1
+        with read_only():
+            assert teacher_name() == 'on-primary'
+
+        # Once the sticky window has passed the user's reads go back to the replica
+        flask_session[LAST_WRITE_SESSION_KEY] = time.time() - STICKY_SECONDS
+        with read_only():
+            assert teacher_name() == 'on-replica'
+
+
+def test_commit_without_writes_does_not_pin_to_the_primary(replica_app):
+    with replica_app.test_request_context():
+        teacher_name()
+        db.session.commit()
+
+        assert LAST_WRITE_SESSION_KEY not in flask_session
+        with read_only():
+            assert teacher_name() == 'on-replica'
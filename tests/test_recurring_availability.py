@@ -0,0 +1,55 @@
+# test_recurring_availability.py
+"""
+Booking recurring availability: the LessonSlot row behind an occurrence only exists once
+a booking for it commits.
+"""
+from datetime import datetime, time, timedelta, timezone
+
+from conftest import make_booking_form, make_student, make_teacher
+from database import db
+from models import Booking, LessonSlot, RecurringAvailability
+from helpers.recurring_availability_helpers import encode_virtual_slot_id
+from helpers.student_booking_helpers import update_student_booking
+
+# A Monday well in the future
+OCCURRENCE = datetime(2031, 1, 6, 9)
+
+
+def seed_window():
+    teacher = make_teacher()
+    db.session.add(RecurringAvailability(teacher_id=teacher.id, weekday=OCCURRENCE.weekday(),
+                                         start_time=time(9), end_time=time(12), timezone='UTC'))
+    db.session.flush()
+    return teacher
+
+
+def book(student, teacher, slot_id):
+    return update_student_booking(make_booking_form(slot_id, teacher.id), student, datetime.now(timezone.utc))
+
+
+def test_failed_booking_leaves_no_materialized_slot(app):
+    teacher = seed_window()
+    student = make_student()
+    student.lessons_purchased = 0
+    db.session.commit()
+    slot_id = encode_virtual_slot_id(db.session.execute(db.select(RecurringAvailability.id)).scalar(), OCCURRENCE)
+
+    lesson_record, error = book(student, teacher, slot_id)
+
+    assert lesson_record is None and error == 'Not enough points to book a lesson.'
+    db.session.remove()
+    assert db.session.execute(db.select(db.func.count(LessonSlot.id))).scalar() == 0
+
+
+def test_booking_materializes_the_occurrence_once(app):
+    teacher = seed_window()
+    first, second = make_student('first'), make_student('second')
+    db.session.commit()
+    slot_id = encode_virtual_slot_id(db.session.execute(db.select(RecurringAvailability.id)).scalar(), OCCURRENCE)
+
+    assert book(first, teacher, slot_id)[1] is None
+    assert book(second, teacher, slot_id)[1] == 'Invalid or unavailable lesson slot selected.'
+
+    slots = db.session.execute(db.select(LessonSlot)).scalars().all()
+    assert [(slot.start_time, slot.is_booked) for slot in slots] == [(OCCURRENCE, True)]
+    assert db.session.execute(db.select(Booking.student_id)).scalars().all() == [first.id]
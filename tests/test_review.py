@@ -0,0 +1,111 @@
+# test_review.py
+"""
+Spaced-repetition review: SM-2 scheduling and the in-memory review decks.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import make_lesson, make_student, make_teacher
+from database import db
+from models import ReviewItem, Student
+from helpers import review_helpers
+from helpers.edit_lesson_record_helpers import update_lesson_terms
+from helpers.review_helpers import (
+    INITIAL_EASE, MIN_EASE, MINUTES_PER_DAY, RELEARN_MINUTES, ReviewDeckStore, get_due_reviews, record_review,
+    review_decks, schedule_review,
+)
+from helpers.time_helpers import to_epoch_minutes
+
+NOW = datetime(2030, 3, 1, 12)
+
+
+def test_first_reviews_follow_sm2_intervals():
+    repetitions, interval, ease = 0, 0.0, INITIAL_EASE
+    intervals = []
+    for _ in range(4):
+        repetitions, interval, ease, due_in, lapsed = schedule_review(repetitions, interval, ease, 4)
+        assert not lapsed and due_in == round(interval * MINUTES_PER_DAY)
+        intervals.append(interval)
+    assert intervals[:2] == [1.0, 6.0]
+    assert intervals[2] == round(6.0 * ease, 2) and intervals[3] > intervals[2]
+    # A grade of 4 leaves the ease factor where it was
+    assert ease == pytest.approx(INITIAL_EASE)
+
+
+def test_lapse_restarts_the_item():
+    assert schedule_review(5, 40.0, 2.5, 1) == (0, 0.0, pytest.approx(1.96), RELEARN_MINUTES, True)
+
+
+def test_ease_never_drops_below_the_minimum():
+    ease = INITIAL_EASE
+    for _ in range(20):
+        ease = schedule_review(0, 0.0, ease, 0)[2]
+    assert ease == MIN_EASE
+
+
+@pytest.fixture
+def student_with_vocabulary(app):
+    student = make_student()
+    record = make_lesson(make_teacher(), student, NOW - timedelta(days=1))
+    update_lesson_terms(record, ['alpha', 'beta', 'gamma'], ['delta epsilon'])
+    db.session.commit()
+    return student.id
+
+
+def test_deck_is_built_from_lesson_vocabulary(student_with_vocabulary):
+    due = get_due_reviews(student_with_vocabulary, now=NOW)
+
+    assert [item['content'] for item in due['items']] == ['alpha', 'beta', 'gamma', 'delta epsilon']
+    assert (due['total'], due['due'], due['learning'], due['mature']) == (4, 4, 4, 0)
+    assert db.session.execute(db.select(db.func.count(ReviewItem.lexeme_id))).scalar() == 4
+
+
+def test_recorded_grades_reorder_the_deck(student_with_vocabulary):
+    student_id = student_with_vocabulary
+    first, second = [item['lexeme_id'] for item in get_due_reviews(student_id, now=NOW)['items'][:2]]
+
+    assert record_review(student_id, first, 4, now=NOW)['interval_days'] == 1.0
+    assert record_review(student_id, second, 1, now=NOW)['interval_days'] == 0.0
+
+    due = get_due_reviews(student_id, now=NOW)
+    assert first not in [item['lexeme_id'] for item in due['items']] and due['due'] == 2
+    # The relearning item is due again after RELEARN_MINUTES, the reviewed one after a day
+    later = get_due_reviews(student_id, now=NOW + timedelta(minutes=RELEARN_MINUTES))
+    assert later['items'][-1]['lexeme_id'] == second and later['due'] == 3
+
+    # The deck reloaded from the database matches the one updated in place
+    review_decks.reset()
+    assert get_due_reviews(student_id, now=NOW + timedelta(minutes=RELEARN_MINUTES)) == later
+
+
+def test_invalid_grades_are_rejected(student_with_vocabulary):
+    assert record_review(student_with_vocabulary, 1, 6)['status'] == 'error'
+    assert record_review(student_with_vocabulary, 1, True)['status'] == 'error'
+    assert record_review(student_with_vocabulary, 999, 3)['message'] == 'Review item not found'
+
+
+def test_loading_a_deck_leaves_the_callers_session_alone(student_with_vocabulary):
+    # Left unflushed: on SQLite a flushed write would hold the lock the deck sync waits on
+    db.session.add(Student(username='pending', email='pending@example.com', password='x'))
+    get_due_reviews(student_with_vocabulary, now=NOW)
+    db.session.rollback()
+
+    assert db.session.execute(db.select(Student.id).where(Student.username == 'pending')).first() is None
+    assert db.session.execute(db.select(db.func.count(ReviewItem.lexeme_id))).scalar() == 4
+
+
+def test_deck_loaded_during_a_review_is_not_kept(student_with_vocabulary, monkeypatch):
+    store = ReviewDeckStore()
+    load_deck = review_helpers.load_deck
+
+    def load_while_reviewing(student_id, now_minute):
+        deck = load_deck(student_id, now_minute)
+        store.apply(student_id, deck.lexeme_ids[0], now_minute + MINUTES_PER_DAY, 1.0, INITIAL_EASE)
+        return deck
+
+    monkeypatch.setattr(review_helpers, 'load_deck', load_while_reviewing)
+    lexeme_ids, stats = store.due(student_with_vocabulary, to_epoch_minutes(NOW), 10)
+
+    assert stats['due'] == 4 and len(lexeme_ids) == 4
+    assert student_with_vocabulary not in store._decks
@@ -0,0 +1,55 @@
+# test_search.py
+"""
+The triggers that keep lesson_record_fts in step with lesson records and their words and
+phrases, and searching through it.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from conftest import make_lesson, make_student, make_teacher
+from database import db
+from helpers.edit_lesson_record_helpers import update_lesson_terms
+from helpers.search_helpers import ensure_search_index, search_lesson_records
+
+
+@pytest.fixture
+def lesson(app):
+    ensure_search_index()
+    teacher, student = make_teacher(), make_student()
+    record = make_lesson(teacher, student, datetime(2024, 1, 1))
+    update_lesson_terms(record, ['alpha', 'beta', 'gamma'], [])
+    db.session.commit()
+    yield record
+    # Not part of the models' metadata, so drop_all leaves it behind for the next test
+    db.session.rollback()
+    db.session.execute(text('DROP TABLE IF EXISTS lesson_record_fts'))
+    db.session.commit()
+
+
+def indexed_terms(record_id):
+    return db.session.execute(text('SELECT terms FROM lesson_record_fts WHERE rowid = :id'), {'id': record_id}).scalar()
+
+
+def test_terms_are_indexed_in_lesson_order(lesson):
+    assert indexed_terms(lesson.id) == 'alpha beta gamma'
+
+    update_lesson_terms(lesson, ['alpha', 'gamma', 'delta'], [])
+    db.session.commit()
+    assert indexed_terms(lesson.id) == 'alpha gamma delta'
+
+
+def test_reordering_terms_refreshes_the_index(lesson):
+    # Only positions change: no link is added or removed
+    update_lesson_terms(lesson, ['gamma', 'alpha', 'beta'], [])
+    db.session.commit()
+
+    assert indexed_terms(lesson.id) == 'gamma alpha beta'
+
+
+def test_search_finds_lessons_by_term(lesson):
+    hits, has_next = search_lesson_records(lesson.teacher_id, 'teacher', 'beta', 'UTC')
+
+    assert [hit.record.id for hit in hits] == [lesson.id] and not has_next
+    assert search_lesson_records(lesson.student_id + 1, 'student', 'beta', 'UTC') == ([], False)
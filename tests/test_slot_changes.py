@@ -0,0 +1,95 @@
+# test_slot_changes.py
+"""
+apply_slot_changes: a batch of opened and closed slots from /teacher/updateSlots is
+applied in one transaction, so either every change lands or none does.
+"""
+from datetime import datetime, time, timedelta
+
+import pytest
+
+from conftest import make_slot, make_teacher
+from database import db
+from models import LessonSlot, RecurringAvailability, RecurringAvailabilityOverride
+from helpers.recurring_availability_helpers import encode_virtual_slot_id
+from helpers.slot_interval_index import slot_index
+from helpers.teacher_lesson_slot_mgmt_helpers import apply_slot_changes
+from helpers.time_helpers import to_epoch_minutes
+
+# A Monday well in the future
+WEEK_START = datetime(2031, 1, 6)
+
+
+def opens(*hours):
+    return [{'action': 'open', 'start_time': (WEEK_START + timedelta(hours=hour)).isoformat(),
+             'end_time': (WEEK_START + timedelta(hours=hour + 1)).isoformat()} for hour in hours]
+
+
+def closes(*slot_ids):
+    return [{'action': 'close', 'slot_id': slot_id} for slot_id in slot_ids]
+
+
+@pytest.fixture
+def teacher_slots(app):
+    """
+    A teacher with an open slot, a booked slot and a weekly window on Tuesdays 09:00-10:00.
+    """
+    teacher = make_teacher()
+    open_slot = make_slot(teacher, WEEK_START + timedelta(hours=1))
+    booked_slot = make_slot(teacher, WEEK_START + timedelta(hours=2), is_booked=True)
+    window = RecurringAvailability(teacher_id=teacher.id, weekday=1, start_time=time(9), end_time=time(10), timezone='UTC')
+    db.session.add(window)
+    db.session.commit()
+    recurring_id = encode_virtual_slot_id(window.id, WEEK_START + timedelta(days=1, hours=9))
+    return teacher.id, open_slot.id, booked_slot.id, recurring_id
+
+
+def slot_at(teacher_id, hour):
+    start = WEEK_START + timedelta(hours=hour)
+    return slot_index.find_overlap(teacher_id, to_epoch_minutes(start), to_epoch_minutes(start + timedelta(hours=1)))
+
+
+def slot_starts():
+    return sorted(db.session.execute(db.select(LessonSlot.start_time)).scalars())
+
+
+def test_mixed_batch_is_applied_together(teacher_slots):
+    teacher_id, open_id, _, recurring_id = teacher_slots
+
+    result = apply_slot_changes(teacher_id, 'UTC', opens(5, 6) + closes(open_id, recurring_id))
+
+    assert result['status'] == 'success'
+    assert [update['action'] for update in result['updates']] == ['close', 'close', 'open', 'open']
+    assert slot_starts() == [WEEK_START + timedelta(hours=hour) for hour in (2, 5, 6)]
+    assert db.session.execute(db.select(db.func.count(RecurringAvailabilityOverride.id))).scalar() == 1
+    # The slot index follows the committed batch
+    assert slot_at(teacher_id, 1) is None and slot_at(teacher_id, 5) is not None
+
+
+def test_mixed_batch_with_a_booked_slot_changes_nothing(teacher_slots):
+    teacher_id, open_id, booked_id, recurring_id = teacher_slots
+
+    # The recurring override and the open slot's DELETE are written before the booked slot fails the batch
+    result = apply_slot_changes(teacher_id, 'UTC', opens(5, 6) + closes(recurring_id, open_id, booked_id))
+    db.session.remove()
+
+    assert result['status'] == 'error'
+    assert slot_starts() == [WEEK_START + timedelta(hours=hour) for hour in (1, 2)]
+    assert db.session.execute(db.select(db.func.count(RecurringAvailabilityOverride.id))).scalar() == 0
+    assert slot_at(teacher_id, 1) == open_id and slot_at(teacher_id, 5) is None
+
+
+def test_overlapping_opens_change_nothing(teacher_slots):
+    teacher_id, open_id, _, _ = teacher_slots
+
+    result = apply_slot_changes(teacher_id, 'UTC', opens(5, 2) + closes(open_id))
+
+    assert result == {'status': 'error', 'message': 'Slots cannot overlap.'}
+    assert slot_starts() == [WEEK_START + timedelta(hours=hour) for hour in (1, 2)]
+
+
+def test_malformed_change_is_rejected_before_writing(teacher_slots):
+    teacher_id, open_id, _, _ = teacher_slots
+
+    with pytest.raises(ValueError):
+        apply_slot_changes(teacher_id, 'UTC', closes(open_id) + [{'action': 'open', 'start_time': 'garbage'}])
+    assert slot_starts() == [WEEK_START + timedelta(hours=hour) for hour in (1, 2)]
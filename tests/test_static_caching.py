@@ -0,0 +1,49 @@
+# test_static_caching.py
+"""
+Cache-Control on the static route for uploaded profile pictures: the pipeline's
+<hash>-<width> variants are immutable, while the <hash>.jpg it replaces in place, and
+anything else that merely looks like a variant, is left to Flask's defaults.
+"""
+import pytest
+
+CONTENT_HASH = '0123456789ab'
+
+
+@pytest.fixture
+def client(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'static_folder', str(tmp_path))
+    for path in (f'img/teacherImg/{CONTENT_HASH}.jpg', f'img/teacherImg/{CONTENT_HASH}-320.jpg',
+                 f'img/studentImg/{CONTENT_HASH}-640.webp', f'img/teacherImg/{CONTENT_HASH}-123.jpg',
+                 f'img/{CONTENT_HASH}-320.jpg'):
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_bytes(b'image')
+    return app.test_client()
+
+
+@pytest.mark.parametrize('path', [f'img/teacherImg/{CONTENT_HASH}-320.jpg', f'img/studentImg/{CONTENT_HASH}-640.webp'])
+def test_image_variants_are_immutable(app, client, path):
+    response = client.get(f'/static/{path}')
+
+    assert response.status_code == 200 and response.data == b'image'
+    assert response.cache_control.immutable and response.cache_control.public
+    assert response.cache_control.max_age == app.config['STATIC_ASSET_MAX_AGE']
+    assert not response.cache_control.no_cache
+
+
+@pytest.mark.parametrize('path', [
+    # Replaced in place once the upload is processed
+    f'img/teacherImg/{CONTENT_HASH}.jpg',
+    # Not a width the pipeline writes
+    f'img/teacherImg/{CONTENT_HASH}-123.jpg',
+    # Not an upload folder
+    f'img/{CONTENT_HASH}-320.jpg',
+])
+def test_other_images_are_not_immutable(client, path):
+    response = client.get(f'/static/{path}')
+
+    assert response.status_code == 200
+    assert not response.cache_control.immutable and response.cache_control.max_age is None
+
+
+def test_missing_variant_is_not_found(client):
+    assert client.get(f'/static/img/teacherImg/{CONTENT_HASH}-960.webp').status_code == 404
@@ -0,0 +1,73 @@
+# test_time_helpers.py
+"""
+localize_utc_times against converting each value with astimezone, across the daylight
+saving changes of America/New_York.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytz
+
+from helpers.time_helpers import localize_utc_times, to_epoch_minutes
+
+ZONE = 'America/New_York'
+FMT = '%Y-%m-%d %H:%M %Z%z'
+
+# Clocks go forward at 07:00 UTC on 10 March 2030 and back at 06:00 UTC on 3 November 2030
+SPRING_FORWARD = datetime(2030, 3, 10, 7)
+FALL_BACK = datetime(2030, 11, 3, 6)
+
+
+def every_quarter_hour(around):
+    return [around + timedelta(minutes=15 * i) for i in range(-12, 13)]
+
+
+def expected(utc_times, zone=ZONE):
+    return [utc_time.replace(tzinfo=timezone.utc).astimezone(pytz.timezone(zone)) for utc_time in utc_times]
+
+
+def assert_same_times(localized, reference):
+    assert localized == reference
+    assert [(time.utcoffset(), time.tzname(), time.replace(tzinfo=None)) for time in localized] == \
+           [(time.utcoffset(), time.tzname(), time.replace(tzinfo=None)) for time in reference]
+
+
+@pytest.mark.parametrize('around', [SPRING_FORWARD, FALL_BACK], ids=['spring forward', 'fall back'])
+def test_matches_astimezone_across_a_transition(around):
+    utc_times = every_quarter_hour(around)
+    reference = expected(utc_times)
+
+    assert_same_times(localize_utc_times(utc_times, ZONE), reference)
+    assert_same_times(localize_utc_times([utc_time.replace(tzinfo=timezone.utc) for utc_time in utc_times], ZONE), reference)
+    assert_same_times(localize_utc_times([to_epoch_minutes(utc_time) for utc_time in utc_times], ZONE), reference)
+    # Aware values in another zone are the same instants
+    paris = [utc_time.replace(tzinfo=timezone.utc).astimezone(pytz.timezone('Europe/Paris')) for utc_time in utc_times]
+    assert_same_times(localize_utc_times(paris, ZONE), reference)
+
+
+def test_values_spanning_both_transitions():
+    utc_times = every_quarter_hour(FALL_BACK) + every_quarter_hour(SPRING_FORWARD) + [datetime(2030, 7, 1)]
+
+    assert_same_times(localize_utc_times(utc_times, ZONE), expected(utc_times))
+
+
+def test_formatted_times_match_strftime():
+    utc_times = every_quarter_hour(FALL_BACK) * 2
+
+    formatted = localize_utc_times(utc_times, ZONE, fmt=FMT)
+
+    assert formatted == [time.strftime(FMT) for time in expected(utc_times)]
+    # The repeated hour after clocks go back is told apart by its offset
+    assert '2030-11-03 01:30 EDT-0400' in formatted and '2030-11-03 01:30 EST-0500' in formatted
+
+
+def test_none_values_are_passed_through():
+    assert localize_utc_times([None, SPRING_FORWARD, None], ZONE) == [None, *expected([SPRING_FORWARD]), None]
+    assert localize_utc_times([None], ZONE, fmt=FMT) == [None]
+    assert localize_utc_times([], ZONE) == []
+
+
+def test_zone_without_transitions():
+    utc_times = every_quarter_hour(SPRING_FORWARD)
+
+    assert_same_times(localize_utc_times(utc_times, 'UTC'), expected(utc_times, 'UTC'))